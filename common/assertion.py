@@ -1,6 +1,9 @@
 # coding: utf-8
 # @Author: bgtech
 from common.log import api_info, api_error
+from common.config import get_config
+from common.interface_config import get_default_interface_config
+from common.metrics import endpoint_name, get_metrics
 import re
 import json
 
@@ -64,6 +67,34 @@ def assert_json_structure(response, expected_structure):
         api_error(f"断言失败: {e}")
         raise
 
+def check_expected_result(response, expected):
+    """
+    按用例的 expected_result 检查响应：期望中的每个字段都应出现在响应中且值相等
+    :param response: 响应数据（JSON对象）
+    :param expected: 期望结果字典
+    :return: 第一条不满足的描述，全部满足时返回None
+    """
+    if not expected:
+        return None
+    if not isinstance(response, dict):
+        return f"返回内容不是JSON对象: {response}"
+    for k, v in expected.items():
+        if k not in response:
+            return f"返回内容缺少字段: {k}"
+        if response[k] != v:
+            return f"断言失败: {k} 期望: {v} 实际: {response[k]}"
+    return None
+
+def assert_expected_result(response, expected):
+    """
+    断言响应满足用例的 expected_result
+    """
+    message = check_expected_result(response, expected)
+    if message:
+        api_error(message)
+        raise AssertionError(message)
+    api_info("断言通过: 响应满足期望结果")
+
 def assert_status_code(response, expected_code):
     """
     断言HTTP状态码
@@ -77,15 +108,165 @@ def assert_status_code(response, expected_code):
         api_error(error_msg)
         raise AssertionError(error_msg)
 
+def _get_response_time(response):
+    """
+    获取响应时间（毫秒）
+    使用响应对象上的分阶段耗时(response.timing)，或字典中的response_time/total_ms（如 get_last_timing() 的返回值）
+    不会回退到当前线程最近一次请求的耗时，以免误用其他请求的耗时
+    """
+    timing = getattr(response, 'timing', None)
+    if isinstance(timing, dict) and 'total_ms' in timing:
+        return timing['total_ms']
+    if isinstance(response, dict):
+        if 'response_time' in response:
+            return response['response_time']
+        if 'total_ms' in response:
+            return response['total_ms']
+    return None
+
 def assert_response_time(response, max_time):
     """
     断言响应时间不超过最大值（毫秒）
     """
+    response_time = _get_response_time(response)
+    if response_time is None:
+        if getattr(response, 'from_cache', False):
+            error_msg = "断言失败: 响应来自缓存，没有响应时间"
+        elif getattr(response, 'replayed', False):
+            error_msg = "断言失败: 响应为回放的录制响应，没有响应时间（录制时的耗时见 response.recorded_timing）"
+        else:
+            error_msg = ("断言失败: 无法获取响应时间，请传入带timing的响应对象，"
+                         "或包含response_time/total_ms的字典（如 get_last_timing()）")
+        api_error(error_msg)
+        raise AssertionError(error_msg)
     try:
-        response_time = response.get('response_time', 0)
         assert response_time <= max_time
         api_info(f"断言通过: 响应时间 {response_time}ms <= {max_time}ms")
     except AssertionError:
         error_msg = f"断言失败: 响应时间 {response_time}ms > {max_time}ms"
         api_error(error_msg)
-        raise AssertionError(error_msg)
\ No newline at end of file
+        raise AssertionError(error_msg)
+
+def _get_endpoint_samples(endpoint, metrics=None):
+    """
+    获取接口的样本，无样本时断言失败
+    :param endpoint: 'METHOD 模块.接口'、'模块.接口' 或 'METHOD 主机/路径'
+    :param metrics: 样本收集器，默认为进程级收集器（压测时传入 LoadRunner.metrics）
+    """
+    samples = (metrics or get_metrics()).get(endpoint)
+    if samples is None or not samples.count:
+        error_msg = f"断言失败: 接口 {endpoint} 没有请求样本"
+        api_error(error_msg)
+        raise AssertionError(error_msg)
+    return samples
+
+def _check_latency_percentile(samples, endpoint, p, max_ms):
+    actual = samples.percentile(p)
+    if actual > max_ms:
+        return f"接口 {endpoint} p{p:g}延迟 {actual:.2f}ms > {max_ms}ms（样本数 {samples.count}）"
+    return None
+
+def _check_error_rate(samples, endpoint, max_rate):
+    actual = samples.error_rate()
+    if actual > max_rate:
+        return f"接口 {endpoint} 错误率 {actual:.2%} > {max_rate:.2%}（样本数 {samples.count}）"
+    return None
+
+def _check_throughput(samples, endpoint, min_rps):
+    actual = samples.throughput()
+    if actual is None or actual < min_rps:
+        actual_text = f"{actual:.2f}" if actual is not None else "无法计算"
+        return f"接口 {endpoint} 吞吐量 {actual_text} RPS < {min_rps} RPS（样本数 {samples.count}）"
+    return None
+
+def assert_latency_percentile(endpoint, p, max_ms, metrics=None):
+    """
+    断言接口全部样本的延迟分位数不超过上限（毫秒）
+    :param endpoint: 'METHOD 模块.接口'、'模块.接口' 或 'METHOD 主机/路径'
+    :param p: 百分位，如 99、99.9
+    :param max_ms: 上限（毫秒），必填
+    :param metrics: 样本收集器，默认为进程级收集器
+    """
+    samples = _get_endpoint_samples(endpoint, metrics)
+    error_msg = _check_latency_percentile(samples, endpoint, p, max_ms)
+    if error_msg:
+        api_error(f"断言失败: {error_msg}")
+        raise AssertionError(f"断言失败: {error_msg}")
+    api_info(f"断言通过: 接口 {endpoint} p{p:g}延迟 <= {max_ms}ms")
+
+def assert_error_rate(endpoint, max_rate=0.0, metrics=None):
+    """
+    断言接口全部样本的错误率（异常和4xx/5xx）不超过上限
+    :param max_rate: 错误率上限（0~1）
+    """
+    samples = _get_endpoint_samples(endpoint, metrics)
+    error_msg = _check_error_rate(samples, endpoint, max_rate)
+    if error_msg:
+        api_error(f"断言失败: {error_msg}")
+        raise AssertionError(f"断言失败: {error_msg}")
+    api_info(f"断言通过: 接口 {endpoint} 错误率 <= {max_rate:.2%}")
+
+def assert_throughput_at_least(endpoint, min_rps, metrics=None):
+    """
+    断言接口吞吐量（按首个请求开始到最后一个请求结束计算）不低于下限
+    :param min_rps: 每秒请求数下限
+    """
+    samples = _get_endpoint_samples(endpoint, metrics)
+    error_msg = _check_throughput(samples, endpoint, min_rps)
+    if error_msg:
+        api_error(f"断言失败: {error_msg}")
+        raise AssertionError(f"断言失败: {error_msg}")
+    api_info(f"断言通过: 接口 {endpoint} 吞吐量 >= {min_rps} RPS")
+
+_PERCENTILE_BUDGET = re.compile(r'^p(\d+(?:\.\d+)?)_ms$')
+
+def check_slo_budgets(metrics=None):
+    """
+    检查 conf/interface_info.yaml 中接口声明的SLO预算，没有样本的接口跳过
+    预算格式: slo: {p95_ms: 300, p99_ms: 800, max_error_rate: 0.01, min_throughput_rps: 5}
+    :param metrics: 样本收集器，默认为进程级收集器
+    :return: 违反预算的描述列表
+    """
+    metrics = metrics or get_metrics()
+    violations = []
+    for module, interfaces in get_default_interface_config().get_all_interfaces().items():
+        if not isinstance(interfaces, dict):
+            continue
+        for name, info in interfaces.items():
+            if not isinstance(info, dict) or not info.get('slo') or not info.get('method'):
+                continue
+            endpoint = endpoint_name(info['method'], info.get('url', ''), f"{module}.{name}")
+            samples = metrics.get(endpoint)
+            if samples is None or not samples.count:
+                continue
+            for key, budget in info['slo'].items():
+                matched = _PERCENTILE_BUDGET.match(key)
+                if matched:
+                    violation = _check_latency_percentile(samples, endpoint, float(matched.group(1)), budget)
+                elif key == 'max_error_rate':
+                    violation = _check_error_rate(samples, endpoint, budget)
+                elif key == 'min_throughput_rps':
+                    violation = _check_throughput(samples, endpoint, budget)
+                else:
+                    api_error(f"未知的SLO预算项: {module}.{name}.slo.{key}")
+                    continue
+                if violation:
+                    violations.append(violation)
+    return violations
+
+def assert_slo_budgets(metrics=None):
+    """
+    断言所有声明了SLO预算的接口均满足预算
+    """
+    violations = check_slo_budgets(metrics)
+    if violations:
+        error_msg = "断言失败: SLO预算未满足\n" + "\n".join(violations)
+        api_error(error_msg)
+        raise AssertionError(error_msg)
+    api_info("断言通过: 所有接口满足SLO预算")
+
+def slo_enforced():
+    """
+    是否在测试会话结束时强制检查SLO预算（global.slo.enforce，默认开启）
+    """
+    return bool((get_config('global', 'slo', default={}) or {}).get('enforce', True))
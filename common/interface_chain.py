@@ -1,11 +1,19 @@
 import re
 import json
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from common.config import get_config
 from common.log import api_info, api_error
+from common.shared_store import get_shared_store
+
+# 同一接口链中同时执行的步骤数上限（global.interface_chain.max_concurrency），默认按配置顺序逐个执行
+DEFAULT_MAX_CONCURRENCY = 1
+_PLACEHOLDER = re.compile(r'\$\{([^}]+)\}')
 
 class InterfaceChain:
     """
     接口关联处理工具类
     支持上一个接口返回值作为下一个接口参数
+    步骤之间按 ${变量} 占位符与 extract 输出分析依赖，开启并发（max_concurrency大于1）时互不依赖的步骤并发执行
     """
     
     def __init__(self):
@@ -66,55 +74,189 @@ class InterfaceChain:
         else:
             return params
     
-    def chain_request(self, interface_chain_data):
+    def placeholders(self, params):
+        """
+        参数中引用的占位符名称
+        :param params: 原始参数
+        :return: 名称集合
+        """
+        if isinstance(params, str):
+            return set(_PLACEHOLDER.findall(params))
+        if isinstance(params, dict):
+            params = list(params.values())
+        if isinstance(params, list):
+            names = set()
+            for item in params:
+                names |= self.placeholders(item)
+            return names
+        return set()
+    
+    def build_dependencies(self, interface_chain_data):
+        """
+        分析接口链步骤之间的依赖
+        步骤参数中的 ${x} 依赖于它之前最近一个在 extract 中输出 x 的步骤；
+        x 没有明确的输出步骤时，依赖于之前所有 extract 为字符串规则（输出字段无法静态确定）的步骤；
+        还可以用 depends_on 指定步骤名称，声明没有数据传递但有先后要求的依赖（如先创建再查询列表）
+        :param interface_chain_data: 接口链配置数据
+        :return: 每个步骤直接依赖的步骤下标集合
+        """
+        producers = {}
+        opaque = []
+        names = {}
+        dependencies = []
+        for index, step in enumerate(interface_chain_data):
+            required = set()
+            for name in self.placeholders(step.get('params', {})):
+                if name in producers:
+                    required.add(producers[name])
+                else:
+                    required.update(opaque)
+            depends_on = step.get('depends_on') or []
+            for name in [depends_on] if isinstance(depends_on, str) else depends_on:
+                if name not in names:
+                    raise ValueError(f"接口链步骤 {step.get('name', index)} 依赖的步骤不存在: {name}")
+                required.add(names[name])
+            dependencies.append(required)
+            extract = step.get('extract')
+            if isinstance(extract, dict):
+                for key in extract:
+                    producers[key] = index
+            elif extract is not None:
+                opaque.append(index)
+            if step.get('name'):
+                names[step['name']] = index
+        return dependencies
+    
+    def chain_request(self, interface_chain_data, shared_key=None, max_concurrency=None):
         """
         链式调用接口
         :param interface_chain_data: 接口链配置数据
+        :param shared_key: 共享名称，指定后同一次运行中所有worker进程只执行一次该接口链，
+                           其他进程直接复用提取到的上下文和最后一个接口的响应
+        :param max_concurrency: 同时执行的步骤数上限，默认 global.interface_chain.max_concurrency（默认1，按顺序执行）
         :return: 最后一个接口的响应
         """
+        store = get_shared_store() if shared_key is not None else None
+        if store is None:
+            return self._run_chain(interface_chain_data, max_concurrency)
+        
+        def compute():
+            response = self._run_chain(interface_chain_data, max_concurrency)
+            return {'context': self.context, 'response': response}
+        
+        result = store.get_or_compute('chain', shared_key, compute)
+        self.context.update(result['context'])
+        api_info(f"复用共享接口链结果: {shared_key}")
+        return result['response']
+    
+    def _run_chain(self, interface_chain_data, max_concurrency=None):
+        """
+        按依赖关系执行接口链：依赖的步骤完成后即可开始，互不依赖的步骤并发执行，总耗时接近关键路径耗时
+        每个步骤只看到执行前已有的上下文和它所依赖的（直接或间接）步骤提取的参数，结果与按顺序执行一致
+        """
+        steps = list(interface_chain_data)
+        if not steps:
+            return None
+        if max_concurrency is None:
+            chain_config = get_config('global', 'interface_chain', default={}) or {}
+            max_concurrency = chain_config.get('max_concurrency', DEFAULT_MAX_CONCURRENCY)
+        limit = max(int(max_concurrency), 1)
+        dependencies = self.build_dependencies(steps)
+        ancestors = []
+        for required in dependencies:
+            closure = set(required)
+            for index in required:
+                closure |= ancestors[index]
+            ancestors.append(closure)
+        
+        initial = dict(self.context)
+        responses = [None] * len(steps)
+        outputs = [None] * len(steps)
+        pending = set(range(len(steps)))
+        completed = set()
+        running = {}
+        failure = None
+        with ThreadPoolExecutor(max_workers=limit, thread_name_prefix='chain-step') as executor:
+            while pending or running:
+                if failure is None:
+                    # 按配置顺序启动已就绪的步骤，limit为1时与顺序执行完全相同
+                    ready = sorted(index for index in pending if dependencies[index] <= completed)
+                    for index in ready[:limit - len(running)]:
+                        context = dict(initial)
+                        for ancestor in sorted(ancestors[index]):
+                            context.update(outputs[ancestor] or {})
+                        running[executor.submit(self._run_step, steps[index], context)] = index
+                        pending.discard(index)
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    index = running.pop(future)
+                    try:
+                        responses[index], outputs[index] = future.result()
+                    except Exception as e:
+                        # 出错后不再启动新步骤，等待已开始的步骤结束
+                        if failure is None or index < failure[0]:
+                            failure = (index, e)
+                    else:
+                        completed.add(index)
+        
+        for index in sorted(completed):
+            self.context.update(outputs[index] or {})
+        if failure is not None:
+            raise failure[1]
+        return responses[-1]
+    
+    def _run_step(self, step, context):
+        """
+        执行接口链的一个步骤
+        :param step: 步骤配置
+        :param context: 该步骤可见的上下文
+        :return: (接口响应, 提取的参数)
+        """
         from utils.http_utils import http_get, http_post
         
-        for step in interface_chain_data:
-            try:
-                # 获取接口信息
-                url = step['url']
-                method = step['method'].upper()
-                params = step.get('params', {})
-                
-                # 替换参数中的占位符
-                if self.context:
-                    params = self.replace_params(params, self.context)
-                
-                api_info(f"执行接口链步骤: {step.get('name', 'unnamed')}")
-                api_info(f"请求地址: {url}")
-                api_info(f"请求参数: {params}")
-                
-                # 发送请求
-                if method == 'GET':
-                    response = http_get(url, params=params)
-                elif method == 'POST':
-                    response = http_post(url, json_data=params)
-                else:
-                    raise ValueError(f"不支持的请求方法: {method}")
-                
-                api_info(f"接口响应: {response}")
-                
-                # 提取参数到上下文
-                if 'extract' in step:
-                    extracted = self.extract_param(response, step['extract'])
-                    if extracted:
-                        self.context.update(extracted)
-                        api_info(f"提取参数: {extracted}")
-                
-                # 断言验证
-                if 'assert' in step:
-                    self.assert_response(response, step['assert'])
-                
-            except Exception as e:
-                api_error(f"接口链执行失败: {e}")
-                raise
+        try:
+            # 获取接口信息
+            url = step['url']
+            method = step['method'].upper()
+            params = step.get('params', {})
+            
+            # 替换参数中的占位符
+            if context:
+                params = self.replace_params(params, context)
+            
+            api_info(f"执行接口链步骤: {step.get('name', 'unnamed')}")
+            api_info(f"请求地址: {url}")
+            api_info(f"请求参数: {params}")
+            
+            # 发送请求
+            if method == 'GET':
+                response = http_get(url, params=params)
+            elif method == 'POST':
+                response = http_post(url, json_data=params)
+            else:
+                raise ValueError(f"不支持的请求方法: {method}")
+            
+            api_info(f"接口响应: {response}")
+            
+            # 提取参数
+            extracted = None
+            if 'extract' in step:
+                extracted = self.extract_param(response, step['extract'])
+                if extracted:
+                    extracted = dict(extracted)
+                    api_info(f"提取参数: {extracted}")
+            
+            # 断言验证
+            if 'assert' in step:
+                self.assert_response(response, step['assert'])
+            
+        except Exception as e:
+            api_error(f"接口链执行失败: {e}")
+            raise
         
-        return response
+        return response, extracted
     
     def assert_response(self, response, expected):
         """
@@ -129,10 +271,12 @@ class InterfaceChain:
             api_info(f"断言通过: {key} = {actual_value}")
 
 # 使用示例
-def run_interface_chain(chain_config):
+def run_interface_chain(chain_config, shared_key=None, max_concurrency=None):
     """
     运行接口链
     :param chain_config: 接口链配置
+    :param shared_key: 共享名称，见 InterfaceChain.chain_request
+    :param max_concurrency: 同时执行的步骤数上限，见 InterfaceChain.chain_request
     """
     chain = InterfaceChain()
-    return chain.chain_request(chain_config) 
\ No newline at end of file
+    return chain.chain_request(chain_config, shared_key=shared_key, max_concurrency=max_concurrency) 
\ No newline at end of file
@@ -1,8 +1,10 @@
 from common.yaml_utils import load_yaml
 from common.config import get_config
 import os
+import threading
 import configparser
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
+from urllib.parse import urlsplit
 
 class InterfaceConfig:
     """
@@ -220,6 +222,34 @@ class InterfaceConfig:
         except KeyError:
             raise ValueError(f"模块不存在: {module}")
     
+    def find_interface(self, url: str, method: Optional[str] = None,
+                       env: Optional[str] = None) -> Optional[Tuple[str, Dict]]:
+        """
+        根据请求URL（忽略查询参数）和方法查找对应的接口配置
+        :param url: 请求URL
+        :param method: 请求方法，为None时不比较方法
+        :param env: 环境名称，默认为当前环境
+        :return: ('模块.接口', 接口配置)，未找到时返回None
+        """
+        if not hasattr(self, '_url_index'):
+            self._url_index = {}
+            for module, interfaces in self.get_all_interfaces().items():
+                for interface in interfaces:
+                    info = self.get_interface_info(module, interface, env)
+                    if 'url' not in info:
+                        continue
+                    key = self._url_key(info['url'])
+                    self._url_index.setdefault(key, []).append((f"{module}.{interface}", info))
+        for name, info in self._url_index.get(self._url_key(url), []):
+            if method is None or str(info.get('method', method)).upper() == method.upper():
+                return name, info
+        return None
+    
+    @staticmethod
+    def _url_key(url: str) -> str:
+        parts = urlsplit(url)
+        return f"{parts.scheme.lower()}://{parts.netloc.lower()}{parts.path.rstrip('/')}"
+    
     def get_global_config(self) -> Dict:
         """
         获取全局配置
@@ -250,6 +280,41 @@ def get_interface_config(module: str, interface: str, env: Optional[str] = None)
     config = InterfaceConfig()
     return config.get_interface_info(module, interface, env)
 
+_default_config = None
+_default_config_lock = threading.Lock()
+
+def get_default_interface_config() -> InterfaceConfig:
+    """
+    获取进程级共享的接口配置实例（只加载一次配置文件，供请求热路径使用）
+    """
+    global _default_config
+    if _default_config is None:
+        with _default_config_lock:
+            if _default_config is None:
+                _default_config = InterfaceConfig()
+    return _default_config
+
+def find_interface(url: str, method: Optional[str] = None) -> Optional[Tuple[str, Dict]]:
+    """
+    便捷函数：根据请求URL和方法查找接口配置
+    :param url: 请求URL
+    :param method: 请求方法
+    :return: ('模块.接口', 接口配置)，未找到时返回None
+    """
+    return get_default_interface_config().find_interface(url, method)
+
+def get_interface_by_name(name: str) -> Optional[Dict]:
+    """
+    便捷函数：按 '模块.接口' 名称获取接口配置
+    :param name: 如 'user.login'
+    :return: 接口配置，不存在时返回None
+    """
+    module, _, interface = name.partition('.')
+    try:
+        return get_default_interface_config().get_interface_info(module, interface)
+    except Exception:
+        return None
+
 def get_env_config(env: Optional[str] = None) -> Dict:
     """
     便捷函数：获取环境配置
@@ -0,0 +1,236 @@
+# coding: utf-8
+# @Author: bgtech
+import threading
+import time
+import logging
+from array import array
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from common.interface_config import get_interface_by_name
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+
+def endpoint_name(method: str, url: str, interface: Optional[str] = None) -> str:
+    """
+    统计使用的接口标识：匹配到接口配置时用 'METHOD 模块.接口'，否则用 'METHOD 主机/路径'
+    """
+    if interface:
+        return f"{method.upper()} {interface}"
+    parts = urlsplit(url)
+    return f"{method.upper()} {parts.netloc}{parts.path or '/'}"
+
+
+class EndpointSamples:
+    """
+    单个接口的请求样本
+    延迟与是否失败分别保存在紧凑的 double / byte 数组中，统计时转为NumPy数组向量化计算
+    """
+
+    def __init__(self):
+        self.latencies = array('d')
+        self.errors = array('b')
+        self.first_start = None
+        self.last_end = None
+        self._lock = threading.Lock()
+
+    def record(self, latency_ms: float, error: bool = False, end: Optional[float] = None):
+        """
+        记录一个样本
+        :param latency_ms: 延迟（毫秒）
+        :param error: 是否失败
+        :param end: 请求结束时间（time.time()），用于计算吞吐量
+        """
+        end = end if end is not None else time.time()
+        start = end - latency_ms / 1000.0
+        with self._lock:
+            self.latencies.append(latency_ms)
+            self.errors.append(1 if error else 0)
+            self.first_start = start if self.first_start is None else min(self.first_start, start)
+            self.last_end = end if self.last_end is None else max(self.last_end, end)
+
+    @property
+    def count(self) -> int:
+        return len(self.latencies)
+
+    def latency_array(self) -> np.ndarray:
+        with self._lock:
+            return np.frombuffer(self.latencies, dtype=np.float64).copy()
+
+    def percentile(self, p) -> Optional[float]:
+        """
+        延迟分位数（毫秒）
+        :param p: 百分位（0~100），也可以传入列表一次计算多个
+        """
+        samples = self.latency_array()
+        if not samples.size:
+            return None
+        result = np.percentile(samples, p)
+        return result.tolist() if np.ndim(result) else float(result)
+
+    def error_rate(self) -> Optional[float]:
+        with self._lock:
+            errors = np.frombuffer(self.errors, dtype=np.int8).copy()
+        return float(errors.mean()) if errors.size else None
+
+    def throughput(self) -> Optional[float]:
+        """
+        吞吐量（请求数/秒），按首个请求开始到最后一个请求结束的时间窗口计算
+        """
+        with self._lock:
+            if not self.latencies:
+                return None
+            span = self.last_end - self.first_start
+            count = len(self.latencies)
+        return count / span if span > 0 else None
+
+    def to_dict(self) -> Dict:
+        """
+        导出原始样本（用于跨进程汇总）
+        """
+        with self._lock:
+            return {'latencies': self.latencies.tolist(), 'errors': self.errors.tolist(),
+                    'first_start': self.first_start, 'last_end': self.last_end}
+
+    def merge_dict(self, data: Dict):
+        """
+        合并 to_dict() 导出的样本
+        """
+        with self._lock:
+            self.latencies.extend(data.get('latencies', []))
+            self.errors.extend(data.get('errors', []))
+            for name, pick in (('first_start', min), ('last_end', max)):
+                value, current = data.get(name), getattr(self, name)
+                if value is not None:
+                    setattr(self, name, value if current is None else pick(current, value))
+
+    def summary(self) -> Dict:
+        samples = self.latency_array()
+        if not samples.size:
+            return {'count': 0}
+        p50, p90, p95, p99 = np.percentile(samples, [50, 90, 95, 99])
+        throughput = self.throughput()
+        return {
+            'count': int(samples.size),
+            'error_rate': round(self.error_rate(), 4),
+            'throughput_rps': round(throughput, 2) if throughput is not None else None,
+            'p50_ms': round(float(p50), 3),
+            'p90_ms': round(float(p90), 3),
+            'p95_ms': round(float(p95), 3),
+            'p99_ms': round(float(p99), 3),
+            'max_ms': round(float(samples.max()), 3),
+        }
+
+
+class MetricsRegistry:
+    """
+    按接口收集请求样本
+    HTTPUtils / AsyncHTTPUtils 的每个请求都记录到进程级默认实例；压测时每个压测执行器使用独立实例
+    """
+
+    def __init__(self):
+        self._samples: Dict[str, EndpointSamples] = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, latency_ms: float, error: bool = False, end: Optional[float] = None):
+        """
+        记录一个样本
+        :param endpoint: 接口标识，见 endpoint_name()
+        """
+        samples = self._samples.get(endpoint)
+        if samples is None:
+            with self._lock:
+                samples = self._samples.setdefault(endpoint, EndpointSamples())
+        samples.record(latency_ms, error, end)
+
+    def resolve(self, endpoint: str) -> str:
+        """
+        解析接口标识：已有样本的标识原样返回；'模块.接口' 按接口配置转换为 'METHOD 模块.接口'
+        """
+        if endpoint in self._samples or ' ' in endpoint or '.' not in endpoint:
+            return endpoint
+        info = get_interface_by_name(endpoint)
+        if isinstance(info, dict) and info.get('method'):
+            return endpoint_name(info['method'], info.get('url', ''), endpoint)
+        return endpoint
+
+    def get(self, endpoint: str) -> Optional[EndpointSamples]:
+        """
+        获取接口样本
+        :param endpoint: 'METHOD 模块.接口'、'模块.接口' 或 'METHOD 主机/路径'
+        """
+        return self._samples.get(self.resolve(endpoint))
+
+    def endpoints(self) -> List[str]:
+        with self._lock:
+            return list(self._samples)
+
+    def summary(self) -> Dict[str, Dict]:
+        return {endpoint: self._samples[endpoint].summary() for endpoint in self.endpoints()}
+
+    def to_dict(self) -> Dict[str, Dict]:
+        """
+        导出全部接口的原始样本（并行执行时各worker进程导出，由主进程汇总）
+        """
+        return {endpoint: self._samples[endpoint].to_dict() for endpoint in self.endpoints()}
+
+    def merge_dict(self, data: Dict[str, Dict]):
+        """
+        合并 to_dict() 导出的样本
+        """
+        for endpoint, samples in data.items():
+            with self._lock:
+                target = self._samples.setdefault(endpoint, EndpointSamples())
+            target.merge_dict(samples)
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+
+
+_default_metrics = MetricsRegistry()
+
+
+def get_metrics() -> MetricsRegistry:
+    """
+    获取进程级默认样本收集器
+    """
+    return _default_metrics
+
+
+_request_listeners: List[Callable[[Dict], None]] = []
+
+
+def add_request_listener(listener: Callable[[Dict], None]):
+    """
+    注册请求监听器：HTTPUtils / AsyncHTTPUtils 每完成一个请求调用一次（在发起请求的线程中）
+    :param listener: 回调，参数为 {'endpoint', 'method', 'url', 'status', 'error', 'timing', 'ts'}
+    """
+    if listener not in _request_listeners:
+        _request_listeners.append(listener)
+
+
+def remove_request_listener(listener: Callable[[Dict], None]):
+    if listener in _request_listeners:
+        _request_listeners.remove(listener)
+
+
+def notify_request(endpoint: str, method: str, url: str, status: Optional[int], timing: Optional[Dict]):
+    """
+    通知请求监听器，没有监听器时不做任何处理
+    :param status: 响应状态码，请求异常时为None
+    :param timing: 分阶段耗时，见 RequestTiming.to_dict()
+    """
+    if not _request_listeners:
+        return
+    record = {'endpoint': endpoint, 'method': method.upper(), 'url': url, 'status': status,
+              'error': status is None or status >= 400, 'timing': timing or {}, 'ts': time.time()}
+    for listener in list(_request_listeners):
+        try:
+            listener(record)
+        except Exception as e:
+            logger.warning(f"请求监听器执行失败: {e}")
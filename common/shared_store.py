@@ -0,0 +1,262 @@
+# coding: utf-8
+# @Author: bgtech
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import logging
+from typing import Any, Callable, Dict, Optional
+
+from common.config import get_config
+from common.temp_utils import BASE_DIR
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 文件锁：POSIX使用fcntl，Windows使用msvcrt
+try:
+    import fcntl
+    msvcrt = None
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+DEFAULT_STORE_FILE = 'temp/shared_store.db'
+# 本次运行的标识，同一次运行的所有worker进程共享（pytest-xdist的运行ID优先）
+RUN_ID_ENV = 'AITEST_RUN_ID'
+XDIST_RUN_ID_ENV = 'PYTEST_XDIST_TESTRUNUID'
+# 其他运行遗留的数据保留时长（秒）
+STALE_RUN_SECONDS = 24 * 3600
+_MISSING = object()
+
+
+def get_shared_store_config() -> Dict:
+    """
+    读取 conf/interface_info.yaml 的 global.shared_store 配置
+    """
+    return get_config('global', 'shared_store', default={}) or {}
+
+
+def get_run_id() -> str:
+    """
+    获取本次运行的标识
+    pytest-xdist的worker共享 PYTEST_XDIST_TESTRUNUID；否则读取 AITEST_RUN_ID，
+    都没有时生成一个并写入环境变量，由子进程继承
+    """
+    run_id = os.environ.get(XDIST_RUN_ID_ENV) or os.environ.get(RUN_ID_ENV)
+    if not run_id:
+        run_id = uuid.uuid4().hex
+        os.environ[RUN_ID_ENV] = run_id
+    return run_id
+
+
+class FileLock:
+    """
+    跨进程文件锁（阻塞式，同一进程内的线程之间同样互斥）
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._thread_lock = threading.Lock()
+        self._fd = None
+
+    def acquire(self):
+        self._thread_lock.acquire()
+        try:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            else:
+                # msvcrt.LK_LOCK最多重试10秒，持续等待直到获得锁
+                os.lseek(fd, 0, os.SEEK_SET)
+                while True:
+                    try:
+                        msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        continue
+            self._fd = fd
+        except BaseException:
+            self._thread_lock.release()
+            raise
+
+    def release(self):
+        fd, self._fd = self._fd, None
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(fd)
+            self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+class SharedStore:
+    """
+    同一台机器上多个worker进程共享的键值存储（SQLite，WAL模式）
+    值以JSON保存；get_or_compute 在键级文件锁内执行计算，保证同一次运行中昂贵的准备工作（登录、前置接口链）只执行一次
+    """
+
+    def __init__(self, path: Optional[str] = None, run_id: Optional[str] = None):
+        """
+        初始化共享存储
+        :param path: SQLite文件路径，默认 global.shared_store.path（相对项目根目录）
+        :param run_id: 运行标识，默认 get_run_id()
+        """
+        path = path or get_shared_store_config().get('path') or DEFAULT_STORE_FILE
+        self.path = path if os.path.isabs(path) else os.path.join(BASE_DIR, path)
+        self.run_id = run_id or get_run_id()
+        self._local = threading.local()
+        self._locks: Dict[str, FileLock] = {}
+        self._locks_guard = threading.Lock()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock_dir = f"{self.path}.locks"
+        os.makedirs(self._lock_dir, exist_ok=True)
+        if not os.path.exists(self.path):
+            # 存储中可能有token，文件只允许当前用户读写
+            os.close(os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600))
+        with self._connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    run_id TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    expires_at REAL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key, run_id)
+                )
+            """)
+            conn.execute("DELETE FROM entries WHERE (expires_at IS NOT NULL AND expires_at < ?) "
+                         "OR (run_id != '' AND run_id != ? AND updated_at < ?)",
+                         (time.time(), self.run_id, time.time() - STALE_RUN_SECONDS))
+
+    def _connection(self) -> sqlite3.Connection:
+        """
+        每个线程一个连接
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA busy_timeout=30000')
+            self._local.conn = conn
+        return conn
+
+    def _scope(self, per_run: bool) -> str:
+        return self.run_id if per_run else ''
+
+    def get(self, namespace: str, key: str, default: Any = None, per_run: bool = True) -> Any:
+        """
+        读取值
+        :param namespace: 命名空间，如 'token'、'chain'
+        :param key: 键
+        :param default: 不存在或已过期时的返回值
+        :param per_run: 是否只读取本次运行写入的值（False表示跨运行共享，按过期时间失效）
+        """
+        row = self._connection().execute(
+            "SELECT value, expires_at FROM entries WHERE namespace = ? AND key = ? AND run_id = ?",
+            (namespace, key, self._scope(per_run))).fetchone()
+        if row is None or (row[1] is not None and row[1] < time.time()):
+            return default
+        return json.loads(row[0])
+
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None, per_run: bool = True):
+        """
+        写入值
+        :param value: 可JSON序列化的值
+        :param ttl: 有效期（秒），None表示不过期
+        :param per_run: 是否只在本次运行内有效
+        """
+        now = time.time()
+        self._connection().execute(
+            "INSERT OR REPLACE INTO entries (namespace, key, run_id, value, expires_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (namespace, key, self._scope(per_run), json.dumps(value, ensure_ascii=False),
+             now + ttl if ttl is not None else None, now))
+
+    def delete(self, namespace: str, key: Optional[str] = None, per_run: bool = True):
+        """
+        删除值，不指定key时删除整个命名空间
+        """
+        if key is None:
+            self._connection().execute("DELETE FROM entries WHERE namespace = ? AND run_id = ?",
+                                       (namespace, self._scope(per_run)))
+        else:
+            self._connection().execute("DELETE FROM entries WHERE namespace = ? AND key = ? AND run_id = ?",
+                                       (namespace, key, self._scope(per_run)))
+
+    def lock(self, namespace: str, key: str) -> FileLock:
+        """
+        获取键级跨进程锁
+        """
+        name = hashlib.sha256(f"{namespace}\0{key}".encode('utf-8')).hexdigest()[:32]
+        with self._locks_guard:
+            if name not in self._locks:
+                self._locks[name] = FileLock(os.path.join(self._lock_dir, f"{name}.lock"))
+            return self._locks[name]
+
+    def get_or_compute(self, namespace: str, key: str, compute: Callable[[], Any], ttl: Optional[float] = None,
+                       per_run: bool = True, validate: Optional[Callable[[Any], bool]] = None) -> Any:
+        """
+        原子地读取或计算值：所有进程/线程中只有一个执行compute，其他调用等待并读取其结果
+        :param compute: 计算函数，返回可JSON序列化的值
+        :param ttl: 有效期（秒），也可以由compute返回后通过 ttl=callable(value) 计算
+        :param per_run: 是否只在本次运行内有效
+        :param validate: 已有值的校验函数，返回False时重新计算（如token即将过期）
+        :return: 值
+        """
+        value = self.get(namespace, key, _MISSING, per_run)
+        if value is not _MISSING and (validate is None or validate(value)):
+            return value
+        with self.lock(namespace, key):
+            # 等待锁期间其他进程可能已完成计算
+            value = self.get(namespace, key, _MISSING, per_run)
+            if value is not _MISSING and (validate is None or validate(value)):
+                return value
+            value = compute()
+            self.set(namespace, key, value, ttl(value) if callable(ttl) else ttl, per_run)
+            return value
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def shared_store_enabled() -> bool:
+    """
+    是否启用跨进程共享（global.shared_store.enabled，默认开启）
+    """
+    return bool(get_shared_store_config().get('enabled', True))
+
+
+def get_shared_store() -> Optional[SharedStore]:
+    """
+    获取进程级共享存储，未启用时返回None
+    """
+    global _default_store
+    if not shared_store_enabled():
+        return None
+    if _default_store is None:
+        with _default_store_lock:
+            if _default_store is None:
+                _default_store = SharedStore()
+    return _default_store
@@ -0,0 +1,322 @@
+# coding: utf-8
+# @Author: bgtech
+import json
+import logging
+import os
+import platform
+import re
+import socket
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import requests
+
+from common.config import get_config
+from common.interface_chain import InterfaceChain
+from common.interface_config import find_interface
+from utils.http_utils import HTTPUtils
+from utils.mock_server import MockServer
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE_FILE = 'conf/benchmark_baseline.json'
+DEFAULT_ITERATIONS = 1000
+DEFAULT_THRESHOLD = 0.2
+# 中位数变化小于该值（微秒）时视为噪声，不判定为退化
+DEFAULT_MIN_DELTA_US = 5.0
+_CONTENT_LENGTH = re.compile(rb'content-length:\s*(\d+)', re.IGNORECASE)
+
+# 基准响应与请求体，与常见接口响应大小相当
+_RESPONSE_BODY = {'code': 0, 'msg': 'success',
+                  'data': {'id': 1, 'name': '张三', 'tags': ['a', 'b', 'c'],
+                           'items': [{'id': i, 'value': f"item-{i}"} for i in range(10)]}}
+_REQUEST_BODY = {'message': '你好，请介绍一下你自己', 'user_id': 'bench', 'history': [], 'options': {'stream': False}}
+
+
+def get_benchmark_config() -> Dict:
+    """
+    读取 conf/interface_info.yaml 的 global.benchmark 配置
+    """
+    return get_config('global', 'benchmark', default={}) or {}
+
+
+class _RawSocketClient:
+    """
+    基于原始socket的keep-alive HTTP/1.1客户端，作为开销下限
+    """
+
+    def __init__(self, host: str, port: int, path: str):
+        self.sock = socket.create_connection((host, port))
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.request = (f"GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\n"
+                        f"Accept: application/json\r\n\r\n").encode('ascii')
+        self._buffer = bytearray()
+
+    def _fill(self):
+        chunk = self.sock.recv(65536)
+        if not chunk:
+            raise ConnectionError("连接已被服务端关闭")
+        self._buffer += chunk
+
+    def get(self) -> bytes:
+        """
+        发送一次请求并读取完整响应体
+        """
+        self.sock.sendall(self.request)
+        buffer = self._buffer
+        while (head_end := buffer.find(b'\r\n\r\n')) < 0:
+            self._fill()
+        match = _CONTENT_LENGTH.search(buffer, 0, head_end)
+        total = head_end + 4 + (int(match.group(1)) if match else 0)
+        while len(buffer) < total:
+            self._fill()
+        body = bytes(buffer[head_end + 4:total])
+        del buffer[:total]
+        return body
+
+    def close(self):
+        self.sock.close()
+
+
+class BenchmarkCase:
+    """
+    一个基准用例
+    """
+
+    def __init__(self, name: str, group: str, func: Callable, inner: int = 1):
+        """
+        :param name: 用例名，如 'framework.get'
+        :param group: 分组：end_to_end（经回环服务的完整请求）或 micro（单个热点函数）
+        :param func: 被测函数
+        :param inner: 每个样本内的调用次数，耗时很短的函数多次调用取平均，避免计时精度不足
+        """
+        self.name = name
+        self.group = group
+        self.func = func
+        self.inner = inner
+
+    def run(self, iterations: int, warmup: int) -> Dict:
+        """
+        执行用例
+        :return: 耗时统计（微秒/次）
+        """
+        func, inner = self.func, self.inner
+        for _ in range(warmup):
+            func()
+        samples = np.empty(iterations, dtype=np.float64)
+        perf_counter_ns = time.perf_counter_ns
+        for i in range(iterations):
+            start = perf_counter_ns()
+            for _ in range(inner):
+                func()
+            samples[i] = (perf_counter_ns() - start) / inner / 1000.0
+        p50, p90, p99 = np.percentile(samples, [50, 90, 99])
+        return {
+            'group': self.group,
+            'iterations': iterations,
+            'median_us': round(float(p50), 3),
+            'p90_us': round(float(p90), 3),
+            'p99_us': round(float(p99), 3),
+            'mean_us': round(float(samples.mean()), 3),
+            'ops_per_sec': round(1e6 / float(p50), 1) if p50 > 0 else None,
+        }
+
+
+class BenchmarkSuite:
+    """
+    请求热路径的框架开销基准
+    在本地回环模拟服务上分别用原始socket、原始requests和HTTPUtils发送相同请求，
+    三者之差即为requests本身和本框架（请求头合并、接口匹配、日志、重试/熔断、指标记录等）增加的耗时；
+    另外单独测量响应JSON解析、参数替换等热点函数
+    """
+
+    def __init__(self, iterations: int = DEFAULT_ITERATIONS, warmup: Optional[int] = None):
+        """
+        初始化基准套件
+        :param iterations: 每个用例的样本数
+        :param warmup: 预热次数，默认为样本数的10%
+        """
+        self.iterations = iterations
+        self.warmup = warmup if warmup is not None else max(iterations // 10, 10)
+
+    def _build_cases(self, server: MockServer) -> List[BenchmarkCase]:
+        from testcase.test_data_driven_example import parse_json_safely
+
+        url = f"{server.base_url}/bench/item"
+        post_url = f"{server.base_url}/bench/chat"
+        raw_socket = _RawSocketClient(server.host, server.port, '/bench/item')
+        raw_session = requests.Session()
+        framework = HTTPUtils(default_headers={'Accept': 'application/json'})
+        body_text = json.dumps(_RESPONSE_BODY, ensure_ascii=False)
+        param_text = json.dumps(_REQUEST_BODY, ensure_ascii=False)
+        chain = InterfaceChain()
+        template = {'user_id': '${user_id}', 'token': 'Bearer ${token}',
+                    'items': [{'id': '${item_id}', 'note': 'static'}] * 5}
+        context = {'user_id': 'u-1', 'token': 'abc', 'item_id': 42}
+        self._closers = [raw_socket.close, raw_session.close, framework.clear_session]
+        return [
+            BenchmarkCase('socket.get', 'end_to_end', lambda: json.loads(raw_socket.get())),
+            BenchmarkCase('requests.get', 'end_to_end', lambda: raw_session.get(url).json()),
+            BenchmarkCase('framework.get', 'end_to_end', lambda: framework.get(url)),
+            BenchmarkCase('requests.post_json', 'end_to_end',
+                          lambda: raw_session.post(post_url, json=_REQUEST_BODY).json()),
+            BenchmarkCase('framework.post_json', 'end_to_end',
+                          lambda: framework.post(post_url, json_data=_REQUEST_BODY)),
+            BenchmarkCase('headers.prepare', 'micro',
+                          lambda: framework._prepare_headers({'X-Trace': '1'}, 'token'), inner=100),
+            BenchmarkCase('interface.find', 'micro', lambda: find_interface(url, 'GET'), inner=20),
+            BenchmarkCase('json.decode', 'micro', lambda: json.loads(body_text), inner=100),
+            BenchmarkCase('params.parse_json_safely', 'micro', lambda: parse_json_safely(param_text), inner=100),
+            BenchmarkCase('chain.replace_params', 'micro', lambda: chain.replace_params(template, context), inner=100),
+            BenchmarkCase('log.request_line', 'micro',
+                          lambda: logger.info(f"发送 GET 请求到: {url}"), inner=100),
+        ]
+
+    def run(self, names: Optional[List[str]] = None) -> Dict:
+        """
+        执行基准
+        :param names: 只执行这些用例（默认全部）
+        :return: 基准结果
+        """
+        server = MockServer()
+        server.add_route('GET', '/bench/item', _RESPONSE_BODY)
+        server.add_route('POST', '/bench/chat', _RESPONSE_BODY)
+        results = {}
+        with server:
+            cases = self._build_cases(server)
+            try:
+                for case in cases:
+                    if names and case.name not in names:
+                        continue
+                    results[case.name] = case.run(self.iterations, self.warmup)
+                    logger.info(f"基准 {case.name}: 中位数 {results[case.name]['median_us']}us")
+            finally:
+                for close in self._closers:
+                    close()
+        return {
+            'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'iterations': self.iterations,
+            'results': results,
+            'overhead_us': self._overhead(results),
+        }
+
+    @staticmethod
+    def _overhead(results: Dict) -> Dict:
+        """
+        按中位数计算各层增加的耗时（微秒/请求）
+        """
+        def diff(upper, lower):
+            if upper in results and lower in results:
+                return round(results[upper]['median_us'] - results[lower]['median_us'], 3)
+            return None
+
+        return {
+            'requests_over_socket': diff('requests.get', 'socket.get'),
+            'framework_over_requests': diff('framework.get', 'requests.get'),
+            'framework_over_requests_post': diff('framework.post_json', 'requests.post_json'),
+        }
+
+
+def _baseline_path(path: Optional[str] = None) -> str:
+    path = path or get_benchmark_config().get('baseline_file') or DEFAULT_BASELINE_FILE
+    return path if os.path.isabs(path) else os.path.join(PROJECT_ROOT, path)
+
+
+def load_baseline(path: Optional[str] = None) -> Optional[Dict]:
+    """
+    读取基准基线
+    :param path: 基线文件路径，默认 global.benchmark.baseline_file
+    :return: 基线结果，文件不存在时返回None
+    """
+    path = _baseline_path(path)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_baseline(result: Dict, path: Optional[str] = None) -> str:
+    """
+    保存基准结果为基线
+    :return: 保存路径
+    """
+    path = _baseline_path(path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def compare_to_baseline(result: Dict, baseline: Dict, threshold: Optional[float] = None,
+                        min_delta_us: Optional[float] = None) -> List[Dict]:
+    """
+    与基线对比，中位数增幅超过阈值（且绝对增量超过噪声下限）的用例判定为退化
+    :param threshold: 允许的相对增幅，默认 global.benchmark.threshold（0.2即20%）
+    :param min_delta_us: 绝对增量下限（微秒），默认 global.benchmark.min_delta_us
+    :return: 退化列表，每项包含 name、baseline_us、current_us、change
+    """
+    config = get_benchmark_config()
+    threshold = threshold if threshold is not None else float(config.get('threshold', DEFAULT_THRESHOLD))
+    min_delta_us = min_delta_us if min_delta_us is not None else float(
+        config.get('min_delta_us', DEFAULT_MIN_DELTA_US))
+    regressions = []
+    for name, current in result['results'].items():
+        previous = baseline.get('results', {}).get(name)
+        if not previous or not previous.get('median_us'):
+            continue
+        baseline_us, current_us = previous['median_us'], current['median_us']
+        change = (current_us - baseline_us) / baseline_us
+        if change > threshold and current_us - baseline_us > min_delta_us:
+            regressions.append({'name': name, 'baseline_us': baseline_us, 'current_us': current_us,
+                                'change': round(change, 4)})
+    return regressions
+
+
+def format_result(result: Dict, baseline: Optional[Dict] = None) -> str:
+    """
+    生成基准结果文本
+    """
+    previous = (baseline or {}).get('results', {})
+    lines = [f"框架开销基准（{result['iterations']}次/用例，单位：微秒/次）",
+             f"{'用例':<28} {'中位数':>10} {'P90':>10} {'P99':>10} {'次/秒':>12} {'基线':>10} {'变化':>8}"]
+    for name, r in result['results'].items():
+        base = previous.get(name, {}).get('median_us')
+        change = f"{(r['median_us'] - base) / base:+.1%}" if base else '-'
+        lines.append(f"{name:<28} {r['median_us']:>10.1f} {r['p90_us']:>10.1f} {r['p99_us']:>10.1f} "
+                     f"{r['ops_per_sec'] or 0:>12.0f} {base if base is not None else '-':>10} {change:>8}")
+    overhead = result['overhead_us']
+    lines.append(f"requests相对原始socket增加: {overhead['requests_over_socket']}us/请求")
+    lines.append(f"框架相对requests增加: GET {overhead['framework_over_requests']}us/请求, "
+                 f"POST {overhead['framework_over_requests_post']}us/请求")
+    return '\n'.join(lines)
+
+
+def run_benchmark(iterations: int = DEFAULT_ITERATIONS, save: bool = False, baseline_file: Optional[str] = None,
+                  threshold: Optional[float] = None, names: Optional[List[str]] = None) -> Dict:
+    """
+    执行框架开销基准并与基线对比
+    :param iterations: 每个用例的样本数
+    :param save: 是否将本次结果保存为新基线
+    :param baseline_file: 基线文件路径
+    :param threshold: 退化阈值
+    :param names: 只执行这些用例
+    :return: 基准结果，regressions 为相对基线的退化列表
+    """
+    result = BenchmarkSuite(iterations).run(names)
+    baseline = load_baseline(baseline_file)
+    print(format_result(result, baseline))
+    result['regressions'] = compare_to_baseline(result, baseline, threshold) if baseline else []
+    for item in result['regressions']:
+        print(f"性能退化: {item['name']} 中位数 {item['baseline_us']}us -> {item['current_us']}us "
+              f"({item['change']:+.1%})")
+    if baseline is None:
+        print(f"未找到基线文件 {_baseline_path(baseline_file)}，可使用 --save-baseline 生成")
+    if save:
+        saved = {k: v for k, v in result.items() if k != 'regressions'}
+        print(f"基线已保存: {save_baseline(saved, baseline_file)}")
+    return result
@@ -1,7 +1,21 @@
+import os
 import pytest
+from common.assertion import check_slo_budgets, slo_enforced
+from execution.executor import is_parallel_worker
+from execution.results_store import ResultsStorePlugin, results_store_enabled
+from utils.compression import get_bandwidth_stats
+from utils.mock_server import MockServer
+from utils.session_pool import close_session_pool
 
 # pytest会话级前置后置钩子
 
+def pytest_configure(config):
+    """
+    注册结果库插件：记录每个用例的结果与耗时、每个请求的状态与分阶段耗时（report/results.db）
+    """
+    if results_store_enabled():
+        config.pluginmanager.register(ResultsStorePlugin(), 'results-store')
+
 @pytest.fixture(scope='session', autouse=True)
 def session_setup():
     """
@@ -9,7 +23,40 @@ def session_setup():
     """
     print('测试会话开始')
     yield
+    # 关闭便捷函数使用的共享会话，释放连接
+    close_session_pool()
+    # 输出各接口的线路字节数/解码后字节数，定位流量大的接口
+    bandwidth_report = get_bandwidth_stats().report()
+    if bandwidth_report:
+        print(bandwidth_report)
     print('测试会话结束')
 
+@pytest.fixture(scope='session')
+def mock_server():
+    """
+    本地模拟服务（以caseparams期望结果作为响应），用例中通过 mock_server.base_url 访问
+    环境变量 MOCK_SERVER_PORT 指定端口（如8688直接替代聊天网关），MOCK_SERVER_LATENCY 指定延迟分布
+    """
+    server = MockServer(port=int(os.environ.get('MOCK_SERVER_PORT') or 0),
+                        latency=os.environ.get('MOCK_SERVER_LATENCY') or None)
+    server.load_caseparams()
+    server.start()
+    yield server
+    server.stop()
+
+def pytest_sessionfinish(session, exitstatus):
+    """
+    测试会话结束时检查接口声明的SLO预算（分位数延迟/错误率/吞吐量），未满足时会话失败
+    """
+    # 并行执行时由主进程汇总各worker的样本后统一检查
+    if not slo_enforced() or is_parallel_worker():
+        return
+    violations = check_slo_budgets()
+    if violations:
+        print('SLO预算未满足:')
+        for violation in violations:
+            print(f'  - {violation}')
+        session.exitstatus = pytest.ExitCode.TESTS_FAILED
+
 # 示例用法：
-# pytest会自动调用，无需手动调用 
\ No newline at end of file
+# pytest会自动调用，无需手动调用
@@ -0,0 +1,256 @@
+# coding: utf-8
+# @Author: bgtech
+import asyncio
+import csv
+import glob
+import json
+import os
+import time
+import logging
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+from common.assertion import check_expected_result
+from common.get_caseparams import get_available_test_files, get_caseparams_dir, read_test_data
+from execution.load_runner import _parse_params, case_request
+from utils.async_http_utils import AIOHTTP_AVAILABLE, AsyncHTTPUtils
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+REPORT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'report')
+DEFAULT_CONCURRENCY = 50
+# 汇总中最多保留的失败用例详情
+MAX_FAILURES = 100
+OUTCOMES = ('passed', 'failed', 'error', 'skipped')
+
+
+class InvalidCase(ValueError):
+    """
+    无法解析的用例行，由 iter_cases 代替用例产出，执行时记为error而不中断整个文件
+    """
+
+
+def iter_cases(path: str) -> Iterator[Union[Dict, InvalidCase]]:
+    """
+    逐行读取用例文件
+    CSV/TSV/JSONL 流式读取，内存占用与文件大小无关；YAML/JSON/Excel 仍整体读取
+    :param path: 文件路径
+    :return: 用例字典迭代器，无法解析的行产出 InvalidCase
+    """
+    ext = os.path.splitext(path)[-1].lower()
+    if ext in ('.csv', '.tsv'):
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            reader = csv.DictReader(f, delimiter='\t' if ext == '.tsv' else ',')
+            while True:
+                try:
+                    row = next(reader)
+                except StopIteration:
+                    return
+                except csv.Error as e:
+                    yield InvalidCase(f"CSV解析失败: {e}")
+                    continue
+                yield row
+    elif ext == '.jsonl':
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    case = json.loads(line)
+                except ValueError as e:
+                    yield InvalidCase(f"不是合法JSON: {e}")
+                    continue
+                yield case if isinstance(case, dict) else InvalidCase(f"不是JSON对象: {line.strip()[:100]}")
+    else:
+        for case in read_test_data(path) or []:
+            yield case if isinstance(case, dict) else InvalidCase(f"用例不是字典: {case!r}")
+
+
+def resolve_case_files(files: Optional[List[str]] = None) -> List[str]:
+    """
+    解析要执行的用例文件
+    :param files: 文件路径，或caseparams中的文件名（不含扩展名）；None表示caseparams下全部文件
+    :return: 文件路径列表
+    """
+    if not files:
+        return sorted(get_available_test_files())
+    paths = []
+    for name in files:
+        if os.path.isfile(name):
+            paths.append(name)
+            continue
+        matched = sorted(glob.glob(os.path.join(get_caseparams_dir(), f"{name}.*")))
+        if not matched:
+            raise FileNotFoundError(f"找不到用例文件: {name}")
+        paths.extend(matched)
+    return paths
+
+
+class ResultSink:
+    """
+    用例结果输出：每条结果一行紧凑JSON（JSONL），边执行边写入；内存中只保留计数和前 MAX_FAILURES 条失败
+    """
+
+    def __init__(self, path: Optional[str] = None, max_failures: int = MAX_FAILURES):
+        """
+        :param path: 输出文件，默认 report/data_<时间戳>.jsonl
+        :param max_failures: 汇总中保留的失败详情条数
+        """
+        if path is None:
+            os.makedirs(REPORT_DIR, exist_ok=True)
+            path = os.path.join(REPORT_DIR, f"data_{time.strftime('%Y%m%d_%H%M%S')}.jsonl")
+        self.path = path
+        self.max_failures = max_failures
+        self.counts = {outcome: 0 for outcome in OUTCOMES}
+        self.failures: List[Dict] = []
+        self._file = open(path, 'w', encoding='utf-8')
+
+    def write(self, result: Dict):
+        self.counts[result['outcome']] += 1
+        if result['outcome'] in ('failed', 'error') and len(self.failures) < self.max_failures:
+            self.failures.append(result)
+        self._file.write(json.dumps(result, ensure_ascii=False, separators=(',', ':')) + '\n')
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+class DataDrivenRunner:
+    """
+    数据驱动执行器
+    逐行读取用例文件，在一个asyncio事件循环中以固定数量的协程并发执行，按 expected_result 断言，
+    结果逐条写入 ResultSink；不为每行用例创建pytest用例，适合数万行的用例文件
+    """
+
+    def __init__(self, concurrency: int = DEFAULT_CONCURRENCY, timeout: int = 30):
+        """
+        初始化数据驱动执行器
+        :param concurrency: 同时在途的用例数
+        :param timeout: 单个请求超时时间（秒）
+        """
+        if not AIOHTTP_AVAILABLE:
+            raise ImportError("aiohttp未安装，无法使用数据驱动执行器，请运行: pip install aiohttp")
+        self.concurrency = max(int(concurrency), 1)
+        self.timeout = timeout
+
+    @staticmethod
+    def _iter_all(paths: Iterable[str]) -> Iterator[tuple]:
+        for path in paths:
+            name = os.path.splitext(os.path.basename(path))[0]
+            row = 0
+            try:
+                for row, case in enumerate(iter_cases(path), 1):
+                    yield name, row, case
+            except Exception as e:
+                # 文件整体无法读取（或读取中途出错）时记一条错误，继续执行下一个文件
+                yield name, row + 1, InvalidCase(f"读取用例文件失败: {e}")
+
+    async def _run_case(self, client: AsyncHTTPUtils, file_name: str, row: int,
+                        case: Union[Dict, InvalidCase]) -> Dict:
+        result = {'file': file_name, 'row': row, 'case_id': None, 'outcome': 'passed',
+                  'status': None, 'elapsed_ms': None, 'message': None}
+        if isinstance(case, InvalidCase):
+            result.update(outcome='error', message=str(case))
+            return result
+        result['case_id'] = case.get('case_id')
+        try:
+            request = case_request(case)
+            expected = _parse_params(case.get('expected_result'))
+        except ValueError as e:
+            result.update(outcome='error', message=f"用例数据错误: {e}")
+            return result
+        if request is None:
+            result.update(outcome='skipped', message='用例没有url')
+            return result
+        start = time.perf_counter()
+        try:
+            response = await client.send(request['method'], request['url'], **request['kwargs'])
+        except Exception as e:
+            result.update(outcome='error', message=f"请求失败: {e}")
+            return result
+        finally:
+            result['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 2)
+        result['status'] = response.status_code
+        if response.status_code >= 400:
+            result.update(outcome='error', message=f"HTTP {response.status_code}")
+            return result
+        try:
+            data = response.json() if response.content else None
+        except ValueError:
+            result.update(outcome='error', message='返回内容不是合法JSON')
+            return result
+        message = check_expected_result(data, expected)
+        if message:
+            result.update(outcome='failed', message=message)
+        return result
+
+    async def run_async(self, paths: List[str], sink: ResultSink) -> Dict:
+        """
+        执行用例文件中的全部用例
+        :param paths: 用例文件路径
+        :param sink: 结果输出
+        :return: 汇总
+        """
+        cases = self._iter_all(paths)
+        start = time.perf_counter()
+
+        async def worker():
+            # 所有协程共享同一个迭代器，读取下一行时不会让出事件循环
+            for file_name, row, case in cases:
+                sink.write(await self._run_case(client, file_name, row, case))
+
+        async with AsyncHTTPUtils(timeout=self.timeout, limit=self.concurrency,
+                                  limit_per_host=self.concurrency) as client:
+            await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        elapsed = time.perf_counter() - start
+        total = sum(sink.counts.values())
+        return {
+            'files': [os.path.basename(path) for path in paths],
+            'total': total,
+            'summary': dict(sink.counts),
+            'duration_s': round(elapsed, 3),
+            'cases_per_second': round(total / elapsed, 2) if elapsed > 0 else 0.0,
+            'failures': sink.failures,
+            'results_file': sink.path,
+        }
+
+    def run(self, paths: List[str], sink: Optional[ResultSink] = None) -> Dict:
+        """
+        同步入口，见 run_async
+        """
+        sink = sink or ResultSink()
+        try:
+            return asyncio.run(self.run_async(paths, sink))
+        finally:
+            sink.close()
+
+
+def format_summary(summary: Dict) -> str:
+    """
+    生成数据驱动执行汇总文本
+    """
+    counts = summary['summary']
+    lines = [f"数据驱动执行完成: {summary['total']} 个用例，耗时 {summary['duration_s']:.1f}s"
+             f"（{summary['cases_per_second']} 个/秒）",
+             f"通过 {counts['passed']}，失败 {counts['failed']}，错误 {counts['error']}，跳过 {counts['skipped']}"]
+    for failure in summary['failures']:
+        lines.append(f"  {failure['outcome'].upper()} {failure['file']}#{failure['row']} "
+                     f"(case_id={failure['case_id']}): {failure['message']}")
+    lines.append(f"结果已保存: {summary['results_file']}")
+    return '\n'.join(lines)
+
+
+def run_data_driven(files: Optional[List[str]] = None, concurrency: int = DEFAULT_CONCURRENCY,
+                    timeout: int = 30, output: Optional[str] = None) -> Dict:
+    """
+    执行caseparams中的用例文件并输出汇总
+    :param files: 文件路径或caseparams中的文件名（不含扩展名），默认全部
+    :param concurrency: 同时在途的用例数
+    :param output: 结果文件路径，默认 report/data_<时间戳>.jsonl
+    :return: 汇总
+    """
+    paths = resolve_case_files(files)
+    summary = DataDrivenRunner(concurrency, timeout).run(paths, ResultSink(output))
+    print(format_summary(summary))
+    return summary
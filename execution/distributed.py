@@ -0,0 +1,521 @@
+# coding: utf-8
+# @Author: bgtech
+import hmac
+import json
+import multiprocessing
+import socket
+import threading
+import time
+import uuid
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+import requests
+
+from common.config import get_config
+from execution.executor import (WorkStealingScheduler, _worker_main, build_parallel_report, collect_nodeids,
+                                format_parallel_report, load_durations, save_durations, save_parallel_report)
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8700
+# worker超过该时间（秒）没有联系协调者视为失联，其已领取未完成的用例交给其他worker
+DEFAULT_WORKER_TIMEOUT = 600
+# worker执行任务期间发送心跳的间隔占失联判定时间的比例，长时间的用例或压测不会被判定为失联
+HEARTBEAT_FRACTION = 0.2
+# 等待协调者启动、等待其他worker就绪的轮询间隔（秒）
+POLL_INTERVAL = 1.0
+TOKEN_HEADER = 'X-Aitest-Token'
+JOB_SUITE = 'suite'
+JOB_LOAD = 'load'
+
+
+def get_distributed_config() -> Dict:
+    """
+    读取 conf/interface_info.yaml 的 global.distributed 配置
+    """
+    return get_config('global', 'distributed', default={}) or {}
+
+
+def shard_load(cases: List[Dict], workers: int, concurrency: int, rps: Optional[float], **options) -> List[Dict]:
+    """
+    把压测拆分为workers份：用例轮流分配（用例数少于worker数时每份都包含全部用例），并发数与RPS平均分配
+    :param cases: load_cases() 返回的请求列表
+    :param options: LoadRunner的其他参数（duration、client、timeout、mode、arrival）
+    :return: 每个worker的LoadRunner参数
+    """
+    shards = []
+    for index in range(workers):
+        shard_cases = cases[index::workers] if len(cases) >= workers else cases
+        shard_concurrency = concurrency // workers + (1 if index < concurrency % workers else 0)
+        shards.append({'cases': shard_cases, 'concurrency': max(shard_concurrency, 1),
+                       'rps': rps / workers if rps else None, **options})
+    return shards
+
+
+class _CoordinatorHandler(BaseHTTPRequestHandler):
+    """
+    协调者的HTTP接口：POST /api/<kind>，请求与响应均为JSON
+    """
+
+    protocol_version = 'HTTP/1.1'
+    coordinator: 'Coordinator' = None
+
+    def do_POST(self):
+        coordinator = self.coordinator
+        if coordinator.token and not hmac.compare_digest(self.headers.get(TOKEN_HEADER, ''), coordinator.token):
+            self._reply(403, {'error': 'invalid token'})
+            return
+        if not self.path.startswith('/api/'):
+            self._reply(404, {'error': f"unknown path: {self.path}"})
+            return
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            payload = json.loads(self.rfile.read(length) or b'{}')
+            reply = coordinator.handle(self.path[len('/api/'):], payload)
+        except KeyError as e:
+            self._reply(400, {'error': f"bad request: {e}"})
+            return
+        except ValueError as e:
+            self._reply(400, {'error': f"invalid json: {e}"})
+            return
+        self._reply(200, reply)
+
+    def _reply(self, status: int, body: Dict):
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logger.debug(f"协调者 {self.address_string()} {format % args}")
+
+
+class Coordinator:
+    """
+    分布式执行的协调者
+    在一个HTTP端口上等待worker注册，worker注册后领取任务并回传结果：
+    suite：pytest用例ID按 WorkStealingScheduler 逐个分发，结果与接口延迟样本汇总为一份报告；
+    load：caseparams用例、并发数与RPS平均分成workers份，全部worker就绪后同时开始压测，延迟直方图合并为一份报告
+    """
+
+    def __init__(self, workers: int, host: Optional[str] = None, port: Optional[int] = None,
+                 token: Optional[str] = None, worker_timeout: Optional[float] = None):
+        """
+        初始化协调者
+        :param workers: worker数量
+        :param host: 监听地址，默认 global.distributed.host（127.0.0.1，其他机器的worker连接时需改为0.0.0.0）
+        :param port: 监听端口，默认 global.distributed.port，0表示随机端口
+        :param token: worker需携带的共享令牌，默认 global.distributed.token
+        :param worker_timeout: worker失联判定时间（秒）
+        """
+        from common.metrics import MetricsRegistry
+
+        config = get_distributed_config()
+        self.workers = max(int(workers), 1)
+        self.host = host or config.get('host') or DEFAULT_HOST
+        self.port = int(port if port is not None else config.get('port', DEFAULT_PORT))
+        self.token = token if token is not None else (config.get('token') or None)
+        self.worker_timeout = float(worker_timeout or config.get('worker_timeout', DEFAULT_WORKER_TIMEOUT))
+        self.job: Optional[Dict] = None
+        self.registered: Dict[str, int] = {}
+        self.last_seen: Dict[int, float] = {}
+        self.finished = set()
+        self.lost = set()
+        self.metrics = MetricsRegistry()
+        # suite任务的状态
+        self.scheduler: Optional[WorkStealingScheduler] = None
+        self.nodeids: List[str] = []
+        self.results: Dict[str, Dict] = {}
+        self.in_flight: Dict[int, List[str]] = {}
+        self.worker_stats: Dict[int, Dict] = {}
+        # load任务的状态
+        self.reports: Dict[int, Dict] = {}
+        self._condition = threading.Condition()
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        host = '127.0.0.1' if self.host in ('0.0.0.0', '') else self.host
+        return f"http://{host}:{self.port}"
+
+    def start(self):
+        """
+        在后台线程中启动HTTP服务
+        """
+        handler = type('CoordinatorHandler', (_CoordinatorHandler,), {'coordinator': self})
+        self._server = ThreadingHTTPServer((self.host, self.port), handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name='coordinator', daemon=True).start()
+        logger.info(f"协调者已启动: {self.url}")
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def handle(self, kind: str, payload: Dict) -> Dict:
+        """
+        处理worker的请求
+        :param kind: register / next / result / done / load_result / heartbeat
+        :param payload: 请求体
+        :return: 响应体
+        """
+        with self._condition:
+            if kind == 'register':
+                reply = self._register(payload)
+            else:
+                worker = payload['worker_id']
+                if worker in self.lost:
+                    return {'kind': 'shutdown', 'reason': '已判定为失联，任务已交给其他worker'}
+                handler = getattr(self, f"_on_{kind}", None)
+                if handler is None:
+                    raise KeyError(kind)
+                self.last_seen[worker] = time.time()
+                reply = handler(worker, payload)
+            self._condition.notify_all()
+            return reply
+
+    def _register(self, payload: Dict) -> Dict:
+        key = payload['key']
+        if self.job is None:
+            # 协调者仍在收集用例
+            return {'kind': 'wait'}
+        if key not in self.registered:
+            if len(self.registered) >= self.workers:
+                return {'kind': 'shutdown', 'reason': 'worker数量已满'}
+            self.registered[key] = len(self.registered)
+            print(f"worker{self.registered[key]} 已连接: {payload.get('name')}")
+        worker = self.registered[key]
+        self.last_seen[worker] = time.time()
+        heartbeat = self.worker_timeout * HEARTBEAT_FRACTION
+        if self.job['kind'] == JOB_LOAD:
+            # 压测需要全部worker同时开始
+            if len(self.registered) < self.workers:
+                return {'kind': 'wait', 'worker_id': worker}
+            return {'kind': JOB_LOAD, 'worker_id': worker, 'job': self.job['shards'][worker],
+                    'heartbeat_interval': heartbeat}
+        return {'kind': JOB_SUITE, 'worker_id': worker, 'job': {'pytest_args': self.job['pytest_args']},
+                'heartbeat_interval': heartbeat}
+
+    def _on_next(self, worker: int, payload: Dict) -> Dict:
+        nodeid = self.scheduler.next(worker)
+        if nodeid is not None:
+            self.in_flight.setdefault(worker, []).append(nodeid)
+        return {'value': nodeid}
+
+    def _on_result(self, worker: int, payload: Dict) -> Dict:
+        result = payload['result']
+        result['worker'] = worker
+        self.results[result['nodeid']] = result
+        if result['nodeid'] in self.in_flight.get(worker, []):
+            self.in_flight[worker].remove(result['nodeid'])
+        stats = self.worker_stats.setdefault(worker, {'tests': 0, 'busy_seconds': 0.0})
+        stats['tests'] += 1
+        stats['busy_seconds'] += result['duration']
+        print(f"[{len(self.results)}/{len(self.nodeids)}] worker{worker} {result['outcome'].upper():<7} "
+              f"{result['nodeid']} ({result['duration']:.2f}s)")
+        return {}
+
+    def _on_heartbeat(self, worker: int, payload: Dict) -> Dict:
+        # 只需更新 last_seen（在handle中完成）
+        return {}
+
+    def _on_done(self, worker: int, payload: Dict) -> Dict:
+        self.metrics.merge_dict(payload.get('metrics') or {})
+        self.finished.add(worker)
+        return {}
+
+    def _on_load_result(self, worker: int, payload: Dict) -> Dict:
+        self.reports[worker] = payload['report']
+        self.metrics.merge_dict(payload.get('metrics') or {})
+        self.finished.add(worker)
+        print(f"worker{worker} 压测完成: {payload['report']['total']['requests']} 个请求")
+        return {}
+
+    def _reap_lost(self):
+        """
+        判定失联的worker，把其已领取未完成的用例放回队列
+        """
+        now = time.time()
+        for worker, seen in self.last_seen.items():
+            if worker in self.finished or worker in self.lost or now - seen < self.worker_timeout:
+                continue
+            self.lost.add(worker)
+            logger.warning(f"worker{worker} 超过 {self.worker_timeout:.0f}s 未响应，判定为失联")
+            for nodeid in self.in_flight.pop(worker, []):
+                self.scheduler.requeue(nodeid)
+
+    def _wait(self, complete: Callable[[], bool]):
+        with self._condition:
+            while not complete():
+                self._condition.wait(timeout=POLL_INTERVAL)
+                self._reap_lost()
+
+    def _all_workers_gone(self) -> bool:
+        gone = self.finished | self.lost
+        return len(self.registered) == self.workers and all(w in gone for w in self.registered.values())
+
+    def run_suite(self, paths: Optional[List[str]] = None, extra_args: Optional[List[str]] = None) -> Dict:
+        """
+        分布式执行pytest用例（各worker机器上需有相同版本的用例代码）
+        :param paths: 用例路径，默认testcase
+        :param extra_args: 传给pytest的其他参数
+        :return: 与并行执行结构相同的汇总报告
+        """
+        from common.assertion import check_slo_budgets, slo_enforced
+
+        pytest_args = [*(paths or ['testcase']), '-p', 'execution.conftest', '-p', 'execution.incremental',
+                       *(extra_args or [])]
+        self.nodeids = collect_nodeids(pytest_args)
+        self.scheduler = WorkStealingScheduler(self.nodeids, self.workers, load_durations())
+        self.job = {'kind': JOB_SUITE, 'pytest_args': pytest_args}
+        print(f"分布式执行: {len(self.nodeids)} 个用例，等待 {self.workers} 个worker连接 {self.url}")
+        start = time.perf_counter()
+
+        def complete():
+            registered = set(self.registered.values())
+            done = len(self.results) == len(self.nodeids) and registered <= (self.finished | self.lost)
+            return done or self._all_workers_gone()
+
+        self._wait(complete)
+        results = dict(self.results)
+        for nodeid in self.nodeids:
+            results.setdefault(nodeid, {'nodeid': nodeid, 'outcome': 'error', 'duration': 0.0,
+                                        'message': '用例未执行'})
+        save_durations(results)
+        report = build_parallel_report([results[n] for n in self.nodeids], self.worker_stats, self.scheduler,
+                                       time.perf_counter() - start)
+        report['workers'] = len(self.registered)
+        report['slo_violations'] = check_slo_budgets(self.metrics) if slo_enforced() else []
+        report['metrics'] = self.metrics.summary()
+        return report
+
+    def run_load(self, cases: List[Dict], concurrency: int = 10, rps: Optional[float] = None, **options) -> Dict:
+        """
+        分布式压测
+        :param cases: load_cases() 返回的请求列表
+        :param concurrency: 总并发数（开环模式下为总最大在途请求数）
+        :param rps: 总目标RPS
+        :param options: LoadRunner的其他参数（duration、client、timeout、mode、arrival）
+        :return: 合并后的压测报告
+        """
+        from common.assertion import check_slo_budgets
+        from execution.load_runner import merge_reports
+
+        if not cases:
+            raise ValueError("没有可用于压测的用例")
+        self.job = {'kind': JOB_LOAD, 'shards': shard_load(cases, self.workers, concurrency, rps, **options)}
+        print(f"分布式压测: {len(cases)} 个请求用例，等待 {self.workers} 个worker连接 {self.url}")
+        self._wait(self._all_workers_gone)
+        if not self.reports:
+            raise RuntimeError("没有worker完成压测")
+        report = merge_reports([self.reports[w] for w in sorted(self.reports)])
+        report['workers'] = len(self.reports)
+        report['slo_violations'] = check_slo_budgets(self.metrics)
+        return report
+
+
+class CoordinatorClient:
+    """
+    worker访问协调者的客户端
+    """
+
+    def __init__(self, url: str, token: Optional[str] = None, timeout: float = 60):
+        self.url = url.rstrip('/')
+        self.token = token
+        self.timeout = timeout
+        self._session = None
+
+    def post(self, kind: str, payload: Dict) -> Dict:
+        if self._session is None:
+            self._session = requests.Session()
+            # 协调者通常在内网，不走环境变量中的代理
+            self._session.trust_env = False
+        headers = {TOKEN_HEADER: self.token} if self.token else {}
+        response = self._session.post(f"{self.url}/api/{kind}", json=payload, headers=headers, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def close(self):
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+
+class _HTTPChannel:
+    """
+    与 multiprocessing.Pipe 接口相同的HTTP通道，worker中的 _WorkerPlugin 通过它向协调者领取用例、回传结果
+    """
+
+    _FIELDS = {'result': 'result', 'done': 'metrics'}
+
+    def __init__(self, client: CoordinatorClient, worker: int):
+        self.client = client
+        self.worker = worker
+        self._reply: Dict = {}
+
+    def send(self, message):
+        kind, payload = message
+        body = {'worker_id': self.worker}
+        if kind in self._FIELDS:
+            body[self._FIELDS[kind]] = payload
+        self._reply = self.client.post(kind, body)
+
+    def recv(self):
+        return self._reply.get('value')
+
+    def close(self):
+        self.client.close()
+
+
+class _Heartbeat:
+    """
+    worker执行任务期间在后台线程中定期向协调者发送心跳
+    用例执行或压测持续时间超过失联判定时间时，协调者仍能确认worker在线
+    """
+
+    def __init__(self, url: str, token: Optional[str], worker: int, interval: float):
+        # requests.Session不是线程安全的，心跳使用独立的客户端
+        self.client = CoordinatorClient(url, token, timeout=max(interval, 1.0))
+        self.worker = worker
+        self.interval = max(float(interval), POLL_INTERVAL)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"heartbeat-{worker}", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.client.post('heartbeat', {'worker_id': self.worker})
+            except requests.exceptions.RequestException as e:
+                logger.warning(f"worker{self.worker} 心跳发送失败: {e}")
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        self.client.close()
+
+
+def run_worker(url: str, name: Optional[str] = None, token: Optional[str] = None,
+               connect_timeout: float = 60) -> int:
+    """
+    worker入口：向协调者注册，执行领取到的任务并回传结果
+    :param url: 协调者地址，如 http://10.0.0.5:8700
+    :param name: worker名称，默认 主机名-进程号
+    :param token: 共享令牌，默认 global.distributed.token
+    :param connect_timeout: 等待协调者启动的最长时间（秒）
+    :return: 退出码
+    """
+    token = token if token is not None else (get_distributed_config().get('token') or None)
+    client = CoordinatorClient(url, token)
+    key = uuid.uuid4().hex
+    name = name or f"{socket.gethostname()}-{multiprocessing.current_process().pid}"
+    deadline = time.monotonic() + connect_timeout
+    while True:
+        try:
+            reply = client.post('register', {'key': key, 'name': name})
+        except requests.exceptions.ConnectionError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(POLL_INTERVAL)
+            continue
+        if reply['kind'] != 'wait':
+            break
+        time.sleep(POLL_INTERVAL)
+
+    if reply['kind'] == 'shutdown':
+        logger.info(f"协调者拒绝了worker {name}: {reply.get('reason')}")
+        client.close()
+        return 0
+    worker, job = reply['worker_id'], reply['job']
+    logger.info(f"worker {name} 已注册为worker{worker}，任务类型: {reply['kind']}")
+    heartbeat_interval = reply.get('heartbeat_interval') or DEFAULT_WORKER_TIMEOUT * HEARTBEAT_FRACTION
+    if reply['kind'] == JOB_SUITE:
+        with _Heartbeat(url, token, worker, heartbeat_interval):
+            _worker_main(worker, _HTTPChannel(client, worker), job['pytest_args'])
+    else:
+        from execution.load_runner import LoadRunner
+        with _Heartbeat(url, token, worker, heartbeat_interval):
+            runner = LoadRunner(**job)
+            report = runner.run()
+        client.post('load_result', {'worker_id': worker, 'report': report, 'metrics': runner.metrics.to_dict()})
+        client.close()
+    return 0
+
+
+def start_local_workers(url: str, count: int, token: Optional[str] = None) -> List[multiprocessing.Process]:
+    """
+    在本机启动worker进程（单机验证分布式执行，或充分利用协调者所在机器）
+    """
+    context = multiprocessing.get_context('spawn')
+    processes = []
+    for index in range(count):
+        process = context.Process(target=run_worker, args=(url,), kwargs={'name': f"local-{index}", 'token': token},
+                                  name=f"aitest-worker-{index}", daemon=True)
+        process.start()
+        processes.append(process)
+    return processes
+
+
+def _run_coordinator(coordinator: Coordinator, local_workers: int, job: Callable[[], Dict]) -> Dict:
+    coordinator.start()
+    processes = start_local_workers(coordinator.url, local_workers, coordinator.token)
+    try:
+        return job()
+    finally:
+        for process in processes:
+            process.join(timeout=10)
+        coordinator.stop()
+
+
+def run_distributed(workers: int, paths: Optional[List[str]] = None, extra_args: Optional[List[str]] = None,
+                    local_workers: int = 0, host: Optional[str] = None, port: Optional[int] = None) -> int:
+    """
+    作为协调者分布式执行用例并保存汇总报告
+    :param workers: worker总数（含本机worker）
+    :param local_workers: 在本机启动的worker数
+    :return: 退出码（有失败/错误或SLO预算未满足时为1）
+    """
+    coordinator = Coordinator(workers, host, port)
+    report = _run_coordinator(coordinator, local_workers, lambda: coordinator.run_suite(paths, extra_args))
+    print(format_parallel_report(report))
+    paths_saved = save_parallel_report(report, f"distributed_{time.strftime('%Y%m%d_%H%M%S')}")
+    print(f"报告已保存: {paths_saved['json']}，{paths_saved['junit']}")
+    failed = report['summary']['failed'] or report['summary']['error'] or report['slo_violations']
+    return 1 if failed else 0
+
+
+def run_distributed_load(workers: int, files: Optional[List[str]] = None, concurrency: int = 10,
+                         duration: float = 30.0, rps: Optional[float] = None, client: str = 'pool',
+                         timeout: int = 30, mode: str = 'closed', arrival: str = 'constant',
+                         local_workers: int = 0, host: Optional[str] = None, port: Optional[int] = None) -> Dict:
+    """
+    作为协调者分布式压测并输出合并后的报告
+    :param workers: worker总数（含本机worker）
+    :param concurrency: 总并发数
+    :param rps: 总目标RPS
+    :param local_workers: 在本机启动的worker数
+    :return: 压测报告
+    """
+    from execution.load_runner import format_report, load_cases, save_report
+
+    coordinator = Coordinator(workers, host, port)
+    report = _run_coordinator(coordinator, local_workers, lambda: coordinator.run_load(
+        load_cases(files), concurrency=concurrency, rps=rps, duration=duration, client=client,
+        timeout=timeout, mode=mode, arrival=arrival))
+    print(format_report(report))
+    for violation in report['slo_violations']:
+        print(f"SLO预算未满足: {violation}")
+    print(f"压测报告已保存: {save_report(report)}")
+    return report
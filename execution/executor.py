@@ -1,5 +1,27 @@
-import pytest
+import heapq
+import json
+import logging
+import multiprocessing
 import os
+import time
+import xml.etree.ElementTree as ET
+from collections import deque
+from multiprocessing.connection import wait
+from typing import Dict, List, Optional
+
+import pytest
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPORT_DIR = os.path.join(PROJECT_ROOT, 'report')
+# 各用例的历史耗时，用于最长优先调度
+DURATIONS_FILE = os.path.join(REPORT_DIR, '.durations.json')
+# worker进程中设置该环境变量（值为worker编号）
+WORKER_ENV = 'AITEST_PARALLEL_WORKER'
+# 新用例没有历史耗时时使用的估计值（秒）
+DEFAULT_DURATION = 1.0
 
 # 测试执行器
 
@@ -13,6 +35,416 @@ def run_all_tests():
     report_file = os.path.join(report_dir, 'report.html')
     pytest.main(['testcase', f'--html={report_file}', '--self-contained-html'])
 
+
+def is_parallel_worker() -> bool:
+    """
+    当前进程是否为并行执行的worker
+    """
+    return bool(os.environ.get(WORKER_ENV))
+
+
+def load_durations(path: str = DURATIONS_FILE) -> Dict[str, float]:
+    """
+    读取用例历史耗时（秒）
+    """
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        logger.warning(f"历史耗时文件无法读取，忽略: {path}")
+        return {}
+
+
+def save_durations(results: Dict[str, Dict], path: str = DURATIONS_FILE):
+    """
+    按本次结果更新用例历史耗时（与历史值取平均，平滑单次波动）
+    """
+    durations = load_durations(path)
+    for nodeid, result in results.items():
+        if result['outcome'] in ('passed', 'failed'):
+            previous = durations.get(nodeid)
+            current = result['duration']
+            durations[nodeid] = round(current if previous is None else (previous + current) / 2, 4)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(durations, f, ensure_ascii=False, indent=1, sort_keys=True)
+
+
+def _silence_terminal(config):
+    """
+    移除终端输出插件（保留其命令行选项，pytest.ini中的 -v 等参数仍然有效）
+    """
+    reporter = config.pluginmanager.getplugin('terminalreporter')
+    if reporter is not None:
+        config.pluginmanager.unregister(reporter)
+
+
+class _CollectPlugin:
+    """
+    只收集用例ID
+    """
+
+    def __init__(self):
+        self.nodeids: List[str] = []
+
+    @pytest.hookimpl(trylast=True)
+    def pytest_configure(self, config):
+        _silence_terminal(config)
+
+    def pytest_collection_finish(self, session):
+        self.nodeids = [item.nodeid for item in session.items]
+
+
+def collect_nodeids(pytest_args: List[str]) -> List[str]:
+    """
+    收集用例ID（与worker使用相同的参数，保证两边收集结果一致）
+    """
+    plugin = _CollectPlugin()
+    exit_code = pytest.main([*pytest_args, '--collect-only'], plugins=[plugin])
+    if exit_code not in (pytest.ExitCode.OK, pytest.ExitCode.NO_TESTS_COLLECTED):
+        raise RuntimeError(f"用例收集失败，退出码: {exit_code}")
+    return plugin.nodeids
+
+
+class WorkStealingScheduler:
+    """
+    最长优先 + 工作窃取调度
+    先按历史耗时从长到短把用例分配给当前负载最小的worker（LPT），各worker从自己队列的头部（最长）取用例；
+    自己的队列为空时，从剩余负载最大的worker队列尾部（最短）窃取，尽量让所有worker同时结束
+    """
+
+    def __init__(self, nodeids: List[str], workers: int, durations: Optional[Dict[str, float]] = None):
+        durations = durations or {}
+        known = [durations[n] for n in nodeids if n in durations]
+        # 新用例按历史用例的平均耗时估计
+        default = sum(known) / len(known) if known else DEFAULT_DURATION
+        self.estimates = {nodeid: durations.get(nodeid, default) for nodeid in nodeids}
+        self.queues = [deque() for _ in range(workers)]
+        self.loads = [0.0] * workers
+        heap = [(0.0, worker) for worker in range(workers)]
+        for nodeid in sorted(nodeids, key=lambda n: self.estimates[n], reverse=True):
+            load, worker = heapq.heappop(heap)
+            self.queues[worker].append(nodeid)
+            self.loads[worker] += self.estimates[nodeid]
+            heapq.heappush(heap, (load + self.estimates[nodeid], worker))
+        self.steals = 0
+
+    def next(self, worker: int) -> Optional[str]:
+        """
+        取worker的下一个用例，全部完成时返回None
+        """
+        queue = self.queues[worker]
+        if queue:
+            nodeid = queue.popleft()
+            self.loads[worker] -= self.estimates[nodeid]
+            return nodeid
+        victim = max(range(len(self.queues)), key=lambda w: self.loads[w] if self.queues[w] else -1)
+        if not self.queues[victim]:
+            return None
+        nodeid = self.queues[victim].pop()
+        self.loads[victim] -= self.estimates[nodeid]
+        self.steals += 1
+        return nodeid
+
+    def requeue(self, nodeid: str, workers: Optional[List[int]] = None):
+        """
+        worker异常退出时把它已领取但未开始执行的用例放回队列
+        :param workers: 可接收该用例的worker（仍在领取用例的worker），默认全部
+        """
+        workers = list(workers) if workers is not None else range(len(self.queues))
+        worker = min(workers, key=lambda w: self.loads[w])
+        self.queues[worker].appendleft(nodeid)
+        self.loads[worker] += self.estimates[nodeid]
+
+
+class _WorkerPlugin:
+    """
+    worker进程中的pytest插件：从主进程领取用例逐个执行，执行结果实时回传
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.current: Dict[str, Dict] = {}
+
+    @pytest.hookimpl(trylast=True)
+    def pytest_configure(self, config):
+        # 进度由主进程统一输出
+        _silence_terminal(config)
+
+    def _next(self) -> Optional[str]:
+        self.conn.send(('next', None))
+        return self.conn.recv()
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_runtestloop(self, session):
+        items = {item.nodeid: item for item in session.items}
+        nodeid = self._next()
+        while nodeid is not None:
+            # 预取下一个用例，作为nextitem传给pytest，使模块/会话级fixture不会在用例之间被拆除
+            next_nodeid = self._next()
+            item = items.get(nodeid)
+            if item is None:
+                self.conn.send(('result', {'nodeid': nodeid, 'outcome': 'error', 'duration': 0.0,
+                                           'message': 'worker中未收集到该用例'}))
+            else:
+                item.config.hook.pytest_runtest_protocol(item=item, nextitem=items.get(next_nodeid))
+            nodeid = next_nodeid
+        return True
+
+    def pytest_runtest_logreport(self, report):
+        result = self.current.setdefault(report.nodeid, {
+            'nodeid': report.nodeid, 'outcome': 'passed', 'duration': 0.0, 'message': None})
+        result['duration'] += report.duration
+        if getattr(report, 'cached', False):
+            # 增量执行中未变化的用例
+            result['outcome'] = 'cached'
+            longrepr = report.longrepr
+            result['message'] = longrepr[2] if isinstance(longrepr, tuple) else str(longrepr)
+        elif report.failed:
+            # setup/teardown阶段失败记为error
+            result['outcome'] = 'failed' if report.when == 'call' else 'error'
+            result['message'] = str(report.longrepr)
+        elif report.skipped and result['outcome'] == 'passed':
+            result['outcome'] = 'skipped'
+            longrepr = report.longrepr
+            result['message'] = longrepr[2] if isinstance(longrepr, tuple) else str(longrepr)
+        if report.when == 'teardown':
+            self.conn.send(('result', self.current.pop(report.nodeid)))
+
+    @pytest.hookimpl(trylast=True)
+    def pytest_sessionfinish(self, session):
+        from common.metrics import get_metrics
+        self.conn.send(('done', get_metrics().to_dict()))
+
+
+def _worker_main(worker: int, conn, pytest_args: List[str]):
+    """
+    worker进程入口
+    """
+    os.environ[WORKER_ENV] = str(worker)
+    os.chdir(PROJECT_ROOT)
+    try:
+        pytest.main([*pytest_args, '-p', 'no:cacheprovider'], plugins=[_WorkerPlugin(conn)])
+    finally:
+        conn.close()
+
+
+class ParallelExecutor:
+    """
+    多进程并行执行器
+    每个worker进程运行一个pytest会话，用例由主进程按 WorkStealingScheduler 分发，结果汇总为一份报告
+    """
+
+    def __init__(self, paths: Optional[List[str]] = None, workers: Optional[int] = None,
+                 extra_args: Optional[List[str]] = None):
+        """
+        初始化并行执行器
+        :param paths: 用例路径，默认testcase
+        :param workers: worker进程数，默认CPU核数
+        :param extra_args: 传给pytest的其他参数，如 ['-m', 'not slow']
+        """
+        self.paths = paths or ['testcase']
+        self.extra_args = extra_args or []
+        self.pytest_args = [*self.paths, '-p', 'execution.conftest', '-p', 'execution.incremental',
+                            *self.extra_args]
+        self.workers = workers or os.cpu_count() or 1
+
+    def run(self, nodeids: Optional[List[str]] = None) -> Dict:
+        """
+        执行用例
+        :param nodeids: 只执行这些用例，默认执行收集到的全部用例
+        :return: 汇总报告
+        """
+        from common.assertion import check_slo_budgets, slo_enforced
+        from common.metrics import MetricsRegistry
+
+        nodeids = nodeids if nodeids is not None else collect_nodeids(self.pytest_args)
+        workers = max(1, min(self.workers, len(nodeids)))
+        scheduler = WorkStealingScheduler(nodeids, workers, load_durations())
+        print(f"并行执行: {len(nodeids)} 个用例，{workers} 个worker")
+        start = time.perf_counter()
+
+        context = multiprocessing.get_context('spawn')
+        connections, processes = {}, []
+        for worker in range(workers):
+            parent_conn, child_conn = context.Pipe()
+            process = context.Process(target=_worker_main, args=(worker, child_conn, self.pytest_args),
+                                      name=f"pytest-worker-{worker}", daemon=True)
+            process.start()
+            child_conn.close()
+            connections[parent_conn] = worker
+            processes.append(process)
+
+        results: Dict[str, Dict] = {}
+        # 每个worker已领取未完成的用例：第一个正在执行，其余是预取的
+        in_flight: Dict[int, List[str]] = {worker: [] for worker in range(workers)}
+        # 已领取到None、不再领取用例的worker
+        exhausted = set()
+        requeued = set()
+        worker_stats = {worker: {'tests': 0, 'busy_seconds': 0.0} for worker in range(workers)}
+        metrics = MetricsRegistry()
+        while connections:
+            for conn in wait(list(connections)):
+                worker = connections[conn]
+                try:
+                    kind, payload = conn.recv()
+                except (EOFError, OSError):
+                    del connections[conn]
+                    processes[worker].join(timeout=10)
+                    self._on_worker_crash(worker, processes[worker].exitcode, in_flight.pop(worker, []), results,
+                                          scheduler, [w for w in connections.values() if w not in exhausted],
+                                          requeued)
+                    continue
+                if kind == 'next':
+                    nodeid = scheduler.next(worker)
+                    if nodeid is not None:
+                        in_flight[worker].append(nodeid)
+                    else:
+                        exhausted.add(worker)
+                    conn.send(nodeid)
+                elif kind == 'result':
+                    payload['worker'] = worker
+                    results[payload['nodeid']] = payload
+                    if payload['nodeid'] in in_flight[worker]:
+                        in_flight[worker].remove(payload['nodeid'])
+                    worker_stats[worker]['tests'] += 1
+                    worker_stats[worker]['busy_seconds'] += payload['duration']
+                    self._print_progress(payload, len(results), len(nodeids))
+                elif kind == 'done':
+                    metrics.merge_dict(payload)
+                    del connections[conn]
+                    conn.close()
+        for process in processes:
+            process.join(timeout=10)
+
+        for nodeid in nodeids:
+            results.setdefault(nodeid, {'nodeid': nodeid, 'outcome': 'error', 'duration': 0.0,
+                                        'message': '用例未执行'})
+        save_durations(results)
+        report = build_parallel_report([results[n] for n in nodeids], worker_stats, scheduler,
+                                       time.perf_counter() - start)
+        report['slo_violations'] = check_slo_budgets(metrics) if slo_enforced() else []
+        report['metrics'] = metrics.summary()
+        return report
+
+    @staticmethod
+    def _on_worker_crash(worker: int, exitcode: Optional[int], nodeids: List[str], results: Dict[str, Dict],
+                         scheduler: WorkStealingScheduler, active: List[int], requeued: set):
+        """
+        处理worker异常退出（段错误、os._exit、内存不足等）
+        正在执行的用例很可能就是退出原因，直接记为error，不交给其他worker以免连锁退出；
+        预取但未开始的用例交给仍在领取用例的worker，每个用例最多重新分配一次
+        :param nodeids: 该worker已领取未完成的用例，第一个正在执行
+        :param active: 仍在领取用例的worker
+        :param requeued: 已重新分配过的用例
+        """
+        for index, nodeid in enumerate(nodeids):
+            if index == 0:
+                message = f"worker {worker} 执行该用例时异常退出（退出码 {exitcode}）"
+            elif active and nodeid not in requeued:
+                requeued.add(nodeid)
+                scheduler.requeue(nodeid, active)
+                continue
+            else:
+                message = f"worker {worker} 异常退出（退出码 {exitcode}），用例未能交给其他worker执行"
+            results[nodeid] = {'nodeid': nodeid, 'outcome': 'error', 'duration': 0.0, 'message': message,
+                               'worker': worker}
+            print(f"worker{worker} 异常退出（退出码 {exitcode}）: {nodeid}")
+
+    @staticmethod
+    def _print_progress(result: Dict, done: int, total: int):
+        print(f"[{done}/{total}] worker{result['worker']} {result['outcome'].upper():<7} "
+              f"{result['nodeid']} ({result['duration']:.2f}s)")
+
+
+def build_parallel_report(results: List[Dict], worker_stats: Dict, scheduler: WorkStealingScheduler,
+                          wall_seconds: float) -> Dict:
+    """
+    汇总各worker的用例结果
+    :param results: 按收集顺序排列的用例结果
+    :param worker_stats: {worker: {'tests', 'busy_seconds'}}
+    """
+    summary = {outcome: 0 for outcome in ('passed', 'failed', 'error', 'skipped')}
+    for result in results:
+        summary[result['outcome']] = summary.get(result['outcome'], 0) + 1
+    serial_seconds = sum(r['duration'] for r in results)
+    return {
+        'created_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'workers': len(worker_stats),
+        'total': len(results),
+        'summary': summary,
+        'wall_seconds': round(wall_seconds, 3),
+        'serial_seconds': round(serial_seconds, 3),
+        'speedup': round(serial_seconds / wall_seconds, 2) if wall_seconds > 0 else None,
+        'steals': scheduler.steals,
+        'worker_stats': {str(w): {'tests': s['tests'], 'busy_seconds': round(s['busy_seconds'], 3)}
+                         for w, s in worker_stats.items()},
+        'results': results,
+    }
+
+
+def format_parallel_report(report: Dict) -> str:
+    """
+    生成并行执行汇总文本
+    """
+    summary = report['summary']
+    lines = [f"并行执行完成: {report['total']} 个用例，{report['workers']} 个worker，"
+             f"耗时 {report['wall_seconds']:.1f}s（串行合计 {report['serial_seconds']:.1f}s，加速 {report['speedup']}x，"
+             f"窃取 {report['steals']} 次）",
+             f"通过 {summary['passed']}，失败 {summary['failed']}，错误 {summary['error']}，跳过 {summary['skipped']}"
+             + (f"，缓存 {summary['cached']}" if summary.get('cached') else '')]
+    for result in report['results']:
+        if result['outcome'] in ('failed', 'error'):
+            message = (result.get('message') or '').strip().splitlines()
+            lines.append(f"  {result['outcome'].upper()} {result['nodeid']}: {message[-1] if message else ''}")
+    for violation in report.get('slo_violations', []):
+        lines.append(f"  SLO预算未满足: {violation}")
+    return '\n'.join(lines)
+
+
+def save_parallel_report(report: Dict, name: Optional[str] = None) -> Dict[str, str]:
+    """
+    保存汇总报告：JSON 与 JUnit XML（CI可直接解析）
+    :return: {'json': 路径, 'junit': 路径}
+    """
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    name = name or f"parallel_{time.strftime('%Y%m%d_%H%M%S')}"
+    json_path = os.path.join(REPORT_DIR, f"{name}.json")
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    summary = report['summary']
+    suite = ET.Element('testsuite', name='aitest', tests=str(report['total']), failures=str(summary['failed']),
+                       errors=str(summary['error']), skipped=str(summary['skipped'] + summary.get('cached', 0)),
+                       time=str(report['wall_seconds']))
+    for result in report['results']:
+        path, _, name_part = result['nodeid'].rpartition('::')
+        case = ET.SubElement(suite, 'testcase', classname=path.replace('/', '.').replace('::', '.'),
+                             name=name_part, time=f"{result['duration']:.3f}")
+        tag = {'failed': 'failure', 'error': 'error', 'skipped': 'skipped', 'cached': 'skipped'}.get(result['outcome'])
+        if tag:
+            element = ET.SubElement(case, tag, message=(result.get('message') or '').strip()[:200])
+            element.text = result.get('message') or ''
+    junit_path = os.path.join(REPORT_DIR, f"{name}.xml")
+    ET.ElementTree(suite).write(junit_path, encoding='utf-8', xml_declaration=True)
+    return {'json': json_path, 'junit': junit_path}
+
+
+def run_parallel(paths: Optional[List[str]] = None, workers: Optional[int] = None,
+                 extra_args: Optional[List[str]] = None) -> int:
+    """
+    并行执行用例并保存汇总报告
+    :return: 退出码（有失败/错误或SLO预算未满足时为1）
+    """
+    report = ParallelExecutor(paths, workers, extra_args).run()
+    print(format_parallel_report(report))
+    paths_saved = save_parallel_report(report)
+    print(f"报告已保存: {paths_saved['json']}，{paths_saved['junit']}")
+    failed = report['summary']['failed'] or report['summary']['error'] or report['slo_violations']
+    return 1 if failed else 0
+
 # 示例用法：
 # if __name__ == '__main__':
-#     run_all_tests() 
\ No newline at end of file
+#     run_all_tests()
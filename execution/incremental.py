@@ -0,0 +1,169 @@
+# coding: utf-8
+# @Author: bgtech
+import hashlib
+import json
+import os
+import time
+import logging
+from typing import Dict, Optional
+
+import pytest
+
+from common.config import get_config
+from common.get_caseparams import get_caseparams_dir
+from common.interface_config import find_interface, get_default_interface_config
+from execution.results_db import ResultsDB
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_HOURS = 24
+# 上次结果为这些状态且指纹未变化、未超过有效期的用例不再执行
+CACHEABLE_OUTCOMES = ('passed', 'skipped')
+
+# 增量执行插件：通过 -p execution.incremental 加载，始终记录结果，--incremental 时跳过未变化的用例
+
+
+def get_incremental_config() -> Dict:
+    """
+    读取 conf/interface_info.yaml 的 global.incremental 配置
+    """
+    return get_config('global', 'incremental', default={}) or {}
+
+
+def _digest(value) -> str:
+    if not isinstance(value, bytes):
+        value = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')
+    return hashlib.sha256(value).hexdigest()
+
+
+class CaseFingerprinter:
+    """
+    用例指纹：测试模块源码 + 参数化的用例数据 + 用例URL解析到的接口配置
+    非参数化的用例可能读取任意数据文件，指纹还包含整个caseparams目录和全部接口配置
+    """
+
+    def __init__(self):
+        self._file_digests: Dict[str, str] = {}
+        self._caseparams_digest = None
+        self._interfaces_digest = None
+
+    def _file_digest(self, path: str) -> str:
+        if path not in self._file_digests:
+            with open(path, 'rb') as f:
+                self._file_digests[path] = _digest(f.read())
+        return self._file_digests[path]
+
+    def _all_caseparams_digest(self) -> str:
+        if self._caseparams_digest is None:
+            directory = get_caseparams_dir()
+            files = sorted(name for name in os.listdir(directory) if os.path.isfile(os.path.join(directory, name)))
+            self._caseparams_digest = _digest([(name, self._file_digest(os.path.join(directory, name)))
+                                               for name in files])
+        return self._caseparams_digest
+
+    def _all_interfaces_digest(self) -> str:
+        if self._interfaces_digest is None:
+            self._interfaces_digest = _digest(get_default_interface_config().get_all_interfaces())
+        return self._interfaces_digest
+
+    @staticmethod
+    def _interface_of(case: Dict):
+        url, method = case.get('url'), case.get('method')
+        if not isinstance(url, str):
+            return None
+        matched = find_interface(url, method)
+        return list(matched) if matched else None
+
+    def fingerprint(self, item) -> str:
+        """
+        计算用例指纹
+        :param item: pytest用例
+        """
+        parts = [self._file_digest(str(item.path))]
+        callspec = getattr(item, 'callspec', None)
+        cases = [value for value in callspec.params.values() if isinstance(value, dict)] if callspec else []
+        if callspec:
+            parts.append(_digest(callspec.params))
+        if cases:
+            parts.extend(_digest(self._interface_of(case)) for case in cases)
+        else:
+            parts.append(self._all_caseparams_digest())
+            parts.append(self._all_interfaces_digest())
+        return _digest(parts)
+
+
+class IncrementalPlugin:
+    """
+    增量执行：指纹未变化、上次通过（或跳过）且未超过有效期的用例不执行，标记为cached
+    """
+
+    def __init__(self, config, db: Optional[ResultsDB] = None):
+        self.enabled = config.getoption('incremental')
+        ttl_hours = config.getoption('incremental_ttl')
+        if ttl_hours is None:
+            ttl_hours = float(get_incremental_config().get('ttl_hours', DEFAULT_TTL_HOURS))
+        self.ttl_seconds = ttl_hours * 3600
+        self.db = db or ResultsDB(get_incremental_config().get('results_db'))
+        self.fingerprinter = CaseFingerprinter()
+        self.fingerprints: Dict[str, str] = {}
+        self.cached: Dict[str, Dict] = {}
+        self._outcomes: Dict[str, Dict] = {}
+
+    def _is_cached(self, nodeid: str, fingerprint: str, previous: Optional[Dict]) -> bool:
+        return (previous is not None and previous['fingerprint'] == fingerprint
+                and previous['outcome'] in CACHEABLE_OUTCOMES
+                and time.time() - previous['finished_at'] < self.ttl_seconds)
+
+    @pytest.hookimpl(trylast=True)
+    def pytest_collection_modifyitems(self, session, config, items):
+        previous_results = self.db.last_results() if self.enabled else {}
+        for item in items:
+            fingerprint = self.fingerprinter.fingerprint(item)
+            self.fingerprints[item.nodeid] = fingerprint
+            previous = previous_results.get(item.nodeid)
+            if self.enabled and self._is_cached(item.nodeid, fingerprint, previous):
+                self.cached[item.nodeid] = previous
+                finished = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(previous['finished_at']))
+                item.add_marker(pytest.mark.skip(reason=f"cached: {previous['outcome']} @ {finished}"))
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_makereport(self, item, call):
+        outcome = yield
+        if item.nodeid in self.cached:
+            outcome.get_result().cached = True
+
+    def pytest_report_teststatus(self, report, config):
+        if getattr(report, 'cached', False) and report.skipped:
+            return 'cached', 'c', 'CACHED'
+        return None
+
+    def pytest_runtest_logreport(self, report):
+        if report.nodeid in self.cached or report.nodeid not in self.fingerprints:
+            return
+        result = self._outcomes.setdefault(report.nodeid, {'outcome': 'passed', 'duration': 0.0})
+        result['duration'] += report.duration
+        if report.failed:
+            result['outcome'] = 'failed' if report.when == 'call' else 'error'
+        elif report.skipped and result['outcome'] == 'passed':
+            result['outcome'] = 'skipped'
+        if report.when == 'teardown':
+            result = self._outcomes.pop(report.nodeid)
+            self.db.record(report.nodeid, self.fingerprints[report.nodeid], result['outcome'], result['duration'])
+
+    def pytest_terminal_summary(self, terminalreporter):
+        if self.enabled:
+            executed = len(self.fingerprints) - len(self.cached)
+            terminalreporter.write_line(f"增量执行: 执行 {executed} 个用例，{len(self.cached)} 个未变化的用例使用缓存结果")
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('incremental', '增量执行')
+    group.addoption('--incremental', action='store_true', default=False,
+                    help="只执行指纹变化、上次失败或结果已过期的用例，其余用例标记为cached")
+    group.addoption('--incremental-ttl', type=float, default=None,
+                    help="缓存结果的有效期（小时），默认读取 global.incremental.ttl_hours")
+
+
+def pytest_configure(config):
+    config.pluginmanager.register(IncrementalPlugin(config), 'incremental')
@@ -0,0 +1,531 @@
+# coding: utf-8
+# @Author: bgtech
+import asyncio
+import itertools
+import json
+import os
+import random
+import threading
+import time
+import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional
+
+import requests
+
+from common.assertion import check_slo_budgets
+from common.get_caseparams import get_all_test_data
+from common.interface_config import find_interface
+from common.metrics import MetricsRegistry, endpoint_name
+from utils.async_http_utils import AIOHTTP_AVAILABLE
+from utils.latency_histogram import LatencyHistogram
+from utils.rate_limiter import TokenBucket
+from utils.session_pool import DEFAULT_POOL_MAXSIZE, build_session
+
+if AIOHTTP_AVAILABLE:
+    import aiohttp
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+REPORT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'report')
+CLIENT_POOL = 'pool'
+CLIENT_ASYNC = 'async'
+MODE_CLOSED = 'closed'
+MODE_OPEN = 'open'
+ARRIVAL_CONSTANT = 'constant'
+ARRIVAL_POISSON = 'poisson'
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+def _parse_params(value) -> Dict:
+    """
+    用例参数可能是字典（YAML）或JSON字符串（CSV）
+    :raises ValueError: 不是合法的JSON对象（按空参数处理会让请求或断言失去意义）
+    """
+    if isinstance(value, dict):
+        return value
+    if not value:
+        return {}
+    try:
+        parsed = json.loads(value)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"不是合法JSON: {value!r}") from e
+    if not isinstance(parsed, dict):
+        raise ValueError(f"不是JSON对象: {value!r}")
+    return parsed
+
+
+def load_cases(files: Optional[List[str]] = None) -> List[Dict]:
+    """
+    将caseparams中的用例转换为压测请求
+    :param files: 只使用这些文件（不含扩展名），None表示全部
+    :return: 请求列表，每项包含 method、url、kwargs、endpoint
+    """
+    cases = []
+    for file_name, data in get_all_test_data().items():
+        if files and file_name not in files:
+            continue
+        for case in data:
+            try:
+                request = case_request(case)
+            except ValueError as e:
+                logger.warning(f"跳过用例 {file_name}:{case.get('case_id')}，参数{e}")
+                continue
+            if request is not None:
+                cases.append(request)
+    return cases
+
+
+def case_request(case: Dict) -> Optional[Dict]:
+    """
+    将一条用例转换为请求：GET/HEAD/DELETE 的 params 作为查询参数，其余作为JSON请求体
+    :param case: caseparams中的一行
+    :return: {'method', 'url', 'kwargs', 'endpoint'}，用例没有url时返回None
+    :raises ValueError: params 不是合法的JSON对象
+    """
+    url = case.get('url')
+    if not url or not isinstance(url, str):
+        return None
+    method = str(case.get('method') or 'GET').upper()
+    params = _parse_params(case.get('params'))
+    kwargs = {'params': params} if method in ('GET', 'HEAD', 'DELETE') else {'json': params}
+    matched = find_interface(url, method)
+    interface = matched[0] if matched else None
+    return {
+        'method': method,
+        'url': url,
+        'kwargs': kwargs,
+        'endpoint': endpoint_name(method, url, interface),
+    }
+
+
+def arrival_schedule(rps: float, arrival: str = ARRIVAL_CONSTANT, seed: Optional[int] = None) -> Iterator[float]:
+    """
+    开环压测的计划发送时间
+    :param rps: 目标RPS
+    :param arrival: constant（固定间隔）或 poisson（指数分布间隔）
+    :param seed: 随机种子（poisson）
+    :return: 相对压测开始时间的偏移（秒）序列
+    """
+    if rps <= 0:
+        raise ValueError("开环压测必须指定大于0的rps")
+    if arrival == ARRIVAL_CONSTANT:
+        for i in itertools.count():
+            yield i / rps
+    elif arrival == ARRIVAL_POISSON:
+        rng = random.Random(seed)
+        offset = 0.0
+        while True:
+            yield offset
+            offset += rng.expovariate(rps)
+    else:
+        raise ValueError(f"不支持的到达分布: {arrival}")
+
+
+class LoadClient:
+    """
+    压测专用的同步客户端
+    直接使用独立的requests会话发送，不经过 HTTPUtils 的重试、熔断、限流、缓存、录制回放、
+    逐请求日志和进程级指标，报告中的错误率与延迟即为服务端的原始表现
+    """
+
+    def __init__(self, pool_maxsize: int = DEFAULT_POOL_MAXSIZE, timeout: int = 30):
+        """
+        :param pool_maxsize: 单个主机的最大连接数（不小于并发数，避免连接被反复创建）
+        :param timeout: 单个请求超时时间（秒）
+        """
+        self.session = build_session(pool_maxsize=max(int(pool_maxsize), DEFAULT_POOL_MAXSIZE))
+        self.timeout = timeout
+
+    def send(self, method: str, url: str, **kwargs) -> int:
+        """
+        发送请求并读取完整响应体
+        :return: 响应状态码
+        :raises requests.exceptions.RequestException: 请求异常
+        """
+        with self.session.request(method, url, timeout=self.timeout, **kwargs) as response:
+            return response.status_code
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncLoadClient:
+    """
+    压测专用的aiohttp客户端，与 LoadClient 相同，不经过 AsyncHTTPUtils 的限流、逐请求日志和进程级指标
+    """
+
+    def __init__(self, limit: int = 100, timeout: int = 30):
+        """
+        :param limit: 连接池总连接数上限（单主机上限相同）
+        :param timeout: 单个请求超时时间（秒）
+        """
+        if not AIOHTTP_AVAILABLE:
+            raise ImportError("aiohttp未安装，无法使用async客户端，请运行: pip install aiohttp")
+        self.limit = max(int(limit), 1)
+        self.timeout = timeout
+        self.session = None
+
+    async def __aenter__(self):
+        # 会话必须在事件循环中创建
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit),
+            timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.session.close()
+
+    async def send(self, method: str, url: str, **kwargs) -> int:
+        """
+        发送请求并读取完整响应体
+        :return: 响应状态码
+        """
+        if kwargs.get('params') is None:
+            kwargs.pop('params', None)
+        async with self.session.request(method, url, **kwargs) as response:
+            await response.read()
+            return response.status
+
+
+class EndpointStats:
+    """
+    单个接口的压测统计
+    分位数来自各工作线程分别记录、汇总时合并的延迟直方图
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.status_codes = Counter()
+        self.histograms: List[LatencyHistogram] = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _histogram(self) -> LatencyHistogram:
+        """
+        当前线程的直方图（记录时无需跨线程加锁）
+        """
+        histogram = getattr(self._local, 'histogram', None)
+        if histogram is None:
+            histogram = self._local.histogram = LatencyHistogram()
+            with self._lock:
+                self.histograms.append(histogram)
+        return histogram
+
+    def record(self, latency_ms: float, status_code: Optional[int], error: bool):
+        """
+        记录一次请求
+        :param latency_ms: 延迟（毫秒）
+        :param status_code: 响应状态码，请求异常时为None
+        :param error: 是否失败（异常或4xx/5xx）
+        """
+        self._histogram().record(latency_ms)
+        with self._lock:
+            self.count += 1
+            self.status_codes[status_code if status_code is not None else 'exception'] += 1
+            if error:
+                self.errors += 1
+
+    def absorb(self, summary: Dict):
+        """
+        合并另一份 summary()（如其他机器上的worker的压测结果），延迟分位数由合并后的直方图计算
+        :param summary: summary() 的返回值
+        """
+        with self._lock:
+            self.count += summary['requests']
+            self.errors += summary['errors']
+            self.status_codes.update(summary.get('status_codes', {}))
+            if summary.get('histogram'):
+                self.histograms.append(LatencyHistogram.from_dict(summary['histogram']))
+
+    def summary(self, duration: float) -> Dict:
+        """
+        汇总吞吐量、错误率与延迟分位数
+        :param duration: 压测持续时间（秒）
+        """
+        with self._lock:
+            count = self.count
+            errors = self.errors
+            status_codes = dict(self.status_codes)
+            histogram = LatencyHistogram.merged(self.histograms)
+        result = {
+            'requests': count,
+            'errors': errors,
+            'error_rate': round(errors / count, 4) if count else 0.0,
+            'throughput_rps': round(count / duration, 2) if duration > 0 else 0.0,
+            'status_codes': {str(k): v for k, v in status_codes.items()},
+        }
+        if count:
+            result.update(histogram.summary(PERCENTILES))
+            result.pop('count')
+            result['histogram'] = histogram.to_dict()
+        return result
+
+
+class LoadRunner:
+    """
+    压测执行器
+    closed（闭环）：concurrency 个并发用户循环发送请求，设置 rps 时所有用户共享一个令牌桶；
+    open（开环）：按固定或泊松到达计划发送请求，与响应是否返回无关，concurrency 为最大在途请求数，
+    延迟从计划发送时间开始计算，服务端卡顿造成的排队时间会计入延迟（修正协调遗漏）。
+    请求按用例顺序轮流使用caseparams中的请求
+    """
+
+    def __init__(self, cases: List[Dict], concurrency: int = 10, duration: float = 30.0,
+                 rps: Optional[float] = None, client: str = CLIENT_POOL, timeout: int = 30,
+                 mode: str = MODE_CLOSED, arrival: str = ARRIVAL_CONSTANT, seed: Optional[int] = None):
+        """
+        初始化压测执行器
+        :param cases: load_cases() 返回的请求列表
+        :param concurrency: 并发用户数（开环模式下为最大在途请求数）
+        :param duration: 持续时间（秒）
+        :param rps: 目标总RPS，闭环模式下None表示不限速，开环模式必须指定
+        :param client: pool（线程 + 共享会话连接池）或 async（aiohttp）
+        :param timeout: 单个请求超时时间（秒）
+        :param mode: closed（闭环）或 open（开环）
+        :param arrival: 开环模式的到达分布，constant 或 poisson
+        :param seed: 泊松到达的随机种子
+        """
+        if not cases:
+            raise ValueError("没有可用于压测的用例")
+        if client not in (CLIENT_POOL, CLIENT_ASYNC):
+            raise ValueError(f"不支持的客户端类型: {client}")
+        if client == CLIENT_ASYNC and not AIOHTTP_AVAILABLE:
+            raise ImportError("aiohttp未安装，无法使用async客户端，请运行: pip install aiohttp")
+        if mode not in (MODE_CLOSED, MODE_OPEN):
+            raise ValueError(f"不支持的压测模式: {mode}")
+        if mode == MODE_OPEN and not rps:
+            raise ValueError("开环压测必须指定rps")
+        self.cases = cases
+        self.concurrency = max(int(concurrency), 1)
+        self.duration = float(duration)
+        self.rps = rps
+        self.client = client
+        self.timeout = timeout
+        self.mode = mode
+        self.arrival = arrival
+        self.seed = seed
+        self.stats: Dict[str, EndpointStats] = {case['endpoint']: EndpointStats() for case in cases}
+        # 本次压测的延迟样本，可用于 common.assertion 中的分位数/错误率/吞吐量断言
+        self.metrics = MetricsRegistry()
+        self._sequence = itertools.count()
+        self._sequence_lock = threading.Lock()
+        self._limiter = TokenBucket(rps, burst=1, name='load') if rps and mode == MODE_CLOSED else None
+
+    def _next_case(self) -> Dict:
+        with self._sequence_lock:
+            index = next(self._sequence)
+        return self.cases[index % len(self.cases)]
+
+    def run(self) -> Dict:
+        """
+        执行压测
+        :return: 压测报告
+        """
+        logger.info(f"开始压测: 模式={self.mode} 客户端={self.client} 并发={self.concurrency} "
+                    f"持续={self.duration}s 目标RPS={self.rps or '不限'} 用例数={len(self.cases)}")
+        start = time.perf_counter()
+        deadline = start + self.duration
+        if self.mode == MODE_OPEN:
+            if self.client == CLIENT_ASYNC:
+                asyncio.run(self._run_open_async(start, deadline))
+            else:
+                self._run_open_threads(start, deadline)
+        elif self.client == CLIENT_ASYNC:
+            asyncio.run(self._run_async(deadline))
+        else:
+            self._run_threads(deadline)
+        return self.build_report(time.perf_counter() - start)
+
+    def _send(self, client: LoadClient, case: Dict, start: float):
+        """
+        同步发送一个请求并记录，start为计算延迟的起点
+        """
+        status_code = None
+        try:
+            status_code = client.send(case['method'], case['url'], **case['kwargs'])
+        except requests.exceptions.RequestException as e:
+            logger.debug(f"压测请求失败: {e}")
+        self._record(case, start, status_code)
+
+    async def _send_async(self, client: AsyncLoadClient, case: Dict, start: float):
+        """
+        异步发送一个请求并记录，start为计算延迟的起点
+        """
+        status_code = None
+        try:
+            status_code = await client.send(case['method'], case['url'], **case['kwargs'])
+        except Exception as e:
+            logger.debug(f"压测请求失败: {e}")
+        self._record(case, start, status_code)
+
+    def _run_threads(self, deadline: float):
+        client = LoadClient(self.concurrency, self.timeout)
+
+        def user():
+            while time.perf_counter() < deadline:
+                if self._limiter is not None:
+                    self._limiter.acquire()
+                    if time.perf_counter() >= deadline:
+                        break
+                self._send(client, self._next_case(), time.perf_counter())
+
+        threads = [threading.Thread(target=user, name=f"load-user-{i}", daemon=True)
+                   for i in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        client.close()
+
+    async def _run_async(self, deadline: float):
+        async with AsyncLoadClient(self.concurrency, self.timeout) as client:
+            async def user():
+                while time.perf_counter() < deadline:
+                    if self._limiter is not None:
+                        await self._limiter.acquire_async()
+                        if time.perf_counter() >= deadline:
+                            break
+                    await self._send_async(client, self._next_case(), time.perf_counter())
+
+            await asyncio.gather(*(user() for _ in range(self.concurrency)))
+
+    def _run_open_threads(self, start: float, deadline: float):
+        client = LoadClient(self.concurrency, self.timeout)
+        # 工作线程全忙时请求在队列中等待，等待时间计入延迟
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='load-worker') as executor:
+            for offset in arrival_schedule(self.rps, self.arrival, self.seed):
+                intended = start + offset
+                if intended >= deadline:
+                    break
+                delay = intended - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                executor.submit(self._send, client, self._next_case(), intended)
+        client.close()
+
+    async def _run_open_async(self, start: float, deadline: float):
+        async with AsyncLoadClient(self.concurrency, self.timeout) as client:
+            # 只保留在途的任务，完成后移除，长时间压测时内存不随请求数增长
+            pending = set()
+            for offset in arrival_schedule(self.rps, self.arrival, self.seed):
+                intended = start + offset
+                if intended >= deadline:
+                    break
+                delay = intended - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                task = asyncio.ensure_future(self._send_async(client, self._next_case(), intended))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            if pending:
+                await asyncio.gather(*pending)
+
+    def _record(self, case: Dict, start: float, status_code: Optional[int]):
+        latency_ms = (time.perf_counter() - start) * 1000
+        error = status_code is None or status_code >= 400
+        self.stats[case['endpoint']].record(latency_ms, status_code, error)
+        self.metrics.record(case['endpoint'], latency_ms, error)
+
+    def build_report(self, elapsed: float) -> Dict:
+        """
+        生成压测报告
+        :param elapsed: 实际持续时间（秒）
+        """
+        total = EndpointStats()
+        for stats in self.stats.values():
+            total.count += stats.count
+            total.errors += stats.errors
+            total.status_codes.update(stats.status_codes)
+            total.histograms.extend(stats.histograms)
+        return {
+            'mode': self.mode,
+            'arrival': self.arrival if self.mode == MODE_OPEN else None,
+            'client': self.client,
+            'concurrency': self.concurrency,
+            'target_rps': self.rps,
+            'duration_s': round(elapsed, 3),
+            'total': total.summary(elapsed),
+            'endpoints': {name: stats.summary(elapsed) for name, stats in self.stats.items()},
+        }
+
+
+def merge_reports(reports: List[Dict]) -> Dict:
+    """
+    合并多个worker的压测报告：请求数、错误数、状态码相加，延迟直方图合并后重新计算分位数
+    :param reports: LoadRunner.run() 返回的报告列表（各worker同时开始压测）
+    :return: 与单机报告结构相同的汇总报告
+    """
+    if not reports:
+        raise ValueError("没有可合并的压测报告")
+    elapsed = max(report['duration_s'] for report in reports)
+    endpoints: Dict[str, EndpointStats] = {}
+    total = EndpointStats()
+    for report in reports:
+        for name, summary in report['endpoints'].items():
+            endpoints.setdefault(name, EndpointStats()).absorb(summary)
+        total.absorb(report['total'])
+    first = reports[0]
+    target_rps = [report['target_rps'] for report in reports]
+    return {
+        'mode': first['mode'],
+        'arrival': first['arrival'],
+        'client': first['client'],
+        'concurrency': sum(report['concurrency'] for report in reports),
+        'target_rps': sum(target_rps) if all(target_rps) else None,
+        'duration_s': elapsed,
+        'total': total.summary(elapsed),
+        'endpoints': {name: stats.summary(elapsed) for name, stats in endpoints.items()},
+    }
+
+
+def format_report(report: Dict) -> str:
+    """
+    生成压测报告文本
+    """
+    header = f"{'接口':<50} {'请求数':>8} {'错误率':>8} {'RPS':>9}" + ''.join(
+        f" {f'p{p:g}(ms)':>10}" for p in PERCENTILES) + f" {'max(ms)':>10}"
+    lines = [f"压测结果: 模式={report.get('mode', MODE_CLOSED)} 客户端={report['client']} 并发={report['concurrency']} "
+             f"目标RPS={report['target_rps'] or '不限'} 持续={report['duration_s']}s", header]
+    rows = list(report['endpoints'].items()) + [('总计', report['total'])]
+    for name, s in rows:
+        line = f"{name:<50} {s['requests']:>8} {s['error_rate']:>8.2%} {s['throughput_rps']:>9.2f}"
+        line += ''.join(f" {s.get(f'p{p:g}_ms') or 0:>10.2f}" for p in PERCENTILES)
+        line += f" {s.get('max_ms') or 0:>10.2f}"
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+def save_report(report: Dict, path: Optional[str] = None) -> str:
+    """
+    保存压测报告为JSON
+    :param path: 保存路径，默认 report/load_<时间戳>.json
+    :return: 保存路径
+    """
+    if path is None:
+        os.makedirs(REPORT_DIR, exist_ok=True)
+        path = os.path.join(REPORT_DIR, f"load_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def run_load(files: Optional[List[str]] = None, concurrency: int = 10, duration: float = 30.0,
+             rps: Optional[float] = None, client: str = CLIENT_POOL, timeout: int = 30,
+             mode: str = MODE_CLOSED, arrival: str = ARRIVAL_CONSTANT) -> Dict:
+    """
+    以caseparams中的用例为流量执行压测并输出报告
+    :return: 压测报告
+    """
+    runner = LoadRunner(load_cases(files), concurrency=concurrency, duration=duration,
+                        rps=rps, client=client, timeout=timeout, mode=mode, arrival=arrival)
+    report = runner.run()
+    report['slo_violations'] = check_slo_budgets(runner.metrics)
+    print(format_report(report))
+    for violation in report['slo_violations']:
+        print(f"SLO预算未满足: {violation}")
+    print(f"压测报告已保存: {save_report(report)}")
+    return report
@@ -0,0 +1,293 @@
+# coding: utf-8
+# @Author: bgtech
+import json
+import os
+import time
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from common.shared_store import get_run_id
+from execution.results_db import PROJECT_ROOT, ResultsDB
+from execution.results_store import get_results_store_config
+from utils.stats_utils import bootstrap_ratio_ci, mann_whitney_u
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASELINE_RUNS = 10
+DEFAULT_ALPHA = 0.01
+# 中位数增幅低于该比例时即使统计显著也不判定为退化
+DEFAULT_MIN_RATIO = 1.1
+DEFAULT_MIN_SAMPLES = 8
+DEFAULT_PERF_BASELINE_FILE = 'conf/perf_baseline.json'
+DEFAULT_BOOTSTRAP_RESAMPLES = 2000
+CONFIDENCE = 0.95
+# 固定随机种子，同样的数据得到同样的置信区间
+BOOTSTRAP_SEED = 0
+# 基线文件中每组最多保存的样本数，超出时按分位数压缩
+MAX_BASELINE_SAMPLES = 1000
+
+
+def holm_adjust(p_values: List[float]) -> List[float]:
+    """
+    Holm-Bonferroni 多重比较校正（同时检验多个接口时控制整体误报率）
+    :return: 与输入顺序相同的校正后p值
+    """
+    m = len(p_values)
+    adjusted = [1.0] * m
+    running = 0.0
+    for rank, index in enumerate(sorted(range(m), key=lambda i: p_values[i])):
+        running = max(running, min(1.0, (m - rank) * p_values[index]))
+        adjusted[index] = running
+    return adjusted
+
+
+def compare_latencies(current_samples: Dict[str, List[float]], baseline_samples: Dict[str, List[float]],
+                      alpha: Optional[float] = None, min_ratio: Optional[float] = None,
+                      min_samples: Optional[int] = None, resamples: Optional[int] = None) -> List[Dict]:
+    """
+    逐组对比本次与基线的延迟
+    每组做单侧 Mann-Whitney U 检验（本次是否整体偏大），p值经 Holm 校正后小于alpha、
+    且中位数增幅不低于min_ratio时判定为退化；中位数增幅的置信区间由bootstrap估计
+    :param current_samples: 本次延迟（毫秒），按接口或用例分组
+    :param baseline_samples: 基线延迟（毫秒）
+    :param alpha: 显著性水平
+    :param min_ratio: 中位数最小增幅
+    :param min_samples: 两组各自的最少样本数，不足时不检验
+    :param resamples: bootstrap重抽样次数
+    :return: 每组一项: key、current_n、baseline_n、current_p50_ms、baseline_p50_ms、ratio、ratio_ci、p_value、regressed
+    """
+    config = get_results_store_config()
+    alpha = float(alpha or config.get('alpha', DEFAULT_ALPHA))
+    min_ratio = float(min_ratio or config.get('min_ratio', DEFAULT_MIN_RATIO))
+    min_samples = int(min_samples or config.get('min_samples', DEFAULT_MIN_SAMPLES))
+    resamples = int(resamples or config.get('bootstrap_resamples', DEFAULT_BOOTSTRAP_RESAMPLES))
+
+    results = []
+    for key in sorted(current_samples):
+        samples = current_samples[key]
+        reference = baseline_samples.get(key, [])
+        result = {'key': key, 'current_n': len(samples), 'baseline_n': len(reference),
+                  'current_p50_ms': round(float(np.median(samples)), 3),
+                  'baseline_p50_ms': round(float(np.median(reference)), 3) if reference else None,
+                  'ratio': None, 'ratio_ci': None, 'p_value': None, 'regressed': False}
+        if len(samples) >= min_samples and len(reference) >= min_samples:
+            _, result['p_value'] = mann_whitney_u(samples, reference, 'greater')
+            baseline_p50 = float(np.median(reference))
+            if baseline_p50 > 0:
+                result['ratio'] = round(float(np.median(samples)) / baseline_p50, 3)
+                low, high = bootstrap_ratio_ci(samples, reference, resamples=resamples, confidence=CONFIDENCE,
+                                               seed=BOOTSTRAP_SEED)
+                result['ratio_ci'] = [round(low, 3), round(high, 3)]
+        results.append(result)
+
+    tested = [r for r in results if r['p_value'] is not None]
+    for result, adjusted in zip(tested, holm_adjust([r['p_value'] for r in tested])):
+        result['p_value'] = round(adjusted, 6)
+        result['regressed'] = adjusted < alpha and result['ratio'] is not None and result['ratio'] >= min_ratio
+    return results
+
+
+def _current_run(db: ResultsDB, run_id: Optional[str]) -> Dict:
+    current = db.get_run(run_id) if run_id else next(iter(db.recent_runs(1)), None)
+    if current is None:
+        raise ValueError(f"结果库中没有运行记录: {run_id or db.path}")
+    return current
+
+
+def _report(current: Dict, baseline: str, group_by: str, results: List[Dict], alpha: Optional[float] = None,
+            min_ratio: Optional[float] = None, **extra) -> Dict:
+    config = get_results_store_config()
+    return {
+        'run_id': current['run_id'],
+        'env': current['env'],
+        'baseline': baseline,
+        **extra,
+        'group_by': group_by,
+        'alpha': float(alpha or config.get('alpha', DEFAULT_ALPHA)),
+        'min_ratio': float(min_ratio or config.get('min_ratio', DEFAULT_MIN_RATIO)),
+        'results': results,
+        'regressions': [r for r in results if r['regressed']],
+    }
+
+
+def detect_regressions(db: Optional[ResultsDB] = None, run_id: Optional[str] = None, group_by: str = 'endpoint',
+                       baseline_runs: Optional[int] = None, alpha: Optional[float] = None,
+                       min_ratio: Optional[float] = None, min_samples: Optional[int] = None) -> Dict:
+    """
+    对比某次运行与其之前若干次运行（滚动基线）的请求延迟，找出显著变慢的接口或用例
+    :param db: 结果库，默认 global.results_store.path
+    :param run_id: 待检查的运行，默认最近一次
+    :param group_by: endpoint（按接口）或 nodeid（按用例）
+    :param baseline_runs: 基线使用的历史运行数（同一环境）
+    :param alpha: 显著性水平
+    :param min_ratio: 中位数最小增幅
+    :param min_samples: 两组各自的最少样本数，不足时不检验
+    :return: {'run_id', 'baseline', 'baseline_run_ids', 'group_by', 'alpha', 'results': [...], 'regressions': [...]}
+    """
+    config = get_results_store_config()
+    db = db or ResultsDB(config.get('path'))
+    baseline_runs = int(baseline_runs or config.get('baseline_runs', DEFAULT_BASELINE_RUNS))
+
+    current = _current_run(db, run_id)
+    baseline_ids = [run['run_id'] for run in
+                    db.recent_runs(baseline_runs, before=current['started_at'], env=current['env'])]
+    results = compare_latencies(db.request_latencies([current['run_id']], group_by),
+                                db.request_latencies(baseline_ids, group_by),
+                                alpha=alpha, min_ratio=min_ratio, min_samples=min_samples)
+    return _report(current, f"之前 {len(baseline_ids)} 次运行", group_by, results, alpha, min_ratio,
+                   baseline_run_ids=baseline_ids)
+
+
+def _baseline_path(path: Optional[str] = None) -> str:
+    path = path or get_results_store_config().get('perf_baseline') or DEFAULT_PERF_BASELINE_FILE
+    return path if os.path.isabs(path) else os.path.join(PROJECT_ROOT, path)
+
+
+def _compress(samples: List[float]) -> List[float]:
+    if len(samples) <= MAX_BASELINE_SAMPLES:
+        return [round(float(value), 3) for value in samples]
+    return [round(float(value), 3) for value in np.quantile(samples, np.linspace(0, 1, MAX_BASELINE_SAMPLES))]
+
+
+def save_perf_baseline(path: Optional[str] = None, db: Optional[ResultsDB] = None, run_id: Optional[str] = None,
+                       group_by: str = 'endpoint') -> str:
+    """
+    将某次运行的请求延迟保存为性能基线文件
+    每组最多保存 MAX_BASELINE_SAMPLES 个样本（超出时取等间隔分位数，保留分布形状）
+    :param path: 基线文件路径，默认 global.results_store.perf_baseline
+    :param run_id: 运行ID，默认最近一次
+    :return: 保存路径
+    """
+    db = db or ResultsDB(get_results_store_config().get('path'))
+    current = _current_run(db, run_id)
+    samples = db.request_latencies([current['run_id']], group_by)
+    baseline = {
+        'run_id': current['run_id'],
+        'env': current['env'],
+        'git_commit': current['git_commit'],
+        'created_at': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(current['started_at'])),
+        'group_by': group_by,
+        'samples': {key: _compress(values) for key, values in sorted(samples.items())},
+    }
+    path = _baseline_path(path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(baseline, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def load_perf_baseline(spec: Optional[str], db: ResultsDB, current: Dict,
+                       group_by: str = 'endpoint') -> Tuple[str, Dict[str, List[float]]]:
+    """
+    读取性能基线
+    :param spec: 基线文件路径；db 表示滚动基线（之前若干次运行）；db:<run_id> 表示结果库中的某次运行
+    :param current: 本次运行
+    :return: (基线描述, 分组延迟样本)
+    """
+    if spec == 'db':
+        baseline_runs = int(get_results_store_config().get('baseline_runs', DEFAULT_BASELINE_RUNS))
+        baseline_ids = [run['run_id'] for run in
+                        db.recent_runs(baseline_runs, before=current['started_at'], env=current['env'])]
+        return f"之前 {len(baseline_ids)} 次运行", db.request_latencies(baseline_ids, group_by)
+    if spec and spec.startswith('db:'):
+        run_id = spec[3:]
+        if db.get_run(run_id) is None:
+            raise ValueError(f"结果库中没有运行记录: {run_id}")
+        return f"运行 {run_id}", db.request_latencies([run_id], group_by)
+    path = _baseline_path(spec)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"性能基线文件不存在: {path}，可先使用 --update-perf-baseline 生成")
+    with open(path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline.get('group_by', 'endpoint') != group_by:
+        raise ValueError(f"性能基线按 {baseline.get('group_by')} 分组，与本次的 {group_by} 不一致")
+    if baseline.get('env') != current['env']:
+        logger.warning(f"性能基线环境 {baseline.get('env')} 与本次运行环境 {current['env']} 不一致")
+    display = os.path.relpath(path, PROJECT_ROOT) if path.startswith(PROJECT_ROOT + os.sep) else path
+    return f"文件 {display}（运行 {baseline.get('run_id')}）", baseline.get('samples', {})
+
+
+def check_perf_gate(baseline: Optional[str] = None, db: Optional[ResultsDB] = None, run_id: Optional[str] = None,
+                    group_by: str = 'endpoint') -> Dict:
+    """
+    性能门禁：对比本次运行与指定基线的请求延迟
+    :param baseline: 基线文件路径、db 或 db:<run_id>，见 load_perf_baseline
+    :param run_id: 本次运行，默认当前进程的运行ID
+    :return: 检测结果，格式同 detect_regressions
+    """
+    db = db or ResultsDB(get_results_store_config().get('path'))
+    current = _current_run(db, run_id or get_run_id())
+    label, baseline_samples = load_perf_baseline(baseline, db, current, group_by)
+    results = compare_latencies(db.request_latencies([current['run_id']], group_by), baseline_samples)
+    return _report(current, label, group_by, results)
+
+
+def format_regressions(report: Dict) -> str:
+    """
+    生成回归检测结果文本，退化的分组单独列出中位数变化与置信区间
+    """
+    label = '接口' if report['group_by'] == 'endpoint' else '用例'
+    confidence = f"{CONFIDENCE:.0%}"
+    lines = [f"回归检测: 运行 {report['run_id']}（环境 {report['env']}），基线为{report['baseline']}，"
+             f"alpha={report['alpha']}，最小增幅 {report['min_ratio']}x",
+             f"{label:<60} {'本次n':>6} {'基线n':>6} {'本次p50':>10} {'基线p50':>10} {'增幅':>7} "
+             f"{confidence + '区间':>15} {'p值':>9}"]
+    for r in report['results']:
+        ratio = f"{r['ratio']:.2f}x" if r['ratio'] is not None else '-'
+        interval = f"[{r['ratio_ci'][0]:.2f}, {r['ratio_ci'][1]:.2f}]" if r.get('ratio_ci') else '-'
+        p_value = f"{r['p_value']:.4f}" if r['p_value'] is not None else '样本不足'
+        baseline = f"{r['baseline_p50_ms']:.2f}" if r['baseline_p50_ms'] is not None else '-'
+        flag = '  <- 退化' if r['regressed'] else ''
+        lines.append(f"{r['key']:<60} {r['current_n']:>6} {r['baseline_n']:>6} {r['current_p50_ms']:>10.2f} "
+                     f"{baseline:>10} {ratio:>7} {interval:>15} {p_value:>9}{flag}")
+    if not report['results']:
+        lines.append("本次运行没有请求记录")
+    for r in report['regressions']:
+        low, high = r['ratio_ci']
+        lines.append(f"退化: {r['key']} p50 {r['baseline_p50_ms']:.2f}ms -> {r['current_p50_ms']:.2f}ms "
+                     f"({r['ratio'] - 1:+.1%}，{confidence}置信区间 {low - 1:+.1%} ~ {high - 1:+.1%}，p={r['p_value']:.4g})")
+    lines.append(f"发现 {len(report['regressions'])} 个显著变慢的{label}" if report['regressions']
+                 else f"没有显著变慢的{label}")
+    return '\n'.join(lines)
+
+
+def run_regression_check(run_id: Optional[str] = None, group_by: str = 'endpoint',
+                         baseline_runs: Optional[int] = None) -> Dict:
+    """
+    检查最近一次（或指定）运行相对滚动基线的延迟退化并输出结果
+    :return: 检测结果
+    """
+    report = detect_regressions(run_id=run_id, group_by=group_by, baseline_runs=baseline_runs)
+    print(format_regressions(report))
+    return report
+
+
+def run_perf_gate(baseline: Optional[str] = None, update: Optional[str] = None, run_id: Optional[str] = None,
+                  group_by: str = 'endpoint') -> bool:
+    """
+    用例执行结束后的性能门禁
+    :param baseline: 基线（文件路径、db 或 db:<run_id>），None表示不检查
+    :param update: 将本次运行保存为基线文件的路径，None表示不保存
+    :param run_id: 本次运行，默认当前进程的运行ID
+    :return: 是否通过（无法检查时视为不通过）
+    """
+    passed = True
+    run_id = run_id or get_run_id()
+    if baseline is not None:
+        try:
+            report = check_perf_gate(baseline, run_id=run_id, group_by=group_by)
+        except (ValueError, OSError) as e:
+            print(f"性能门禁无法执行: {e}")
+            return False
+        print(format_regressions(report))
+        passed = not report['regressions']
+    if update is not None:
+        try:
+            print(f"性能基线已保存: {save_perf_baseline(update, run_id=run_id, group_by=group_by)}")
+        except (ValueError, OSError) as e:
+            print(f"性能基线保存失败: {e}")
+            return False
+    return passed
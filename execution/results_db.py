@@ -0,0 +1,223 @@
+# coding: utf-8
+# @Author: bgtech
+import os
+import sqlite3
+import threading
+import time
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_RESULTS_DB = os.path.join(PROJECT_ROOT, 'report', 'results.db')
+
+
+class ResultsDB:
+    """
+    本地用例结果库（SQLite）
+    case_results：每个用例最近一次的执行结果及其指纹，增量执行据此判断哪些用例可以跳过；
+    runs / case_runs / requests：历次运行的环境、用例耗时与每个请求的状态和分阶段耗时，用于回归检测；
+    多个worker进程可以同时写入
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        初始化结果库
+        :param path: 数据库文件路径（相对项目根目录），默认 report/results.db
+        """
+        path = path or DEFAULT_RESULTS_DB
+        self.path = path if os.path.isabs(path) else os.path.join(PROJECT_ROOT, path)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._local = threading.local()
+        self.connection().execute("""
+            CREATE TABLE IF NOT EXISTS case_results (
+                nodeid TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                outcome TEXT NOT NULL,
+                duration REAL NOT NULL,
+                finished_at REAL NOT NULL
+            )
+        """)
+        self.connection().executescript("""
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id TEXT PRIMARY KEY,
+                started_at REAL NOT NULL,
+                finished_at REAL,
+                env TEXT,
+                host TEXT,
+                git_commit TEXT,
+                python TEXT
+            );
+            CREATE TABLE IF NOT EXISTS case_runs (
+                id INTEGER PRIMARY KEY,
+                run_id TEXT NOT NULL,
+                nodeid TEXT NOT NULL,
+                outcome TEXT NOT NULL,
+                duration REAL NOT NULL,
+                finished_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_case_runs_nodeid ON case_runs (nodeid, finished_at);
+            CREATE INDEX IF NOT EXISTS idx_case_runs_run ON case_runs (run_id);
+            CREATE TABLE IF NOT EXISTS requests (
+                id INTEGER PRIMARY KEY,
+                run_id TEXT NOT NULL,
+                nodeid TEXT,
+                endpoint TEXT NOT NULL,
+                method TEXT NOT NULL,
+                url TEXT NOT NULL,
+                status INTEGER,
+                error INTEGER NOT NULL,
+                total_ms REAL NOT NULL,
+                dns_ms REAL,
+                connect_ms REAL,
+                tls_ms REAL,
+                ttfb_ms REAL,
+                download_ms REAL,
+                reused_connection INTEGER,
+                ts REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_requests_endpoint ON requests (endpoint, run_id);
+            CREATE INDEX IF NOT EXISTS idx_requests_nodeid ON requests (nodeid, run_id);
+            CREATE INDEX IF NOT EXISTS idx_requests_run ON requests (run_id);
+        """)
+
+    def connection(self) -> sqlite3.Connection:
+        """
+        每个线程一个连接（自动提交）
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def last_result(self, nodeid: str) -> Optional[Dict]:
+        """
+        用例最近一次的结果
+        :return: {'nodeid', 'fingerprint', 'outcome', 'duration', 'finished_at'}，没有记录时返回None
+        """
+        row = self.connection().execute("SELECT * FROM case_results WHERE nodeid = ?", (nodeid,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def last_results(self) -> Dict[str, Dict]:
+        """
+        全部用例最近一次的结果
+        """
+        return {row['nodeid']: dict(row) for row in self.connection().execute("SELECT * FROM case_results")}
+
+    def record(self, nodeid: str, fingerprint: str, outcome: str, duration: float,
+               finished_at: Optional[float] = None):
+        """
+        记录用例结果（覆盖上一次）
+        :param outcome: passed / failed / error / skipped
+        """
+        self.connection().execute(
+            "INSERT OR REPLACE INTO case_results (nodeid, fingerprint, outcome, duration, finished_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (nodeid, fingerprint, outcome, duration, finished_at if finished_at is not None else time.time()))
+
+    def start_run(self, run_id: str, env: Optional[str] = None, host: Optional[str] = None,
+                  git_commit: Optional[str] = None, python: Optional[str] = None):
+        """
+        记录一次运行（并行执行的多个worker使用同一个run_id，只记录一次）
+        """
+        self.connection().execute(
+            "INSERT OR IGNORE INTO runs (run_id, started_at, env, host, git_commit, python) VALUES (?, ?, ?, ?, ?, ?)",
+            (run_id, time.time(), env, host, git_commit, python))
+
+    def finish_run(self, run_id: str):
+        self.connection().execute("UPDATE runs SET finished_at = ? WHERE run_id = ?", (time.time(), run_id))
+
+    def record_case_run(self, run_id: str, nodeid: str, outcome: str, duration: float):
+        """
+        追加一条用例执行记录
+        """
+        self.connection().execute(
+            "INSERT INTO case_runs (run_id, nodeid, outcome, duration, finished_at) VALUES (?, ?, ?, ?, ?)",
+            (run_id, nodeid, outcome, duration, time.time()))
+
+    def record_requests(self, run_id: str, records: Iterable[Tuple[Optional[str], Dict]]):
+        """
+        批量追加请求记录
+        :param records: (用例nodeid, 请求记录) 列表，请求记录见 common.metrics.notify_request
+        """
+        rows = []
+        for nodeid, record in records:
+            timing = record.get('timing') or {}
+            rows.append((run_id, nodeid, record['endpoint'], record['method'], record['url'], record['status'],
+                         1 if record['error'] else 0, timing.get('total_ms', 0.0), timing.get('dns_ms'),
+                         timing.get('connect_ms'), timing.get('tls_ms'), timing.get('ttfb_ms'),
+                         timing.get('download_ms'), 1 if timing.get('reused_connection') else 0, record['ts']))
+        if rows:
+            self.connection().executemany(
+                "INSERT INTO requests (run_id, nodeid, endpoint, method, url, status, error, total_ms, dns_ms, "
+                "connect_ms, tls_ms, ttfb_ms, download_ms, reused_connection, ts) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def get_run(self, run_id: str) -> Optional[Dict]:
+        row = self.connection().execute("SELECT * FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def recent_runs(self, limit: int = 10, before: Optional[float] = None, env: Optional[str] = None) -> List[Dict]:
+        """
+        最近的运行（按开始时间倒序）
+        :param before: 只返回在此时间之前开始的运行
+        :param env: 只返回该环境的运行
+        """
+        sql = "SELECT * FROM runs WHERE 1 = 1"
+        args = []
+        if before is not None:
+            sql += " AND started_at < ?"
+            args.append(before)
+        if env is not None:
+            sql += " AND env = ?"
+            args.append(env)
+        sql += " ORDER BY started_at DESC LIMIT ?"
+        args.append(limit)
+        return [dict(row) for row in self.connection().execute(sql, args)]
+
+    def request_latencies(self, run_ids: List[str], group_by: str = 'endpoint',
+                          include_errors: bool = False) -> Dict[str, List[float]]:
+        """
+        按接口或用例分组的请求总耗时（毫秒）
+        :param run_ids: 运行ID
+        :param group_by: endpoint 或 nodeid
+        :param include_errors: 是否包含失败的请求（失败请求的耗时通常不代表正常性能）
+        """
+        if group_by not in ('endpoint', 'nodeid'):
+            raise ValueError(f"不支持的分组方式: {group_by}")
+        if not run_ids:
+            return {}
+        placeholders = ', '.join('?' * len(run_ids))
+        sql = (f"SELECT {group_by}, total_ms FROM requests WHERE run_id IN ({placeholders}) "
+               f"AND {group_by} IS NOT NULL")
+        if not include_errors:
+            sql += " AND error = 0"
+        grouped: Dict[str, List[float]] = {}
+        for key, total_ms in self.connection().execute(sql, list(run_ids)):
+            grouped.setdefault(key, []).append(total_ms)
+        return grouped
+
+    def case_durations(self, run_ids: List[str]) -> Dict[str, List[float]]:
+        """
+        各用例的执行耗时（秒），只包含通过的执行
+        """
+        if not run_ids:
+            return {}
+        placeholders = ', '.join('?' * len(run_ids))
+        grouped: Dict[str, List[float]] = {}
+        for nodeid, duration in self.connection().execute(
+                f"SELECT nodeid, duration FROM case_runs WHERE run_id IN ({placeholders}) AND outcome = 'passed'",
+                list(run_ids)):
+            grouped.setdefault(nodeid, []).append(duration)
+        return grouped
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -0,0 +1,129 @@
+# coding: utf-8
+# @Author: bgtech
+import platform
+import socket
+import subprocess
+import threading
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import pytest
+
+from common.config import get_config
+from common.metrics import add_request_listener, remove_request_listener
+from common.shared_store import get_run_id
+from execution.results_db import PROJECT_ROOT, ResultsDB
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 请求记录攒够该数量或用例结束时批量写入
+FLUSH_SIZE = 500
+
+
+def get_results_store_config() -> Dict:
+    """
+    读取 conf/interface_info.yaml 的 global.results_store 配置
+    """
+    return get_config('global', 'results_store', default={}) or {}
+
+
+def results_store_enabled() -> bool:
+    """
+    是否记录历史结果（global.results_store.enabled，默认开启）
+    """
+    return bool(get_results_store_config().get('enabled', True))
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        output = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT, capture_output=True,
+                                text=True, timeout=5)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    if output.returncode != 0:
+        return None
+    return output.stdout.strip() or None
+
+
+def run_metadata() -> Dict:
+    """
+    本次运行的环境信息
+    """
+    from common.interface_config import get_default_interface_config
+    return {
+        'env': get_default_interface_config().get_current_env(),
+        'host': socket.gethostname(),
+        'git_commit': _git_commit(),
+        'python': platform.python_version(),
+    }
+
+
+class ResultsStorePlugin:
+    """
+    pytest插件：把每个用例的结果与耗时、用例中每个请求的状态与分阶段耗时写入结果库（report/results.db）
+    由 execution/conftest.py 注册；并行执行时各worker共享同一个run_id
+    """
+
+    def __init__(self, db: Optional[ResultsDB] = None):
+        self.db = db or ResultsDB(get_results_store_config().get('path'))
+        # 在主进程中确定run_id并写入环境变量，随后启动的worker进程继承
+        self.run_id = get_run_id()
+        self.current: Optional[str] = None
+        self.active = False
+        self._buffer: List[Tuple[Optional[str], Dict]] = []
+        self._outcomes: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def _on_request(self, record: Dict):
+        with self._lock:
+            self._buffer.append((self.current, record))
+            full = len(self._buffer) >= FLUSH_SIZE
+        if full:
+            self.flush()
+
+    def flush(self):
+        """
+        写入缓存的请求记录
+        """
+        with self._lock:
+            records, self._buffer = self._buffer, []
+        try:
+            self.db.record_requests(self.run_id, records)
+        except Exception as e:
+            logger.warning(f"请求记录写入结果库失败: {e}")
+
+    def pytest_sessionstart(self, session):
+        if session.config.option.collectonly:
+            return
+        self.active = True
+        self.db.start_run(self.run_id, **run_metadata())
+        add_request_listener(self._on_request)
+
+    def pytest_runtest_logstart(self, nodeid, location):
+        self.current = nodeid
+
+    def pytest_runtest_logreport(self, report):
+        if not self.active:
+            return
+        result = self._outcomes.setdefault(report.nodeid, {'outcome': 'passed', 'duration': 0.0})
+        result['duration'] += report.duration
+        if report.failed:
+            result['outcome'] = 'failed' if report.when == 'call' else 'error'
+        elif report.skipped and result['outcome'] == 'passed':
+            result['outcome'] = 'skipped'
+        if report.when == 'teardown':
+            result = self._outcomes.pop(report.nodeid)
+            self.db.record_case_run(self.run_id, report.nodeid, result['outcome'], result['duration'])
+            self.flush()
+            self.current = None
+
+    @pytest.hookimpl(trylast=True)
+    def pytest_sessionfinish(self, session):
+        if not self.active:
+            return
+        remove_request_listener(self._on_request)
+        # 会话级fixture等用例之外的请求，nodeid为空
+        self.flush()
+        self.db.finish_run(self.run_id)
+        self.active = False
@@ -1,10 +1,110 @@
 # coding: utf-8
 # @Author: bgtech
+import argparse
 import pytest
 import os
 import sys
 
+
+def parse_args():
+    """
+    解析命令行参数
+    """
+    parser = argparse.ArgumentParser(description="接口自动化测试执行入口")
+    parser.add_argument('--load', action='store_true', help="压测模式：以caseparams中的用例作为流量")
+    parser.add_argument('--concurrency', type=int, default=10, help="压测并发用户数（数据驱动模式下为同时在途的用例数）")
+    parser.add_argument('--rps', type=float, default=None, help="压测目标总RPS，不指定表示不限速")
+    parser.add_argument('--duration', type=float, default=30, help="压测持续时间（秒）")
+    parser.add_argument('--client', choices=['pool', 'async'], default='pool',
+                        help="压测客户端：pool（线程+共享连接池）或 async（aiohttp）")
+    parser.add_argument('--mode', choices=['closed', 'open'], default='closed',
+                        help="压测模式：closed（并发用户循环）或 open（按到达计划发送，需指定--rps）")
+    parser.add_argument('--arrival', choices=['constant', 'poisson'], default='constant',
+                        help="开环压测的到达分布")
+    parser.add_argument('--benchmark', action='store_true', help="框架开销基准模式：在本地回环服务上对比原始socket/requests")
+    parser.add_argument('--iterations', type=int, default=1000, help="基准模式每个用例的样本数")
+    parser.add_argument('--save-baseline', action='store_true', help="基准模式：将本次结果保存为基线")
+    parser.add_argument('--threshold', type=float, default=None, help="基准模式：退化阈值（相对增幅），默认读取配置")
+    parser.add_argument('--parallel', type=int, nargs='?', const=0, default=None,
+                        help="多进程并行执行用例，可指定worker数（默认CPU核数）")
+    parser.add_argument('--incremental', action='store_true',
+                        help="增量执行：跳过指纹未变化且上次通过的用例（可与--parallel同时使用）")
+    parser.add_argument('--data-driven', action='store_true',
+                        help="数据驱动模式：逐行读取caseparams用例文件，在一个事件循环中并发执行（不创建pytest用例）")
+    parser.add_argument('--coordinator', type=int, default=None, metavar='WORKERS',
+                        help="分布式执行：作为协调者等待指定数量的worker（与--load同时使用时为分布式压测）")
+    parser.add_argument('--local-workers', type=int, default=0, help="分布式执行：在本机启动的worker数")
+    parser.add_argument('--bind', default=None, help="分布式执行：协调者监听地址 host:port，默认读取配置")
+    parser.add_argument('--worker', default=None, metavar='URL', help="分布式执行：作为worker连接协调者，如 http://10.0.0.5:8700")
+    parser.add_argument('--regressions', action='store_true',
+                        help="回归检测：对比最近一次运行与之前若干次运行的请求延迟（Mann-Whitney U检验）")
+    parser.add_argument('--group-by', choices=['endpoint', 'nodeid'], default='endpoint',
+                        help="回归检测按接口或按用例分组")
+    parser.add_argument('--run-id', default=None, help="回归检测：待检查的运行，默认最近一次")
+    parser.add_argument('--baseline-runs', type=int, default=None, help="回归检测：基线使用的历史运行数，默认读取配置")
+    parser.add_argument('--perf-baseline', nargs='?', const='', default=None, metavar='BASELINE',
+                        help="性能门禁：执行用例后对比接口延迟，基线为文件路径（默认读取配置）、"
+                             "db（之前若干次运行）或 db:<run_id>，显著变慢时退出码为1")
+    parser.add_argument('--update-perf-baseline', nargs='?', const='', default=None, metavar='FILE',
+                        help="执行用例后将本次接口延迟保存为性能基线文件（默认读取配置）")
+    parser.add_argument('--files', nargs='*', default=None,
+                        help="只使用这些caseparams文件（不含扩展名，数据驱动模式下也可以是文件路径），默认全部")
+    return parser.parse_args()
+
+
+def apply_perf_gate(args, exit_code: int) -> int:
+    """
+    用例执行结束后的性能门禁（--perf-baseline / --update-perf-baseline）
+    :param exit_code: 用例执行的退出码
+    :return: 最终退出码，用例失败或接口延迟显著退化时非0
+    """
+    if args.perf_baseline is None and args.update_perf_baseline is None:
+        return exit_code
+    from execution.regression import run_perf_gate
+    passed = run_perf_gate(baseline=args.perf_baseline, update=args.update_perf_baseline, group_by=args.group_by)
+    return exit_code or (0 if passed else 1)
+
+
 if __name__ == "__main__":
+    args = parse_args()
+    if args.worker:
+        from execution.distributed import run_worker
+        sys.exit(run_worker(args.worker))
+    if args.coordinator:
+        from execution.distributed import run_distributed, run_distributed_load
+        host, _, port = (args.bind or '').rpartition(':')
+        bind = {'host': host or None, 'port': int(port) if port else None}
+        if args.load:
+            report = run_distributed_load(args.coordinator, files=args.files, concurrency=args.concurrency,
+                                          duration=args.duration, rps=args.rps, client=args.client, mode=args.mode,
+                                          arrival=args.arrival, local_workers=args.local_workers, **bind)
+            sys.exit(0 if report['total']['requests'] and not report['slo_violations'] else 1)
+        sys.exit(run_distributed(args.coordinator, ['testcase'], local_workers=args.local_workers,
+                                 extra_args=['--incremental'] if args.incremental else None, **bind))
+    if args.regressions:
+        from execution.regression import run_regression_check
+        report = run_regression_check(run_id=args.run_id, group_by=args.group_by, baseline_runs=args.baseline_runs)
+        sys.exit(1 if report['regressions'] else 0)
+    if args.data_driven:
+        from execution.data_runner import run_data_driven
+        summary = run_data_driven(files=args.files, concurrency=args.concurrency)
+        sys.exit(1 if summary['summary']['failed'] or summary['summary']['error'] else 0)
+    if args.load:
+        from execution.load_runner import run_load
+        report = run_load(files=args.files, concurrency=args.concurrency, duration=args.duration,
+                          rps=args.rps, client=args.client, mode=args.mode, arrival=args.arrival)
+        sys.exit(0 if report['total']['requests'] and not report['slo_violations'] else 1)
+    if args.benchmark:
+        from execution.benchmark import run_benchmark
+        result = run_benchmark(iterations=args.iterations, save=args.save_baseline, threshold=args.threshold)
+        sys.exit(1 if result['regressions'] else 0)
+    
+    if args.parallel is not None:
+        from execution.executor import run_parallel
+        exit_code = run_parallel(['testcase'], workers=args.parallel or None,
+                                 extra_args=['--incremental'] if args.incremental else None)
+        sys.exit(apply_perf_gate(args, exit_code))
+    
     # 确保report目录存在
     report_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'report')
     if not os.path.exists(report_dir):
@@ -21,7 +121,11 @@ if __name__ == "__main__":
         '-s',
         "-v",  # 详细输出
         "--tb=short",  # 简短的错误回溯
+        "-p", "execution.conftest",  # 加载会话级钩子（共享会话清理等）
+        "-p", "execution.incremental",  # 记录用例指纹与结果，供增量执行使用
     ]
+    if args.incremental:
+        pytest_args.append("--incremental")
     
     # 检查是否安装了pytest-html插件
     try:
@@ -45,4 +149,4 @@ if __name__ == "__main__":
     else:
         print(f"测试执行失败，退出码: {exit_code}")
     
-    sys.exit(exit_code)
\ No newline at end of file
+    sys.exit(apply_perf_gate(args, exit_code))
\ No newline at end of file
@@ -0,0 +1,45 @@
+# coding: utf-8
+# @Author: bgtech
+import pytest
+from common.assertion import assert_latency_percentile, assert_response_time
+from common.metrics import MetricsRegistry
+from utils.http_utils import HTTPUtils
+from utils.mock_server import MockServer
+
+pytestmark = pytest.mark.unit
+
+
+@pytest.fixture(scope='module')
+def server():
+    server = MockServer()
+    server.add_route('GET', '/users/1', body={'id': 1})
+    server.start()
+    yield server
+    server.stop()
+
+
+def test_response_time_from_response_timing(server):
+    client = HTTPUtils(cache=None)
+    response = client._make_request('GET', f"{server.base_url}/users/1")
+    assert_response_time(response, 5000)
+    assert_response_time(client.last_timing, 5000)
+    with pytest.raises(AssertionError, match='响应时间'):
+        assert_response_time({'response_time': 120}, 100)
+
+
+def test_json_data_does_not_fall_back_to_last_request(server):
+    data = HTTPUtils(cache=None).get(f"{server.base_url}/users/1")
+    assert data == {'id': 1}
+    with pytest.raises(AssertionError, match='无法获取响应时间'):
+        assert_response_time(data, 5000)
+
+
+def test_latency_percentile_requires_max_ms():
+    metrics = MetricsRegistry()
+    for latency_ms in range(1, 101):
+        metrics.record('GET host/users', latency_ms)
+    assert_latency_percentile('GET host/users', 99, 100, metrics=metrics)
+    with pytest.raises(AssertionError, match='p99'):
+        assert_latency_percentile('GET host/users', p=99, max_ms=50, metrics=metrics)
+    with pytest.raises(TypeError):
+        assert_latency_percentile('GET host/users', p=99, metrics=metrics)
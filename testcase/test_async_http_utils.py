@@ -0,0 +1,91 @@
+# coding: utf-8
+# @Author: bgtech
+import asyncio
+import socket
+import time
+import aiohttp
+import pytest
+from utils.async_http_utils import AsyncHTTPUtils, async_batch_request, run_sync
+from utils.mock_server import MockServer
+
+pytestmark = pytest.mark.unit
+
+
+@pytest.fixture(scope='module')
+def server():
+    server = MockServer()
+    server.add_route('GET', '/slow', body={'kind': 'slow'}, latency=200)
+    server.add_route('GET', '/fast', body={'kind': 'fast'})
+    server.add_route('GET', '/missing', body={'code': 404}, status=404)
+    server.add_route('POST', '/echo', body={'kind': 'post'})
+    server.start()
+    yield server
+    server.stop()
+
+
+def _closed_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@pytest.mark.parametrize('limit_per_host, minimum, maximum', [(2, 0.6, 1.5), (10, 0.2, 0.55)])
+def test_limit_per_host_bounds_in_flight_requests(server, limit_per_host, minimum, maximum):
+    async def main():
+        async with AsyncHTTPUtils(base_url=server.base_url, limit_per_host=limit_per_host) as client:
+            start = time.perf_counter()
+            results = await asyncio.gather(*(client.get('/slow') for _ in range(6)))
+            return results, time.perf_counter() - start
+
+    results, elapsed = asyncio.run(main())
+    assert results == [{'kind': 'slow'}] * 6
+    # 每个请求200ms：并发上限2时分3批完成，上限10时一批完成
+    assert minimum <= elapsed < maximum
+
+
+def test_batch_keeps_input_order_and_reports_errors(server):
+    results = async_batch_request([
+        {'method': 'GET', 'url': '/slow'},
+        {'method': 'GET', 'url': '/fast'},
+        {'method': 'GET', 'url': '/missing'},
+        {'method': 'POST', 'url': '/echo', 'json_data': {'a': 1}},
+        {'method': 'GET', 'url': f"http://127.0.0.1:{_closed_port()}/down"},
+    ], base_url=server.base_url, timeout=5)
+
+    assert [r['index'] for r in results] == [0, 1, 2, 3, 4]
+    assert [r['data'] for r in results[:2]] == [{'kind': 'slow'}, {'kind': 'fast'}]
+    assert results[2]['status_code'] == 404 and results[2]['error'] == 'HTTP 404'
+    assert results[3]['data'] == {'kind': 'post'} and results[3]['error'] is None
+    assert results[4]['status_code'] is None and results[4]['error'].startswith('ClientConnectorError')
+    assert results[0]['timing']['total_ms'] >= 200
+
+
+def test_http_errors_propagate_from_helpers(server):
+    async def main():
+        async with AsyncHTTPUtils(base_url=server.base_url) as client:
+            await client.get('/missing')
+
+    with pytest.raises(aiohttp.ClientResponseError) as info:
+        run_sync(main())
+    assert info.value.status == 404
+
+
+def test_run_sync_inside_running_event_loop(server):
+    async def fetch():
+        async with AsyncHTTPUtils(base_url=server.base_url) as client:
+            return await client.get('/fast')
+
+    async def outer():
+        # 已有运行中的事件循环时在独立线程中执行
+        return run_sync(fetch())
+
+    assert asyncio.run(outer()) == {'kind': 'fast'}
+
+    async def failing():
+        raise ValueError('boom')
+
+    async def outer_failing():
+        run_sync(failing())
+
+    with pytest.raises(ValueError, match='boom'):
+        asyncio.run(outer_failing())
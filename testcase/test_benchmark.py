@@ -0,0 +1,20 @@
+# coding: utf-8
+# @Author: bgtech
+import pytest
+from execution.benchmark import compare_to_baseline, format_result, load_baseline, BenchmarkSuite
+from common.log import info
+
+# 默认不执行，使用 pytest -m benchmark 运行
+pytestmark = pytest.mark.benchmark
+
+
+def test_framework_overhead():
+    baseline = load_baseline()
+    if baseline is None:
+        pytest.skip("未找到基线文件，请先执行: python run.py --benchmark --save-baseline")
+    result = BenchmarkSuite(iterations=baseline.get('iterations', 1000)).run()
+    info(format_result(result, baseline))
+
+    regressions = compare_to_baseline(result, baseline)
+    assert not regressions, "性能退化: " + "; ".join(
+        f"{r['name']} {r['baseline_us']}us -> {r['current_us']}us ({r['change']:+.1%})" for r in regressions)
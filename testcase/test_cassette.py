@@ -0,0 +1,98 @@
+# coding: utf-8
+# @Author: bgtech
+import os
+import pytest
+import requests
+from common.metrics import endpoint_name, get_metrics
+from utils.cassette import Cassette, CassetteMiss, MODE_RECORD, MODE_REPLAY
+from utils.http_utils import HTTPUtils
+from utils.mock_server import MockServer
+
+pytestmark = pytest.mark.unit
+
+BINARY_BODY = bytes(range(256)) * 8
+LARGE_JSON = {'messages': [{'role': 'user', 'content': '你好' * 400}]}
+
+
+@pytest.fixture()
+def recorded(tmp_path):
+    """
+    在本地模拟服务上录制文本、二进制、gzip压缩请求体的请求，返回 (录制文件, 服务地址)
+    """
+    path = str(tmp_path / 'cassette.jsonl')
+    server = MockServer()
+    server.add_route('POST', '/text', body={'kind': 'text'})
+    server.add_route('POST', '/binary', body=b'\x89PNG\r\n\x1a\n\xff\x00')
+    server.add_route('POST', '/gzip', body={'kind': 'gzip'})
+    server.start()
+    try:
+        client = HTTPUtils(cassette=Cassette(path, MODE_RECORD), cache=None, compress='')
+        client.post(f"{server.base_url}/text", json_data={'b': 2, 'a': 1})
+        client._make_request('POST', f"{server.base_url}/binary", data=BINARY_BODY)
+        HTTPUtils(cassette=Cassette(path, MODE_RECORD), cache=None, compress='gzip').post(
+            f"{server.base_url}/gzip", json_data=LARGE_JSON)
+        base_url = server.base_url
+    finally:
+        server.stop()
+    return path, base_url
+
+
+def test_replay_json_body_ignores_key_order(recorded):
+    path, base_url = recorded
+    client = HTTPUtils(cassette=Cassette(path, MODE_REPLAY), cache=None, compress='')
+    assert client.post(f"{base_url}/text", json_data={'a': 1, 'b': 2}) == {'kind': 'text'}
+
+
+def test_replay_binary_request_and_response(recorded):
+    path, base_url = recorded
+    client = HTTPUtils(cassette=Cassette(path, MODE_REPLAY), cache=None, compress='')
+    response = client._make_request('POST', f"{base_url}/binary", data=BINARY_BODY)
+    assert response.content == b'\x89PNG\r\n\x1a\n\xff\x00'
+
+
+def test_replay_gzip_compressed_body(recorded):
+    path, base_url = recorded
+    client = HTTPUtils(cassette=Cassette(path, MODE_REPLAY), cache=None, compress='gzip')
+    assert client.post(f"{base_url}/gzip", json_data=LARGE_JSON) == {'kind': 'gzip'}
+
+
+def test_replay_miss_for_different_body(recorded):
+    path, base_url = recorded
+    client = HTTPUtils(cassette=Cassette(path, MODE_REPLAY), cache=None, compress='')
+    with pytest.raises(CassetteMiss):
+        client._make_request('POST', f"{base_url}/binary", data=BINARY_BODY[:-1])
+
+
+def test_mock_server_serves_recorded_gzip_body(recorded):
+    path, _ = recorded
+    server = MockServer()
+    assert server.load_cassette(path) == 3
+    server.start()
+    try:
+        client = HTTPUtils(cassette=None, cache=None, compress='gzip')
+        assert client.post(f"{server.base_url}/gzip", json_data=LARGE_JSON) == {'kind': 'gzip'}
+    finally:
+        server.stop()
+
+
+def test_replayed_response_is_not_recorded_as_request(recorded):
+    path, base_url = recorded
+    client = HTTPUtils(cassette=Cassette(path, MODE_REPLAY), cache=None, compress='')
+    url = f"{base_url}/binary"
+    samples = get_metrics().get(endpoint_name('POST', url))
+    before = samples.count if samples else 0
+    response = client._make_request('POST', url, data=BINARY_BODY)
+    assert response.replayed and response.timing is None
+    assert response.recorded_timing['total_ms'] > 0
+    samples = get_metrics().get(endpoint_name('POST', url))
+    assert (samples.count if samples else 0) == before
+
+
+def test_stream_request_body_is_not_recorded(tmp_path):
+    path = str(tmp_path / 'cassette.jsonl')
+    response = requests.Response()
+    response.status_code = 200
+    response._content = b'{}'
+    response.request = requests.Request('POST', 'http://host/upload', data=iter([b'chunk'])).prepare()
+    Cassette(path, MODE_RECORD).record(response)
+    assert not os.path.exists(path)
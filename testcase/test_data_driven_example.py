@@ -13,7 +13,7 @@ from common.get_caseparams import (
     get_yaml_test_data,
     load_caseparams_by_type
 )
-from utils.http_utils import http_get, http_post
+from utils.http_utils import http_get, http_post, http_batch
 from common.log import info, error
 
 def parse_json_safely(json_str):
@@ -74,41 +74,59 @@ class TestDataDrivenExample:
         """测试所有文件的数据驱动"""
         for file_name, data in all_test_data.items():
             info(f"测试文件: {file_name}")
-            for case in data:
-                self._execute_test_case(case)
+            self._execute_test_cases(data)
     
     def test_csv_data_driven(self):
         """测试CSV数据驱动"""
-        for case in csv_test_data:
-            self._execute_test_case(case)
+        self._execute_test_cases(csv_test_data)
     
     def test_yaml_data_driven(self):
         """测试YAML数据驱动"""
-        for case in yaml_test_data:
-            self._execute_test_case(case)
+        self._execute_test_cases(yaml_test_data)
     
-    def _execute_test_case(self, case):
-        """执行单个测试用例"""
+    def _execute_test_cases(self, cases):
+        """并发执行一批测试用例，再按用例顺序逐条断言"""
+        specs = []
+        runnable = []
+        unsupported = []
+        for case in cases:
+            case_id = case.get('case_id', 'unknown')
+            url = case.get('url', '')
+            method = case.get('method', 'GET').upper()
+            params = parse_json_safely(case.get('params', '{}'))
+            
+            info(f"准备用例: {case_id} - {case.get('description', 'no description')}")
+            info(f"请求地址: {url}")
+            info(f"请求参数: {params}")
+            
+            if method == 'GET':
+                specs.append({'method': 'GET', 'url': url, 'params': params})
+            elif method == 'POST':
+                specs.append({'method': 'POST', 'url': url, 'json_data': params})
+            else:
+                error(f"暂不支持的请求方式: {method}")
+                unsupported.append(case_id)
+                continue
+            runnable.append(case)
+        
+        results = http_batch(specs)
+        for case, result in zip(runnable, results):
+            self._assert_case_result(case, result)
+        if unsupported:
+            pytest.skip(f"暂不支持的请求方式: {unsupported}")
+    
+    def _assert_case_result(self, case, result):
+        """断言单个用例的执行结果"""
         case_id = case.get('case_id', 'unknown')
         description = case.get('description', 'no description')
-        url = case.get('url', '')
-        method = case.get('method', 'GET').upper()
-        params = parse_json_safely(case.get('params', '{}'))
         expected = parse_json_safely(case.get('expected_result', '{}'))
         
-        info(f"执行用例: {case_id} - {description}")
-        info(f"请求地址: {url}")
-        info(f"请求参数: {params}")
+        info(f"执行用例: {case_id} - {description}，耗时: {result['elapsed_ms']:.1f}ms")
         
         try:
-            if method == 'GET':
-                resp = http_get(url, params=params)
-            elif method == 'POST':
-                resp = http_post(url, json_data=params)
-            else:
-                error(f"暂不支持的请求方式: {method}")
-                pytest.skip("暂不支持的请求方式")
-            
+            if result['error']:
+                raise RuntimeError(result['error'])
+            resp = result['data']
             info(f"接口返回: {resp}")
             
             # 断言：预期内容应包含在返回内容中
@@ -0,0 +1,71 @@
+# coding: utf-8
+# @Author: bgtech
+import csv
+import json
+import pytest
+from execution.data_runner import DataDrivenRunner, ResultSink, iter_cases, InvalidCase
+from utils.mock_server import MockServer
+
+pytestmark = pytest.mark.unit
+
+
+@pytest.fixture(scope='module')
+def server():
+    server = MockServer()
+    server.add_route('POST', '/chat', body={'code': 0, 'msg': 'ok'})
+    server.add_route('GET', '/users', body={'code': 0, 'total': 2})
+    server.start()
+    yield server
+    server.stop()
+
+
+def _run(paths, tmp_path):
+    summary = DataDrivenRunner(concurrency=4, timeout=5).run(paths, ResultSink(str(tmp_path / 'results.jsonl')))
+    with open(summary['results_file'], 'r', encoding='utf-8') as f:
+        results = {(r['file'], r['row']): r for r in map(json.loads, f)}
+    return summary, results
+
+
+def test_jsonl_rows_are_asserted_and_bad_rows_do_not_abort(server, tmp_path):
+    path = tmp_path / 'cases.jsonl'
+    rows = [
+        json.dumps({'case_id': 1, 'url': f"{server.base_url}/chat", 'method': 'POST',
+                    'params': {'q': 'hi'}, 'expected_result': {'code': 0}}),
+        json.dumps({'case_id': 2, 'url': f"{server.base_url}/chat", 'method': 'POST',
+                    'expected_result': {'code': 1}}),
+        '{bad',
+        json.dumps({'case_id': 4, 'url': f"{server.base_url}/chat", 'method': 'POST',
+                    'expected_result': '{"code": 1'}),
+        json.dumps({'case_id': 5, 'url': f"{server.base_url}/missing", 'method': 'GET'}),
+        json.dumps({'case_id': 6, 'method': 'GET'}),
+        json.dumps({'case_id': 7, 'url': f"{server.base_url}/users", 'method': 'GET',
+                    'params': '{"page": 1}', 'expected_result': '{"total": 2}'}),
+    ]
+    path.write_text('\n'.join(rows) + '\n', encoding='utf-8')
+
+    summary, results = _run([str(path)], tmp_path)
+    outcomes = {row: results[('cases', row)]['outcome'] for row in range(1, 8)}
+    assert outcomes == {1: 'passed', 2: 'failed', 3: 'error', 4: 'error', 5: 'error', 6: 'skipped', 7: 'passed'}
+    assert summary['total'] == 7
+    assert summary['summary'] == {'passed': 2, 'failed': 1, 'error': 3, 'skipped': 1}
+    assert '不是合法JSON' in results[('cases', 4)]['message']
+
+
+def test_csv_rows_stream(server, tmp_path):
+    path = tmp_path / 'bulk.csv'
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=['case_id', 'url', 'method', 'params', 'expected_result'])
+        writer.writeheader()
+        for i in range(200):
+            writer.writerow({'case_id': i, 'url': f"{server.base_url}/users", 'method': 'GET',
+                             'params': json.dumps({'page': i}), 'expected_result': '{"code": 0}'})
+
+    summary, _ = _run([str(path)], tmp_path)
+    assert summary['summary']['passed'] == 200
+
+
+def test_iter_cases_yields_invalid_case_for_malformed_line(tmp_path):
+    path = tmp_path / 'cases.jsonl'
+    path.write_text('{"case_id": 1}\n[1, 2]\n{bad\n{"case_id": 4}\n', encoding='utf-8')
+    cases = list(iter_cases(str(path)))
+    assert [type(case) for case in cases] == [dict, InvalidCase, InvalidCase, dict]
@@ -0,0 +1,35 @@
+# coding: utf-8
+# @Author: bgtech
+import threading
+import pytest
+from execution.distributed import Coordinator, run_worker
+from execution.load_runner import case_request
+from utils.mock_server import MockServer
+
+pytestmark = pytest.mark.unit
+
+
+def test_load_longer_than_worker_timeout_is_kept_alive_by_heartbeats():
+    server = MockServer()
+    server.add_route('GET', '/ok', body={'code': 0})
+    server.start()
+    coordinator = Coordinator(1, port=0, worker_timeout=3)
+    coordinator.start()
+    result = {}
+
+    def coordinate():
+        cases = [case_request({'url': f"{server.base_url}/ok", 'method': 'GET'})]
+        result['report'] = coordinator.run_load(cases, concurrency=1, rps=20, duration=4.5)
+
+    thread = threading.Thread(target=coordinate)
+    try:
+        thread.start()
+        assert run_worker(coordinator.url, connect_timeout=10) == 0
+        thread.join(timeout=30)
+    finally:
+        coordinator.stop()
+        server.stop()
+
+    assert not coordinator.lost
+    assert result['report']['workers'] == 1
+    assert result['report']['total']['requests'] > 0
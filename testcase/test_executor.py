@@ -0,0 +1,54 @@
+# coding: utf-8
+# @Author: bgtech
+import pytest
+import execution.executor as executor
+from execution.executor import ParallelExecutor, WorkStealingScheduler
+
+pytestmark = pytest.mark.unit
+
+CRASHING_TESTS = '''
+import os
+import time
+
+
+def test_crash():
+    time.sleep(0.5)
+    os._exit(3)
+
+
+def test_a():
+    # 另一个worker在崩溃时仍在领取用例
+    time.sleep(1.5)
+
+
+def test_b():
+    time.sleep(0.2)
+
+
+def test_c():
+    time.sleep(0.2)
+'''
+
+
+def test_scheduler_requeues_only_onto_given_workers():
+    scheduler = WorkStealingScheduler(['a', 'b', 'c', 'd'], 2, {'a': 4, 'b': 3, 'c': 2, 'd': 1})
+    assert scheduler.next(0) == 'a'
+    # worker0负载更小，但只能放回worker1
+    scheduler.requeue('a', [1])
+    assert scheduler.queues[1][0] == 'a' and 'a' not in scheduler.queues[0]
+
+
+def test_crashing_test_is_reported_as_error_without_taking_down_other_workers(tmp_path, monkeypatch):
+    # 不读写历史耗时，调度只取决于收集顺序
+    monkeypatch.setattr(executor, 'load_durations', lambda: {})
+    monkeypatch.setattr(executor, 'save_durations', lambda results: None)
+    path = tmp_path / 'test_crashing.py'
+    path.write_text(CRASHING_TESTS)
+    report = ParallelExecutor([str(path)], workers=2).run()
+
+    results = {result['nodeid'].rsplit('::', 1)[-1]: result for result in report['results']}
+    assert results['test_crash']['outcome'] == 'error'
+    assert '退出码 3' in results['test_crash']['message']
+    # 崩溃的用例没有交给其他worker，其他用例都执行完成
+    assert {name: r['outcome'] for name, r in results.items() if name != 'test_crash'} == \
+        {'test_a': 'passed', 'test_b': 'passed', 'test_c': 'passed'}
@@ -0,0 +1,72 @@
+# coding: utf-8
+# @Author: bgtech
+import pytest
+from common.metrics import add_request_listener, endpoint_name, get_metrics, remove_request_listener
+from utils.http_cache import CacheEntry, HTTPCache
+from utils.http_utils import HTTPUtils
+from utils.mock_server import MockServer
+
+pytestmark = pytest.mark.unit
+
+
+@pytest.fixture()
+def server():
+    server = MockServer()
+    server.add_route('GET', '/config', body={'version': 1}, headers={'Cache-Control': 'max-age=60'})
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture()
+def notified():
+    events = []
+    add_request_listener(events.append)
+    yield events
+    remove_request_listener(events.append)
+
+
+def test_cache_hit_is_not_recorded_as_request(server, notified):
+    client = HTTPUtils(cache=HTTPCache())
+    url = f"{server.base_url}/config"
+    endpoint = endpoint_name('GET', url)
+    before = get_metrics().get(endpoint).count if get_metrics().get(endpoint) else 0
+
+    first = client._make_request('GET', url)
+    second = client._make_request('GET', url)
+
+    assert server.request_count == 1
+    assert second.cache_status == 'hit' and second.timing is None
+    assert client.last_timing is first.timing
+    assert get_metrics().get(endpoint).count == before + 1
+    assert len(notified) == 1
+
+
+def test_request_no_cache_revalidates_with_server(server):
+    cache = HTTPCache()
+    client = HTTPUtils(cache=cache)
+    url = f"{server.base_url}/config"
+    client._make_request('GET', url)
+    response = client._make_request('GET', url, headers={'Cache-Control': 'no-cache'})
+    assert server.request_count == 2
+    assert not getattr(response, 'from_cache', False)
+    assert cache.get_stats()['hits'] == 0
+
+
+def test_request_no_store_bypasses_cache(server):
+    cache = HTTPCache()
+    client = HTTPUtils(cache=cache)
+    url = f"{server.base_url}/config"
+    client._make_request('GET', url, headers={'Cache-Control': 'no-store'})
+    client._make_request('GET', url, headers={'Cache-Control': 'no-store'})
+    assert server.request_count == 2
+    assert cache.get_stats()['stores'] == 0
+    # 之后的普通请求没有可用缓存
+    client._make_request('GET', url)
+    assert server.request_count == 3
+
+
+@pytest.mark.parametrize('age, freshness', [('10', 50.0), ('abc', 60.0), ('-5', 60.0), ('', 60.0)])
+def test_age_header_is_parsed_defensively(age, freshness):
+    entry = CacheEntry('http://host/config', 200, {'Cache-Control': 'max-age=60', 'Age': age}, b'{}', 0.0)
+    assert entry.freshness == freshness
@@ -0,0 +1,45 @@
+# coding: utf-8
+# @Author: bgtech
+import socket
+import pytest
+from utils.http_utils import HTTPUtils
+from utils.mock_server import MockServer
+
+pytestmark = pytest.mark.unit
+
+
+@pytest.fixture(scope='module')
+def server():
+    server = MockServer()
+    server.add_route('GET', '/ping', body={'ok': True})
+    server.start()
+    yield server
+    server.stop()
+
+
+def test_timing_phases_for_new_and_reused_connection(server):
+    client = HTTPUtils(cache=None)
+    first = client._make_request('GET', f"{server.base_url}/ping").timing
+    second = client._make_request('GET', f"{server.base_url}/ping").timing
+    assert not first['reused_connection'] and second['reused_connection']
+    assert second['dns_ms'] == second['connect_ms'] == 0
+    assert first['total_ms'] >= first['ttfb_ms'] > 0
+
+
+def test_falls_back_to_next_resolved_address(server, monkeypatch):
+    """
+    域名解析到多个地址、第一个不可达时，应与urllib3一样尝试下一个地址
+    """
+    getaddrinfo = socket.getaddrinfo
+
+    def fake_getaddrinfo(host, port, *args, **kwargs):
+        if host == 'dual.aitest.invalid':
+            # 127.0.0.2 上没有监听，连接被拒绝
+            return [(socket.AF_INET, socket.SOCK_STREAM, 6, '', ('127.0.0.2', port)),
+                    (socket.AF_INET, socket.SOCK_STREAM, 6, '', ('127.0.0.1', port))]
+        return getaddrinfo(host, port, *args, **kwargs)
+
+    monkeypatch.setattr(socket, 'getaddrinfo', fake_getaddrinfo)
+    response = HTTPUtils(cache=None)._make_request('GET', f"http://dual.aitest.invalid:{server.port}/ping")
+    assert response.status_code == 200
+    assert response.timing['dns_ms'] > 0
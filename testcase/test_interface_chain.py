@@ -0,0 +1,84 @@
+# coding: utf-8
+# @Author: bgtech
+import threading
+import time
+import pytest
+from common.interface_chain import DEFAULT_MAX_CONCURRENCY, InterfaceChain
+
+pytestmark = pytest.mark.unit
+
+CHAIN = [
+    {'name': 'login', 'url': '/login', 'method': 'POST', 'extract': {'token': 'data.token'}},
+    {'name': 'profile', 'url': '/profile', 'method': 'GET', 'params': {'token': '${token}'}, 'extract': {'uid': 'data.id'}},
+    {'name': 'cart', 'url': '/cart', 'method': 'GET', 'params': {'token': '${token}'}, 'extract': {'cart_id': 'data.id'}},
+    {'name': 'order', 'url': '/order', 'method': 'POST', 'params': {'uid': '${uid}', 'cart': ['${cart_id}']}},
+    {'name': 'orders', 'url': '/orders', 'method': 'GET', 'params': {'token': '${token}'}, 'depends_on': 'order'},
+]
+
+
+def test_dependencies_follow_placeholders_and_depends_on():
+    assert InterfaceChain().build_dependencies(CHAIN) == [set(), {0}, {0}, {1, 2}, {0, 3}]
+
+
+def test_opaque_extract_blocks_unknown_placeholders():
+    chain = [
+        {'name': 'a', 'extract': 'data.token'},
+        {'name': 'b', 'params': {'x': '${token}'}},
+        {'name': 'c', 'params': {'y': 1}},
+    ]
+    assert InterfaceChain().build_dependencies(chain) == [set(), {0}, set()]
+
+
+def test_unknown_depends_on_raises():
+    with pytest.raises(ValueError):
+        InterfaceChain().build_dependencies([{'name': 'a', 'depends_on': ['missing']}])
+
+
+class _FakeChain(InterfaceChain):
+    """用固定耗时代替真实请求，记录步骤执行顺序和最大并发数"""
+
+    def __init__(self, fail=None):
+        super().__init__()
+        self.fail = fail
+        self.started = []
+        self.running = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def _run_step(self, step, context):
+        with self.lock:
+            self.started.append(step['name'])
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(0.05)
+        with self.lock:
+            self.running -= 1
+        if step['name'] == self.fail:
+            raise AssertionError(step['name'])
+        params = self.replace_params(step.get('params', {}), context)
+        outputs = {key: f"{step['name']}.{key}" for key in step.get('extract') or {}}
+        return {'step': step['name'], 'params': params}, outputs
+
+
+def test_steps_run_sequentially_by_default():
+    assert DEFAULT_MAX_CONCURRENCY == 1
+    chain = _FakeChain()
+    response = chain.chain_request(CHAIN)
+    assert chain.started == [step['name'] for step in CHAIN]
+    assert chain.peak == 1
+    assert response == {'step': 'orders', 'params': {'token': 'login.token'}}
+
+
+def test_independent_steps_run_concurrently_when_enabled():
+    chain = _FakeChain()
+    chain.chain_request(CHAIN, max_concurrency=4)
+    assert chain.peak == 2
+    assert chain.started.index('order') > max(chain.started.index('profile'), chain.started.index('cart'))
+    assert chain.context == {'token': 'login.token', 'uid': 'profile.uid', 'cart_id': 'cart.cart_id'}
+
+
+def test_no_new_steps_start_after_failure():
+    chain = _FakeChain(fail='profile')
+    with pytest.raises(AssertionError, match='profile'):
+        chain.chain_request(CHAIN, max_concurrency=4)
+    assert 'order' not in chain.started and 'orders' not in chain.started
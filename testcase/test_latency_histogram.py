@@ -0,0 +1,55 @@
+# coding: utf-8
+# @Author: bgtech
+import json
+import numpy as np
+import pytest
+from utils.latency_histogram import LatencyHistogram
+
+pytestmark = pytest.mark.unit
+
+
+def test_small_values_are_exact():
+    histogram = LatencyHistogram()
+    for value_ms in (0.1, 0.2, 0.3, 0.4):
+        histogram.record(value_ms)
+    assert histogram.percentile(50) == pytest.approx(0.2)
+    assert histogram.percentile(100) == pytest.approx(0.4)
+    assert histogram.min_ms == pytest.approx(0.1) and histogram.mean_ms == pytest.approx(0.25)
+
+
+@pytest.mark.parametrize('p', [50, 90, 99, 99.9])
+def test_percentiles_within_relative_error(p):
+    values = np.random.default_rng(7).lognormal(np.log(20), 0.8, 20000)
+    histogram = LatencyHistogram()
+    for value in values:
+        histogram.record(value)
+    # 第 n*p/100 小的样本
+    expected = np.sort(values)[int(round(len(values) * p / 100)) - 1]
+    assert histogram.percentile(p) == pytest.approx(expected, rel=0.005)
+
+
+def test_percentile_never_exceeds_max_and_empty_is_none():
+    histogram = LatencyHistogram()
+    assert histogram.percentile(99) is None and histogram.summary()['p99_ms'] is None
+    histogram.record(0.5)
+    histogram.record(1234.5678)
+    assert histogram.max_ms == pytest.approx(1234.568)
+    assert histogram.percentile(99.9) <= histogram.max_ms
+    assert histogram.percentile(99.9) == pytest.approx(1234.568, rel=0.002)
+
+
+def test_merge_and_round_trip_match_single_histogram():
+    values = np.random.default_rng(3).exponential(15, 5000)
+    whole, parts = LatencyHistogram(), [LatencyHistogram() for _ in range(4)]
+    for index, value in enumerate(values):
+        whole.record(value)
+        parts[index % 4].record(value)
+    restored = [LatencyHistogram.from_dict(json.loads(json.dumps(part.to_dict()))) for part in parts]
+    merged = LatencyHistogram.merged(restored)
+    assert merged.summary() == whole.summary()
+    assert merged.min_ms == whole.min_ms
+
+
+def test_merge_rejects_different_precision():
+    with pytest.raises(ValueError):
+        LatencyHistogram(8).merge(LatencyHistogram(10))
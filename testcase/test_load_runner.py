@@ -0,0 +1,38 @@
+# coding: utf-8
+# @Author: bgtech
+import pytest
+from execution.load_runner import CLIENT_ASYNC, CLIENT_POOL, MODE_OPEN, LoadRunner, case_request
+from utils.mock_server import MockServer
+
+pytestmark = pytest.mark.unit
+
+
+@pytest.fixture()
+def server():
+    server = MockServer()
+    server.add_route('GET', '/ok', body={'code': 0})
+    server.add_route('GET', '/unavailable', body={'code': 503}, status=503)
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest.mark.parametrize('client', [CLIENT_POOL, CLIENT_ASYNC])
+def test_errors_are_reported_without_retries(server, client):
+    cases = [case_request({'url': f"{server.base_url}/ok", 'method': 'GET'}),
+             case_request({'url': f"{server.base_url}/unavailable", 'method': 'GET'})]
+    report = LoadRunner(cases, concurrency=2, duration=0.5, client=client).run()
+
+    ok, unavailable = (report['endpoints'][case['endpoint']] for case in cases)
+    assert ok['error_rate'] == 0.0 and unavailable['error_rate'] == 1.0
+    assert unavailable['status_codes'] == {'503': unavailable['requests']}
+    # 每个压测请求只发送一次（不重试）
+    assert server.request_count == report['total']['requests']
+
+
+@pytest.mark.parametrize('client', [CLIENT_POOL, CLIENT_ASYNC])
+def test_open_loop_sends_at_target_rate(server, client):
+    cases = [case_request({'url': f"{server.base_url}/ok", 'method': 'GET'})]
+    report = LoadRunner(cases, concurrency=4, duration=1.0, rps=50, client=client, mode=MODE_OPEN).run()
+    assert report['total']['requests'] == 50
+    assert report['total']['errors'] == 0
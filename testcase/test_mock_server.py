@@ -0,0 +1,51 @@
+# coding: utf-8
+# @Author: bgtech
+import socket
+import pytest
+from utils.http_utils import HTTPUtils
+from utils.mock_server import LatencyModel, MockServer
+
+pytestmark = pytest.mark.unit
+
+
+@pytest.mark.parametrize('spec, distribution, params', [
+    ('20', 'fixed', {'value': 20.0}),
+    (12.5, 'fixed', {'value': 12.5}),
+    ('lognormal:median=20,sigma=0.5', 'lognormal', {'median': 20.0, 'sigma': 0.5}),
+    ({'distribution': 'uniform', 'low': 5, 'high': 50}, 'uniform', {'low': 5.0, 'high': 50.0}),
+])
+def test_latency_spec_parsing(spec, distribution, params):
+    model = LatencyModel.parse(spec)
+    assert model.distribution == distribution and model.params == params
+
+
+def test_zero_or_empty_latency_is_disabled():
+    assert LatencyModel.parse('0') is None
+    assert LatencyModel.parse('') is None
+    assert LatencyModel.parse(None) is None
+    with pytest.raises(ValueError):
+        LatencyModel.parse('gamma:k=2')
+
+
+@pytest.fixture(scope='module')
+def server():
+    server = MockServer()
+    server.add_route('POST', '/chat', body={'reply': 'hi'}, params={'q': 'hi'})
+    server.add_route('POST', '/chat', body={'reply': 'bye'}, params={'q': 'bye'})
+    server.start()
+    yield server
+    server.stop()
+
+
+def test_routes_match_on_request_params(server):
+    client = HTTPUtils(cache=None)
+    assert client.post(f"{server.base_url}/chat", json_data={'q': 'bye'}) == {'reply': 'bye'}
+    assert client.post(f"{server.base_url}/chat", json_data={'q': 'hi'}) == {'reply': 'hi'}
+    assert client._make_request('POST', f"{server.base_url}/chat", json={'q': '?'}).status_code == 404
+
+
+@pytest.mark.parametrize('content_length', ['abc', '-5'])
+def test_malformed_content_length_returns_400(server, content_length):
+    with socket.create_connection((server.host, server.port), timeout=5) as sock:
+        sock.sendall(f"POST /chat HTTP/1.1\r\nHost: x\r\nContent-Length: {content_length}\r\n\r\n".encode())
+        assert sock.recv(1024).startswith(b'HTTP/1.1 400')
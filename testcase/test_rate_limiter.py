@@ -0,0 +1,60 @@
+# coding: utf-8
+# @Author: bgtech
+import asyncio
+import time
+from email.utils import formatdate
+import pytest
+from utils.rate_limiter import TokenBucket, parse_retry_after
+
+pytestmark = pytest.mark.unit
+
+
+def test_burst_is_free_then_requests_are_spaced_at_rate():
+    bucket = TokenBucket(rate=50, burst=5)
+    start = time.monotonic()
+    waits = [bucket.acquire() for _ in range(15)]
+    elapsed = time.monotonic() - start
+    assert waits[:5] == [0.0] * 5
+    # 突发之后的10个请求按每秒50个发放
+    assert 0.18 <= elapsed < 0.4
+    assert all(wait > 0 for wait in waits[5:])
+
+
+def test_waits_are_reserved_in_arrival_order():
+    bucket = TokenBucket(rate=10, burst=1)
+    assert bucket._reserve() == 0.0
+    assert bucket._reserve() == pytest.approx(0.1, abs=0.01)
+    assert bucket._reserve() == pytest.approx(0.2, abs=0.01)
+
+
+def test_async_acquire_limits_concurrent_coroutines():
+    bucket = TokenBucket(rate=100, burst=1)
+
+    async def main():
+        start = time.monotonic()
+        await asyncio.gather(*(bucket.acquire_async() for _ in range(11)))
+        return time.monotonic() - start
+
+    assert 0.09 <= asyncio.run(main()) < 0.3
+
+
+def test_pause_delays_next_token():
+    bucket = TokenBucket(rate=1000, burst=10)
+    bucket.pause(0.1)
+    bucket.pause(0.01)   # 较短的暂停不会覆盖较长的暂停
+    assert bucket._reserve() == pytest.approx(0.1, abs=0.02)
+
+
+def test_invalid_rate_raises():
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('3') == 3.0
+    assert parse_retry_after('1.5') == 1.5
+    assert parse_retry_after('-2') == 0.0
+    assert parse_retry_after(formatdate(time.time() + 30, usegmt=True)) == pytest.approx(30, abs=2)
+    assert parse_retry_after(formatdate(time.time() - 30, usegmt=True)) == 0.0
+    assert parse_retry_after('soon') is None
+    assert parse_retry_after(None) is None
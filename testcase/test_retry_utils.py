@@ -0,0 +1,84 @@
+# coding: utf-8
+# @Author: bgtech
+import time
+import pytest
+import requests
+from utils.http_utils import HTTPUtils
+from utils.mock_server import MockServer
+from utils.retry_utils import CircuitBreaker, CircuitOpenError, RetryPolicy, get_circuit_breaker, get_retry_policy
+
+pytestmark = pytest.mark.unit
+
+
+def test_policy_retries_only_configured_methods_statuses_and_exceptions():
+    policy = RetryPolicy(max_attempts=3, retry_on_status=[503], retry_on_exceptions=['ConnectionError'])
+    assert policy.should_retry_status('GET', 1, 503)
+    assert not policy.should_retry_status('GET', 3, 503)
+    assert not policy.should_retry_status('GET', 1, 500)
+    assert not policy.should_retry_status('POST', 1, 503)
+    assert policy.should_retry_exception('GET', 1, requests.exceptions.ConnectionError())
+    assert not policy.should_retry_exception('GET', 1, requests.exceptions.ReadTimeout())
+    assert not policy.should_retry_exception('GET', 1, CircuitOpenError())
+
+
+def test_backoff_grows_exponentially_within_jitter_and_cap():
+    policy = RetryPolicy(backoff=1.0, backoff_max=3.0, jitter=0.5)
+    for attempt, ceiling in ((1, 1.0), (2, 2.0), (3, 3.0), (6, 3.0)):
+        delay = policy.get_backoff(attempt)
+        assert ceiling * 0.5 <= delay <= ceiling
+    assert RetryPolicy(backoff=0.2, jitter=0).get_backoff(2) == pytest.approx(0.4)
+
+
+def test_global_retry_is_opt_in():
+    assert get_retry_policy().max_attempts == 1
+
+
+def test_circuit_breaker_is_opt_in():
+    assert get_circuit_breaker('http://host') is None
+
+
+def test_breaker_opens_after_threshold_and_recovers_through_half_open():
+    breaker = CircuitBreaker('http://host', failure_threshold=2, recovery_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+    time.sleep(0.06)
+    breaker.before_request()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # 半开状态只放行一个探测请求
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.failures == 0
+
+
+def test_failed_probe_reopens_breaker():
+    breaker = CircuitBreaker('http://host', failure_threshold=1, recovery_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    breaker.before_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+
+def test_5xx_response_is_not_retried_by_default():
+    server = MockServer()
+    server.add_route('GET', '/unavailable', body={'code': 503}, status=503)
+    server.start()
+    try:
+        client = HTTPUtils(cache=None)
+        response = client._make_request('GET', f"{server.base_url}/unavailable")
+        assert response.status_code == 503
+        assert server.request_count == 1
+        # 熔断器默认关闭，连续5xx后的请求仍然发送
+        for _ in range(10):
+            client._make_request('GET', f"{server.base_url}/unavailable")
+        assert server.request_count == 11
+    finally:
+        server.stop()
@@ -0,0 +1,78 @@
+# coding: utf-8
+# @Author: bgtech
+import numpy as np
+import pytest
+from execution.regression import compare_latencies, holm_adjust
+from utils.stats_utils import bootstrap_ratio_ci, mann_whitney_u, rank_with_ties
+
+pytestmark = pytest.mark.unit
+
+
+def test_rank_with_ties_uses_average_ranks():
+    ranks, tie_counts = rank_with_ties(np.array([3.0, 1.0, 3.0, 2.0]))
+    assert ranks.tolist() == [3.5, 1.0, 3.5, 2.0]
+    assert tie_counts.tolist() == [1, 1, 2]
+
+
+@pytest.mark.parametrize('alternative, expected', [
+    ('two-sided', 0.0808556),
+    ('less', 0.0404278),
+    ('greater', 0.9854518),
+])
+def test_mann_whitney_matches_asymptotic_reference(alternative, expected):
+    # 参考值与 scipy.stats.mannwhitneyu(method='asymptotic') 一致
+    u, p = mann_whitney_u([1, 2, 3], [4, 5, 6], alternative)
+    assert u == 0.0
+    assert p == pytest.approx(expected, abs=1e-6)
+
+
+def test_mann_whitney_tie_correction():
+    u, p = mann_whitney_u([1, 2, 2, 3, 5], [2, 4, 4, 6, 7, 8], 'two-sided')
+    assert u == 5.0
+    assert p == pytest.approx(0.0793437, abs=1e-6)
+
+
+def test_mann_whitney_edge_cases():
+    assert mann_whitney_u([5, 5, 5], [5, 5]) == (3.0, 1.0)
+    with pytest.raises(ValueError):
+        mann_whitney_u([], [1])
+    with pytest.raises(ValueError):
+        mann_whitney_u([1], [2], 'bigger')
+
+
+def test_mann_whitney_detects_shift_in_long_tailed_latency():
+    rng = np.random.default_rng(1)
+    baseline = rng.lognormal(np.log(20), 0.6, 300)
+    slower = rng.lognormal(np.log(24), 0.6, 300)
+    assert mann_whitney_u(slower, baseline, 'greater')[1] < 0.001
+    assert mann_whitney_u(baseline, slower, 'greater')[1] > 0.99
+
+
+def test_holm_adjust():
+    assert holm_adjust([0.01, 0.04, 0.03, 0.005]) == pytest.approx([0.03, 0.06, 0.06, 0.02])
+    assert holm_adjust([0.5, 0.9]) == [1.0, 1.0]
+    assert holm_adjust([]) == []
+
+
+def test_bootstrap_ratio_ci_covers_true_ratio_and_is_reproducible():
+    rng = np.random.default_rng(2)
+    baseline = rng.lognormal(np.log(20), 0.5, 400)
+    current = rng.lognormal(np.log(30), 0.5, 400)
+    low, high = bootstrap_ratio_ci(current, baseline, resamples=1000, seed=0)
+    assert low < 1.5 < high and low > 1.2
+    assert bootstrap_ratio_ci(current, baseline, resamples=1000, seed=0) == (low, high)
+
+
+def test_compare_latencies_flags_only_significant_large_regressions():
+    rng = np.random.default_rng(4)
+    baseline = {key: rng.lognormal(np.log(20), 0.5, 200).tolist() for key in ('a', 'b', 'c')}
+    current = {
+        'a': rng.lognormal(np.log(30), 0.5, 200).tolist(),   # 明显变慢
+        'b': rng.lognormal(np.log(20), 0.5, 200).tolist(),   # 无变化
+        'c': rng.lognormal(np.log(20), 0.5, 5).tolist(),     # 样本不足，不检验
+    }
+    results = {r['key']: r for r in compare_latencies(current, baseline, alpha=0.01, min_ratio=1.1,
+                                                        min_samples=20, resamples=500)}
+    assert results['a']['regressed'] and results['a']['ratio'] > 1.3
+    assert not results['b']['regressed']
+    assert results['c']['p_value'] is None and not results['c']['regressed']
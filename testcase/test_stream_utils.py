@@ -0,0 +1,47 @@
+# coding: utf-8
+# @Author: bgtech
+import json
+import pytest
+from utils.stream_utils import SSEParser, extract_text
+
+pytestmark = pytest.mark.unit
+
+
+def _feed_all(parser: SSEParser, chunks) -> list:
+    events = []
+    for chunk in chunks:
+        events.extend(parser.feed(chunk))
+    return events + parser.flush()
+
+
+def test_events_split_across_chunks():
+    stream = b'event: delta\ndata: {"reply": "a"}\n\n: keep-alive\n\ndata: line1\ndata: line2\nid: 7\n\n'
+    events = _feed_all(SSEParser(), [stream[i:i + 3] for i in range(0, len(stream), 3)])
+    assert [e['event'] for e in events] == ['delta', 'message']
+    assert events[0]['json'] == {'reply': 'a'}
+    assert events[1]['data'] == 'line1\nline2' and events[1]['id'] == '7'
+
+
+def test_crlf_split_between_chunks():
+    events = _feed_all(SSEParser(), [b'data: x\r', b'\n\r', b'\n'])
+    assert [e['data'] for e in events] == ['x']
+
+
+@pytest.mark.parametrize('size', [1, 2, 4, 5])
+def test_multibyte_utf8_split_across_chunks(size):
+    stream = ('data: ' + json.dumps({'reply': '你好，世界'}, ensure_ascii=False) + '\n\n').encode('utf-8')
+    events = _feed_all(SSEParser(), [stream[i:i + size] for i in range(0, len(stream), size)])
+    assert extract_text(events[0]['json']) == '你好，世界'
+
+
+def test_flush_dispatches_unterminated_event():
+    parser = SSEParser()
+    assert parser.feed('data: tail'.encode('utf-8')[:-1]) == []
+    events = parser.feed(b'l') + parser.flush()
+    assert [e['data'] for e in events] == ['tail']
+
+
+def test_extract_text_paths():
+    assert extract_text({'choices': [{'delta': {'content': 'hi'}}]}) == 'hi'
+    assert extract_text({'data': {'reply': 'ok'}}) == 'ok'
+    assert extract_text({'other': 1}) is None
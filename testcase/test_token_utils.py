@@ -0,0 +1,76 @@
+# coding: utf-8
+# @Author: bgtech
+import pytest
+import requests
+import utils.token_utils as token_utils
+from common.shared_store import SharedStore
+from utils.mock_server import MockServer
+from utils.token_utils import CRYPTOGRAPHY_AVAILABLE, TokenManager
+
+pytestmark = pytest.mark.unit
+
+
+@pytest.fixture()
+def server():
+    server = MockServer()
+    server.add_route('POST', '/login', body={'data': {'token': 'secret-token', 'expires_in': 600}})
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture()
+def store(tmp_path, monkeypatch):
+    store = SharedStore(path=str(tmp_path / 'shared_store.db'), run_id='test')
+    monkeypatch.setattr(token_utils, 'get_shared_store', lambda: store)
+    yield store
+    store.close()
+
+
+def _stored_values(store):
+    return [row[0] for row in store._connection().execute("SELECT value FROM entries WHERE namespace = 'token'")]
+
+
+def test_unencrypted_token_never_reaches_shared_store(server, store):
+    manager = TokenManager(login_url=f"{server.base_url}/login", login_data={}, token_path='data.token',
+                           persist=False)
+    assert manager.get_token() == 'secret-token'
+    assert manager.get_token() == 'secret-token'
+    assert manager.login_count == 1
+    assert _stored_values(store) == []
+
+
+def test_values_that_cannot_be_decrypted_are_not_used(server, store):
+    manager = TokenManager(login_url=f"{server.base_url}/login", login_data={}, token_path='data.token',
+                           persist=False)
+    for value in ({'encrypted': 'gAAAA...'}, {'token': 'plain', 'expires_at': None}):
+        with pytest.raises(ValueError):
+            manager._decode(value)
+        assert not manager._usable(value, None)
+    with pytest.raises(ValueError):
+        manager._encode(token_utils.TokenInfo('t', None))
+
+
+@pytest.mark.skipif(not CRYPTOGRAPHY_AVAILABLE, reason="需要安装cryptography")
+def test_shared_store_only_holds_encrypted_token(server, store, tmp_path, monkeypatch):
+    monkeypatch.setenv(token_utils.KEY_ENV, token_utils.Fernet.generate_key().decode('ascii'))
+    manager = TokenManager(login_url=f"{server.base_url}/login", login_data={}, token_path='data.token',
+                           cache_file=str(tmp_path / 'token_cache.bin'), persist=True)
+    assert manager.get_token() == 'secret-token'
+    values = _stored_values(store)
+    assert len(values) == 1 and 'secret-token' not in values[0] and 'encrypted' in values[0]
+
+
+def test_token_property_logs_in_on_first_access_and_returns_str(server):
+    manager = TokenManager(login_url=f"{server.base_url}/login", login_data={}, token_path='data.token',
+                           persist=False)
+
+    class Case:
+        token = token_utils.token_property(manager)
+
+    case = Case()
+    assert manager.login_count == 0
+    assert isinstance(case.token, str)
+    assert requests.Request('GET', server.base_url, headers={'Authorization': case.token}).prepare() \
+        .headers['Authorization'] == 'secret-token'
+    assert manager.login_count == 1
@@ -0,0 +1,494 @@
+# coding: utf-8
+# @Author: bgtech
+import asyncio
+import json
+import logging
+import threading
+import time
+from typing import Dict, Any, Optional, Union, List
+
+from common.interface_config import find_interface
+from common.log import api_info
+from common.metrics import endpoint_name, get_metrics, notify_request
+from utils.http_timing import RequestTiming
+from utils.rate_limiter import get_rate_limiter, parse_retry_after
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 尝试导入aiohttp
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+    logger.warning("aiohttp未安装，异步HTTP功能不可用")
+
+
+class AsyncResponse:
+    """
+    异步请求的响应结果（响应体已读取，连接已释放）
+    """
+
+    def __init__(self, status_code: int, headers: Dict, content: bytes, url: str,
+                 reason: str = '', request_info: Any = None, timing: Optional[Dict] = None):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.url = url
+        self.reason = reason
+        self.request_info = request_info
+        self.timing = timing
+
+    @property
+    def text(self) -> str:
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+
+def _build_trace_config() -> 'aiohttp.TraceConfig':
+    """
+    构建记录分阶段耗时的aiohttp追踪配置
+    请求时通过 trace_request_ctx 传入RequestTiming；aiohttp无法单独区分TLS握手，计入connect
+    """
+    async def on_request_start(session, ctx, params):
+        ctx.trace_request_ctx.send_started()
+
+    async def on_request_end(session, ctx, params):
+        ctx.trace_request_ctx.headers_received()
+
+    async def on_dns_start(session, ctx, params):
+        ctx.dns_start = time.perf_counter()
+
+    async def on_dns_end(session, ctx, params):
+        ctx.trace_request_ctx.dns += (time.perf_counter() - ctx.dns_start) * 1000
+
+    async def on_connection_start(session, ctx, params):
+        ctx.connect_start = time.perf_counter()
+        ctx.dns_before = ctx.trace_request_ctx.dns
+
+    async def on_connection_end(session, ctx, params):
+        timing = ctx.trace_request_ctx
+        elapsed = (time.perf_counter() - ctx.connect_start) * 1000
+        timing.connect += max(elapsed - (timing.dns - ctx.dns_before), 0.0)
+        timing.new_connections += 1
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_request_end.append(on_request_end)
+    trace_config.on_dns_resolvehost_start.append(on_dns_start)
+    trace_config.on_dns_resolvehost_end.append(on_dns_end)
+    trace_config.on_connection_create_start.append(on_connection_start)
+    trace_config.on_connection_create_end.append(on_connection_end)
+    return trace_config
+
+
+class AsyncHTTPUtils:
+    """
+    异步HTTP请求工具类
+    与HTTPUtils保持相同的调用方式，基于asyncio事件循环，
+    使用有界连接池和单主机并发上限，支持同时保持大量在途请求
+    """
+
+    def __init__(self, base_url: str = "", default_headers: Optional[Dict] = None, timeout: int = 30,
+                 limit: int = 100, limit_per_host: int = 20):
+        """
+        初始化异步HTTP工具类
+        :param base_url: 基础URL
+        :param default_headers: 默认请求头
+        :param timeout: 默认超时时间（秒）
+        :param limit: 连接池总连接数上限
+        :param limit_per_host: 单个主机的并发连接上限
+        """
+        if not AIOHTTP_AVAILABLE:
+            raise ImportError("aiohttp is required for AsyncHTTPUtils. Please install it with: pip install aiohttp")
+        self.base_url = base_url.rstrip('/')
+        self.default_headers = default_headers or {}
+        self.default_timeout = timeout
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def _get_session(self) -> 'aiohttp.ClientSession':
+        """
+        获取会话（必须在事件循环中调用，首次调用时创建）
+        """
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host)
+            self.session = aiohttp.ClientSession(connector=connector, trace_configs=[_build_trace_config()])
+        return self.session
+
+    def _build_url(self, url: str) -> str:
+        """
+        构建完整URL
+        :param url: 请求URL
+        :return: 完整URL
+        """
+        if not url.startswith(('http://', 'https://')):
+            url = f"{self.base_url}/{url.lstrip('/')}"
+        return url
+
+    def _prepare_headers(self, headers: Optional[Dict] = None, token: Optional[str] = None) -> Dict:
+        """
+        准备请求头
+        :param headers: 自定义请求头
+        :param token: 认证token
+        :return: 合并后的请求头
+        """
+        final_headers = self.default_headers.copy()
+        if headers:
+            final_headers.update(headers)
+        if token:
+            final_headers['Authorization'] = f'Bearer {token}'
+        return final_headers
+
+    async def _make_request(self, method: str, url: str, **kwargs) -> AsyncResponse:
+        """
+        发送异步HTTP请求
+        :param method: HTTP方法
+        :param url: 请求URL
+        :param kwargs: 其他请求参数
+        :return: 响应对象
+        """
+        url = self._build_url(url)
+        headers = self._prepare_headers(
+            kwargs.pop('headers', None),
+            kwargs.pop('token', None)
+        )
+        timeout = kwargs.pop('timeout', self.default_timeout)
+        if kwargs.get('params') is None:
+            kwargs.pop('params', None)
+
+        logger.info(f"发送异步 {method.upper()} 请求到: {url}")
+        logger.debug(f"请求头: {headers}")
+
+        matched = find_interface(url, method)
+        endpoint = endpoint_name(method, url, matched[0] if matched else None)
+        limiter = get_rate_limiter(url, matched[0] if matched else None)
+        if limiter is not None:
+            await limiter.acquire_async()
+
+        timing = RequestTiming()
+        try:
+            session = self._get_session()
+            async with session.request(method, url, headers=headers, trace_request_ctx=timing,
+                                       timeout=aiohttp.ClientTimeout(total=timeout), **kwargs) as resp:
+                download_start = time.perf_counter()
+                content = await resp.read()
+                timing.download = (time.perf_counter() - download_start) * 1000
+                timing.finish()
+                response = AsyncResponse(resp.status, dict(resp.headers), content, str(resp.url),
+                                         resp.reason or '', resp.request_info, timing.to_dict())
+            logger.info(f"响应状态码: {response.status_code}")
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            timing.finish()
+            logger.error(f"异步请求失败: {e}")
+            api_info(f"请求耗时: {method.upper()} {url} 失败 | {timing.summary()}")
+            get_metrics().record(endpoint, timing.to_dict()['total_ms'], error=True)
+            notify_request(endpoint, method, url, None, timing.to_dict())
+            raise
+
+        api_info(f"请求耗时: {method.upper()} {url} {response.status_code} | {timing.summary()}")
+        get_metrics().record(endpoint, response.timing['total_ms'], error=response.status_code >= 400)
+        notify_request(endpoint, method, url, response.status_code, response.timing)
+        if limiter is not None and response.status_code in (429, 503):
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            if retry_after is not None:
+                limiter.pause(retry_after)
+        return response
+
+    @staticmethod
+    def _raise_for_status(response: AsyncResponse):
+        """
+        状态码为4xx/5xx时抛出异常
+        """
+        if response.status_code >= 400:
+            raise aiohttp.ClientResponseError(
+                request_info=response.request_info, history=(), status=response.status_code,
+                message=response.reason, headers=response.headers
+            )
+
+    @staticmethod
+    def _body_kwargs(data: Optional[Union[Dict, str]], json_data: Optional[Dict]) -> Dict:
+        """
+        组装请求体参数
+        """
+        request_kwargs = {}
+        if data is not None:
+            request_kwargs['data'] = data
+        if json_data is not None:
+            request_kwargs['json'] = json_data
+        return request_kwargs
+
+    async def get(self, url: str, params: Optional[Dict] = None, headers: Optional[Dict] = None,
+                  token: Optional[str] = None, **kwargs) -> Union[Dict, Any]:
+        """
+        GET请求
+        :param url: 请求URL
+        :param params: 查询参数
+        :param headers: 请求头
+        :param token: 认证token
+        :param kwargs: 其他参数
+        :return: 响应数据
+        """
+        response = await self._make_request('GET', url, params=params, headers=headers, token=token, **kwargs)
+        self._raise_for_status(response)
+        return response.json() if response.content else None
+
+    async def post(self, url: str, data: Optional[Union[Dict, str]] = None, json_data: Optional[Dict] = None,
+                   headers: Optional[Dict] = None, token: Optional[str] = None, **kwargs) -> Union[Dict, Any]:
+        """
+        POST请求
+        :param url: 请求URL
+        :param data: 表单数据
+        :param json_data: JSON数据
+        :param headers: 请求头
+        :param token: 认证token
+        :param kwargs: 其他参数
+        :return: 响应数据
+        """
+        response = await self._make_request('POST', url, headers=headers, token=token,
+                                            **self._body_kwargs(data, json_data), **kwargs)
+        self._raise_for_status(response)
+        return response.json() if response.content else None
+
+    async def put(self, url: str, data: Optional[Union[Dict, str]] = None, json_data: Optional[Dict] = None,
+                  headers: Optional[Dict] = None, token: Optional[str] = None, **kwargs) -> Union[Dict, Any]:
+        """
+        PUT请求
+        :param url: 请求URL
+        :param data: 表单数据
+        :param json_data: JSON数据
+        :param headers: 请求头
+        :param token: 认证token
+        :param kwargs: 其他参数
+        :return: 响应数据
+        """
+        response = await self._make_request('PUT', url, headers=headers, token=token,
+                                            **self._body_kwargs(data, json_data), **kwargs)
+        self._raise_for_status(response)
+        return response.json() if response.content else None
+
+    async def delete(self, url: str, headers: Optional[Dict] = None, token: Optional[str] = None,
+                     **kwargs) -> Union[Dict, Any]:
+        """
+        DELETE请求
+        :param url: 请求URL
+        :param headers: 请求头
+        :param token: 认证token
+        :param kwargs: 其他参数
+        :return: 响应数据
+        """
+        response = await self._make_request('DELETE', url, headers=headers, token=token, **kwargs)
+        self._raise_for_status(response)
+        return response.json() if response.content else None
+
+    async def patch(self, url: str, data: Optional[Union[Dict, str]] = None, json_data: Optional[Dict] = None,
+                    headers: Optional[Dict] = None, token: Optional[str] = None, **kwargs) -> Union[Dict, Any]:
+        """
+        PATCH请求
+        :param url: 请求URL
+        :param data: 表单数据
+        :param json_data: JSON数据
+        :param headers: 请求头
+        :param token: 认证token
+        :param kwargs: 其他参数
+        :return: 响应数据
+        """
+        response = await self._make_request('PATCH', url, headers=headers, token=token,
+                                            **self._body_kwargs(data, json_data), **kwargs)
+        self._raise_for_status(response)
+        return response.json() if response.content else None
+
+    async def head(self, url: str, headers: Optional[Dict] = None, token: Optional[str] = None,
+                   **kwargs) -> AsyncResponse:
+        """
+        HEAD请求
+        :param url: 请求URL
+        :param headers: 请求头
+        :param token: 认证token
+        :param kwargs: 其他参数
+        :return: 响应对象（HEAD请求通常不返回响应体）
+        """
+        response = await self._make_request('HEAD', url, headers=headers, token=token, **kwargs)
+        self._raise_for_status(response)
+        return response
+
+    async def options(self, url: str, headers: Optional[Dict] = None, token: Optional[str] = None,
+                      **kwargs) -> AsyncResponse:
+        """
+        OPTIONS请求
+        :param url: 请求URL
+        :param headers: 请求头
+        :param token: 认证token
+        :param kwargs: 其他参数
+        :return: 响应对象
+        """
+        response = await self._make_request('OPTIONS', url, headers=headers, token=token, **kwargs)
+        self._raise_for_status(response)
+        return response
+
+    async def request(self, method: str, url: str, **kwargs) -> Union[Dict, Any, AsyncResponse]:
+        """
+        通用请求方法
+        :param method: HTTP方法
+        :param url: 请求URL
+        :param kwargs: 其他参数（json_data 会转换为 json）
+        :return: 响应数据或响应对象
+        """
+        method = method.upper()
+        if 'json_data' in kwargs:
+            kwargs['json'] = kwargs.pop('json_data')
+        response = await self._make_request(method, url, **kwargs)
+        self._raise_for_status(response)
+
+        # HEAD和OPTIONS请求返回响应对象
+        if method in ['HEAD', 'OPTIONS']:
+            return response
+        else:
+            return response.json() if response.content else None
+
+    async def send(self, method: str, url: str, **kwargs) -> AsyncResponse:
+        """
+        发送请求并返回响应对象，不检查状态码（由调用方根据状态码判断结果）
+        :param method: HTTP方法
+        :param url: 请求URL
+        :param kwargs: 其他参数（json_data 会转换为 json）
+        :return: 响应对象
+        """
+        if 'json_data' in kwargs:
+            kwargs['json'] = kwargs.pop('json_data')
+        return await self._make_request(method.upper(), url, **kwargs)
+
+    async def batch(self, request_specs: List[Dict]) -> List[Dict]:
+        """
+        并发执行一批请求，结果顺序与输入一致
+        :param request_specs: 请求描述列表，如 [{'method': 'GET', 'url': '/users', 'params': {...}}]
+        :return: 结果列表，每项包含 status_code、data、error、timing、elapsed_ms
+        """
+        async def run_one(index: int, spec: Dict) -> Dict:
+            spec = dict(spec)
+            method = spec.pop('method', 'GET').upper()
+            url = spec.pop('url')
+            if 'json_data' in spec:
+                spec['json'] = spec.pop('json_data')
+            result = {'index': index, 'method': method, 'url': url,
+                      'status_code': None, 'data': None, 'error': None, 'timing': None}
+            start = time.perf_counter()
+            try:
+                response = await self._make_request(method, url, **spec)
+                result['status_code'] = response.status_code
+                result['timing'] = response.timing
+                if method not in ('HEAD', 'OPTIONS') and response.content:
+                    try:
+                        result['data'] = response.json()
+                    except ValueError:
+                        result['data'] = response.text
+                if response.status_code >= 400:
+                    result['error'] = f"HTTP {response.status_code}"
+            except Exception as e:
+                result['error'] = f"{type(e).__name__}: {e}"
+            result['elapsed_ms'] = (time.perf_counter() - start) * 1000
+            return result
+
+        return list(await asyncio.gather(*(run_one(i, spec) for i, spec in enumerate(request_specs))))
+
+    def set_default_headers(self, headers: Dict):
+        """
+        设置默认请求头
+        :param headers: 默认请求头
+        """
+        self.default_headers.update(headers)
+
+    def set_token(self, token: str):
+        """
+        设置默认认证token
+        :param token: 认证token
+        """
+        self.default_headers['Authorization'] = f'Bearer {token}'
+
+    async def close(self):
+        """
+        关闭会话
+        """
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+
+
+def run_sync(coro):
+    """
+    在同步代码中执行协程
+    当前线程已有运行中的事件循环时，改在独立线程的新事件循环中执行
+    :param coro: 协程对象
+    :return: 协程返回值
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    result = {}
+
+    def runner():
+        try:
+            result['value'] = asyncio.run(coro)
+        except BaseException as e:
+            result['error'] = e
+
+    thread = threading.Thread(target=runner, name='async-http-bridge')
+    thread.start()
+    thread.join()
+    if 'error' in result:
+        raise result['error']
+    return result['value']
+
+
+def async_batch_request(request_specs: List[Dict], base_url: str = "", default_headers: Optional[Dict] = None,
+                        timeout: int = 30, limit: int = 100, limit_per_host: int = 20) -> List[Dict]:
+    """
+    同步便捷函数：在事件循环上并发执行一批请求
+    :param request_specs: 请求描述列表，字段同AsyncHTTPUtils.batch
+    :param base_url: 基础URL
+    :param default_headers: 默认请求头
+    :param timeout: 超时时间（秒）
+    :param limit: 连接池总连接数上限
+    :param limit_per_host: 单个主机的并发连接上限
+    :return: 与输入顺序一致的结果列表
+    """
+    async def main():
+        async with AsyncHTTPUtils(base_url=base_url, default_headers=default_headers, timeout=timeout,
+                                  limit=limit, limit_per_host=limit_per_host) as client:
+            return await client.batch(request_specs)
+
+    return run_sync(main())
+
+
+# 使用示例
+if __name__ == "__main__":
+    async def demo():
+        async with AsyncHTTPUtils(base_url="https://api.example.com", limit_per_host=50) as client:
+            client.set_token("your_token_here")
+            users = await asyncio.gather(*(client.get(f"/users/{i}") for i in range(1, 11)))
+            print(f"并发GET响应: {users}")
+
+    try:
+        asyncio.run(demo())
+    except Exception as e:
+        print(f"请求失败: {e}")
+
+    # 同步代码中批量提交
+    results = async_batch_request([
+        {'method': 'GET', 'url': 'https://api.example.com/users/1'},
+        {'method': 'POST', 'url': 'https://api.example.com/users', 'json_data': {'name': 'John'}},
+    ])
+    for item in results:
+        print(item)
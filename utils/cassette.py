@@ -0,0 +1,279 @@
+# coding: utf-8
+# @Author: bgtech
+import base64
+import hashlib
+import json
+import os
+import threading
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Iterable
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from common.config import get_config
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CASSETTE_PATH = os.path.join(BASE_DIR, 'cassettes', 'requests.jsonl')
+DEFAULT_MATCH_ON = ('method', 'url', 'body')
+DEFAULT_IGNORE_HEADERS = ('authorization', 'cookie', 'user-agent', 'date', 'content-length',
+                          'accept-encoding', 'connection', 'x-request-id')
+# 录制时不保存的响应头（响应体保存的是解码后的内容）
+_DROP_RESPONSE_HEADERS = ('content-encoding', 'transfer-encoding', 'content-length')
+
+MODE_OFF = 'off'
+MODE_RECORD = 'record'
+MODE_REPLAY = 'replay'
+
+
+class CassetteMiss(requests.exceptions.RequestException):
+    """
+    回放模式下找不到匹配的录制记录
+    """
+
+
+class Cassette:
+    """
+    请求录制/回放
+    record: 将规范化后的请求/响应对（含耗时）追加写入JSONL文件
+    replay: 启动时把JSONL加载为内存哈希索引，匹配的请求直接返回录制的响应，不访问网络
+    """
+
+    def __init__(self, path: Optional[str] = None, mode: str = MODE_RECORD,
+                 match_on: Optional[Iterable[str]] = None, ignore_headers: Optional[Iterable[str]] = None):
+        """
+        初始化录制/回放
+        :param path: JSONL文件路径
+        :param mode: record 或 replay
+        :param match_on: 匹配维度，可选 method、url、body、headers
+        :param ignore_headers: 匹配headers维度时忽略的请求头（同时不写入录制文件）
+        """
+        if mode not in (MODE_RECORD, MODE_REPLAY):
+            raise ValueError(f"不支持的录制模式: {mode}")
+        self.path = path or DEFAULT_CASSETTE_PATH
+        self.mode = mode
+        self.match_on = tuple(match_on or DEFAULT_MATCH_ON)
+        self.ignore_headers = {h.lower() for h in (ignore_headers or DEFAULT_IGNORE_HEADERS)}
+        self._lock = threading.Lock()
+        self._index: Dict[str, List[Dict]] = {}
+        self._cursor: Dict[str, int] = {}
+        if mode == MODE_REPLAY:
+            self.load()
+
+    @staticmethod
+    def normalize_url(url: str) -> str:
+        """
+        规范化URL：scheme/host小写，查询参数排序，去掉fragment
+        """
+        parts = urlsplit(url)
+        query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+        return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or '/', query, ''))
+
+    @staticmethod
+    def body_hash(body) -> str:
+        """
+        计算请求体摘要，JSON请求体按排序后的key计算，避免字段顺序影响匹配
+        """
+        if body is None:
+            return ''
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        if not isinstance(body, bytes):
+            # 生成器/文件等流式请求体无法计算摘要
+            return 'stream'
+        try:
+            body = json.dumps(json.loads(body), sort_keys=True, ensure_ascii=False).encode('utf-8')
+        except ValueError:
+            pass
+        return hashlib.sha256(body).hexdigest()
+
+    @staticmethod
+    def encode_body(body):
+        """
+        请求体/响应体写入JSON：UTF-8文本原样保存，其他字节（压缩后的请求体、二进制内容）保存为base64
+        :return: (保存的内容, 编码 utf-8 或 base64)
+        """
+        if body is None or isinstance(body, str):
+            return body, 'utf-8'
+        try:
+            return body.decode('utf-8'), 'utf-8'
+        except UnicodeDecodeError:
+            return base64.b64encode(body).decode('ascii'), 'base64'
+
+    @staticmethod
+    def decode_body(body: Optional[str], encoding: Optional[str]) -> Optional[bytes]:
+        """
+        还原录制的原始字节
+        """
+        if body is None:
+            return None
+        if encoding == 'base64':
+            return base64.b64decode(body)
+        return body.encode('utf-8')
+
+    def _filtered_headers(self, headers) -> Dict:
+        return {k.lower(): v for k, v in (headers or {}).items() if k.lower() not in self.ignore_headers}
+
+    def make_key(self, request: requests.PreparedRequest) -> str:
+        """
+        根据匹配维度生成请求键
+        :param request: 预处理后的请求
+        :return: 请求键
+        """
+        parts = []
+        if 'method' in self.match_on:
+            parts.append(request.method.upper())
+        if 'url' in self.match_on:
+            parts.append(self.normalize_url(request.url))
+        if 'body' in self.match_on:
+            parts.append(self.body_hash(request.body))
+        if 'headers' in self.match_on:
+            parts.append(json.dumps(sorted(self._filtered_headers(request.headers).items())))
+        return hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()
+
+    def load(self):
+        """
+        加载JSONL文件并建立哈希索引（按当前匹配维度）
+        """
+        self._index.clear()
+        self._cursor.clear()
+        if not os.path.exists(self.path):
+            logger.warning(f"录制文件不存在: {self.path}")
+            return
+        count = 0
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if not isinstance(entry, dict) or 'request' not in entry or 'response' not in entry:
+                    continue
+                request = requests.Request(
+                    method=entry['request']['method'],
+                    url=entry['request']['url'],
+                    headers=entry['request'].get('headers') or {},
+                ).prepare()
+                request.body = self.decode_body(entry['request'].get('body'), entry['request'].get('body_encoding'))
+                self._index.setdefault(self.make_key(request), []).append(entry)
+                count += 1
+        logger.info(f"已加载录制记录 {count} 条: {self.path}")
+
+    def record(self, response: requests.Response, timing: Optional[Dict] = None):
+        """
+        追加一条请求/响应记录
+        :param response: 已读取响应体的响应对象
+        :param timing: 请求耗时
+        """
+        request = response.request
+        body = request.body
+        if body is not None and not isinstance(body, (str, bytes)):
+            # 生成器、文件等请求体已发送完毕，无法保存，回放时也无法按请求体匹配
+            logger.warning(f"请求体不能录制，跳过: {request.method} {request.url}")
+            return
+        request_body, request_body_encoding = self.encode_body(body)
+        response_body, body_encoding = self.encode_body(response.content or b'')
+        entry = {
+            'key': self.make_key(request),
+            'recorded_at': datetime.now().isoformat(timespec='seconds'),
+            'request': {
+                'method': request.method,
+                'url': self.normalize_url(request.url),
+                'headers': self._filtered_headers(request.headers),
+                'body': request_body,
+                'body_encoding': request_body_encoding,
+            },
+            'response': {
+                'status_code': response.status_code,
+                'reason': response.reason,
+                'headers': {k: v for k, v in response.headers.items()
+                            if k.lower() not in _DROP_RESPONSE_HEADERS},
+                'body': response_body,
+                'body_encoding': body_encoding,
+            },
+            'timing': timing,
+        }
+        line = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+
+    def replay(self, request: requests.PreparedRequest) -> requests.Response:
+        """
+        返回匹配的录制响应；同一请求录制了多次时按录制顺序依次返回，之后重复最后一条
+        :param request: 预处理后的请求
+        :return: 构造的响应对象
+        """
+        key = self.make_key(request)
+        with self._lock:
+            entries = self._index.get(key)
+            if not entries:
+                raise CassetteMiss(f"回放未命中: {request.method} {request.url}", request=request)
+            position = self._cursor.get(key, 0)
+            entry = entries[min(position, len(entries) - 1)]
+            self._cursor[key] = position + 1
+
+        recorded = entry['response']
+        content = self.decode_body(recorded.get('body'), recorded.get('body_encoding')) or b''
+        response = requests.Response()
+        response.status_code = recorded['status_code']
+        response.reason = recorded.get('reason')
+        response.headers = CaseInsensitiveDict(recorded.get('headers') or {})
+        response._content = content
+        response._content_consumed = True
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        response.recorded_timing = entry.get('timing')
+        response.replayed = True
+        return response
+
+
+_default_cassette = None
+_default_cassette_loaded = False
+_default_cassette_lock = threading.Lock()
+
+
+def get_default_cassette() -> Optional[Cassette]:
+    """
+    根据配置创建进程级默认录制/回放实例
+    环境变量 HTTP_CASSETTE_MODE / HTTP_CASSETTE_PATH 优先于 conf/interface_info.yaml 的 global.cassette
+    :return: Cassette，未开启时返回None
+    """
+    global _default_cassette, _default_cassette_loaded
+    if not _default_cassette_loaded:
+        with _default_cassette_lock:
+            if not _default_cassette_loaded:
+                cassette_config = get_config('global', 'cassette', default={}) or {}
+                mode = os.environ.get('HTTP_CASSETTE_MODE') or cassette_config.get('mode') or MODE_OFF
+                path = os.environ.get('HTTP_CASSETTE_PATH') or cassette_config.get('path')
+                if path and not os.path.isabs(path):
+                    path = os.path.join(BASE_DIR, path)
+                if mode != MODE_OFF:
+                    _default_cassette = Cassette(
+                        path=path, mode=mode,
+                        match_on=cassette_config.get('match_on'),
+                        ignore_headers=cassette_config.get('ignore_headers'),
+                    )
+                    logger.info(f"HTTP录制/回放已开启: mode={mode} path={_default_cassette.path}")
+                _default_cassette_loaded = True
+    return _default_cassette
+
+
+def set_default_cassette(cassette: Optional[Cassette]):
+    """
+    设置进程级默认录制/回放实例（传入None关闭）
+    """
+    global _default_cassette, _default_cassette_loaded
+    with _default_cassette_lock:
+        _default_cassette = cassette
+        _default_cassette_loaded = True
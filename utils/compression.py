@@ -0,0 +1,191 @@
+# coding: utf-8
+# @Author: bgtech
+import gzip
+import threading
+import zlib
+import logging
+from typing import Dict, Optional, Tuple
+
+import requests
+
+from common.config import get_config
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# brotli / zstd 为可选依赖，未安装时不参与协商也不能用于请求体压缩
+try:
+    try:
+        import brotli
+    except ImportError:
+        import brotlicffi as brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    brotli = None
+    BROTLI_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    zstandard = None
+    ZSTD_AVAILABLE = False
+
+DEFAULT_MIN_SIZE = 1024
+# 响应编码按压缩率从高到低的优先级及q值
+_ENCODING_PREFERENCE = (('zstd', 1.0), ('br', 0.9), ('gzip', 0.8), ('deflate', 0.5))
+
+
+def available_encodings() -> Tuple[str, ...]:
+    """
+    当前环境可用的编码（按优先级从高到低）
+    """
+    available = {'gzip', 'deflate'}
+    if BROTLI_AVAILABLE:
+        available.add('br')
+    if ZSTD_AVAILABLE:
+        available.add('zstd')
+    return tuple(name for name, _ in _ENCODING_PREFERENCE if name in available)
+
+
+def accept_encoding() -> str:
+    """
+    生成Accept-Encoding请求头，优先协商压缩率最高的可用编码
+    :return: 如 'br, gzip;q=0.8, deflate;q=0.5'
+    """
+    available = available_encodings()
+    top = available[0]
+    parts = []
+    for name, q in _ENCODING_PREFERENCE:
+        if name in available:
+            parts.append(name if name == top else f"{name};q={q}")
+    return ', '.join(parts)
+
+
+def compress_body(body: bytes, encoding: str) -> bytes:
+    """
+    压缩请求体
+    :param body: 原始请求体
+    :param encoding: gzip / deflate / br / zstd
+    :return: 压缩后的字节
+    """
+    if encoding == 'gzip':
+        # 固定mtime，相同请求体压缩结果一致（录制回放按请求体摘要匹配）
+        return gzip.compress(body, mtime=0)
+    if encoding == 'deflate':
+        return zlib.compress(body)
+    if encoding == 'br':
+        if not BROTLI_AVAILABLE:
+            raise ValueError("brotli未安装，无法使用br压缩")
+        return brotli.compress(body)
+    if encoding == 'zstd':
+        if not ZSTD_AVAILABLE:
+            raise ValueError("zstandard未安装，无法使用zstd压缩")
+        return zstandard.ZstdCompressor().compress(body)
+    raise ValueError(f"不支持的压缩编码: {encoding}")
+
+
+def resolve_request_encoding(encoding: Optional[str]) -> Optional[str]:
+    """
+    校验请求体压缩编码，不可用时回退为gzip
+    :param encoding: 期望的编码，None或空表示不压缩
+    """
+    if not encoding:
+        return None
+    encoding = encoding.lower()
+    if encoding in available_encodings():
+        return encoding
+    logger.warning(f"请求体压缩编码 {encoding} 不可用，改用gzip")
+    return 'gzip'
+
+
+def get_compression_config() -> Dict:
+    """
+    读取 conf/interface_info.yaml 的 global.compression 配置
+    """
+    return get_config('global', 'compression', default={}) or {}
+
+
+class BandwidthStats:
+    """
+    按接口汇总的流量统计
+    wire_bytes 为线路上实际传输的响应体字节数（压缩后），decoded_bytes 为解码后的字节数；
+    请求体同样区分压缩前后大小
+    """
+
+    _FIELDS = ('requests', 'request_bytes', 'request_wire_bytes', 'wire_bytes', 'decoded_bytes')
+
+    def __init__(self):
+        self._stats: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, request_bytes: int = 0, request_wire_bytes: int = 0,
+               wire_bytes: int = 0, decoded_bytes: int = 0):
+        """
+        记录一次请求的流量
+        :param endpoint: 接口标识，如 'GET user.get_user_info'
+        :param request_bytes: 请求体原始字节数
+        :param request_wire_bytes: 请求体实际发送字节数
+        :param wire_bytes: 响应体线路字节数
+        :param decoded_bytes: 响应体解码后字节数
+        """
+        with self._lock:
+            stats = self._stats.setdefault(endpoint, dict.fromkeys(self._FIELDS, 0))
+            stats['requests'] += 1
+            stats['request_bytes'] += request_bytes
+            stats['request_wire_bytes'] += request_wire_bytes
+            stats['wire_bytes'] += wire_bytes
+            stats['decoded_bytes'] += decoded_bytes
+
+    def get_stats(self) -> Dict[str, Dict]:
+        """
+        获取各接口的流量统计（按线路总字节数从高到低）
+        """
+        with self._lock:
+            items = [(k, dict(v)) for k, v in self._stats.items()]
+        items.sort(key=lambda item: item[1]['wire_bytes'] + item[1]['request_wire_bytes'], reverse=True)
+        for _, stats in items:
+            decoded = stats['decoded_bytes']
+            stats['compression_ratio'] = round(stats['wire_bytes'] / decoded, 3) if decoded else None
+        return dict(items)
+
+    def report(self) -> str:
+        """
+        生成流量汇总文本
+        """
+        stats = self.get_stats()
+        if not stats:
+            return ''
+        lines = ['接口流量统计（字节）:',
+                 f"{'接口':<50} {'请求数':>8} {'请求体':>12} {'请求体(线路)':>14} {'响应体(线路)':>14} {'响应体(解码)':>14}"]
+        for endpoint, s in stats.items():
+            lines.append(f"{endpoint:<50} {s['requests']:>8} {s['request_bytes']:>12} "
+                         f"{s['request_wire_bytes']:>14} {s['wire_bytes']:>14} {s['decoded_bytes']:>14}")
+        return '\n'.join(lines)
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+def response_wire_bytes(response: requests.Response) -> Optional[int]:
+    """
+    响应体在线路上的字节数（解码前），缓存/回放的响应返回None
+    """
+    raw = getattr(response, 'raw', None)
+    if raw is None or not hasattr(raw, 'tell'):
+        return None
+    try:
+        return raw.tell()
+    except (OSError, ValueError):
+        return None
+
+
+_bandwidth_stats = BandwidthStats()
+
+
+def get_bandwidth_stats() -> BandwidthStats:
+    """
+    获取进程级流量统计
+    """
+    return _bandwidth_stats
@@ -1,19 +1,26 @@
 # coding: utf-8
 # @Author: bgtech
 import pytest
-from utils.token_utils import get_token
+from utils.token_utils import get_token_manager, token_property
 
-@pytest.fixture(scope='session', autouse=True)
-def global_token():
-    # 这里的url和data可以从配置文件读取
-    login_url = 'http://example.com/api/login'
-    login_data = {'username': 'user', 'password': 'pass'}
-    token = get_token(login_url, login_data)
-    return token
+@pytest.fixture(scope='session')
+def token_manager():
+    """
+    token管理器，登录地址和账号读取 global.auth 配置
+    """
+    return get_token_manager()
+
+@pytest.fixture(scope='session')
+def global_token(token_manager):
+    """
+    首次使用该fixture时才登录，之后复用缓存（到期前自动刷新）
+    """
+    return token_manager.get_token()
 
 @pytest.fixture(autouse=True)
-def inject_token(request, global_token):
+def inject_token(request, token_manager):
     """
-    自动为每个用例注入token到request上下文
+    自动为每个用例注入token到request上下文（首次使用时才登录）
     """
-    request.cls.token = global_token
\ No newline at end of file
+    if request.cls is not None:
+        request.cls.token = token_property(token_manager)
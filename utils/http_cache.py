@@ -0,0 +1,365 @@
+# coding: utf-8
+# @Author: bgtech
+import hashlib
+import json
+import os
+import threading
+import time
+import logging
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from common.config import get_config
+from common.temp_utils import TEMP_DIR
+from utils.cassette import Cassette
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+DEFAULT_DISK_DIR = os.path.join(TEMP_DIR, 'http_cache')
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_DISK_BYTES = 512 * 1024 * 1024
+# 响应体以解码后内容缓存，这些头不再适用
+_DROP_HEADERS = ('content-encoding', 'transfer-encoding', 'content-length')
+
+
+def parse_cache_control(value: Optional[str]) -> Dict:
+    """
+    解析Cache-Control头
+    :param value: 头部值，如 'max-age=60, no-cache'
+    :return: 指令字典，无值指令为True
+    """
+    directives = {}
+    for part in (value or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, arg = part.partition('=')
+        directives[name.strip().lower()] = arg.strip().strip('"') if arg else True
+    return directives
+
+
+def _http_date(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+class CacheEntry:
+    """
+    缓存条目
+    """
+
+    def __init__(self, url: str, status_code: int, headers: Dict, content: bytes,
+                 stored_at: float, vary: Optional[Dict] = None):
+        self.url = url
+        self.status_code = status_code
+        self.headers = {k: v for k, v in headers.items() if k.lower() not in _DROP_HEADERS}
+        self.content = content
+        self.stored_at = stored_at
+        self.vary = vary or {}
+        self.freshness = self._freshness_lifetime()
+
+    @property
+    def size(self) -> int:
+        return len(self.content)
+
+    @property
+    def etag(self) -> Optional[str]:
+        return CaseInsensitiveDict(self.headers).get('ETag')
+
+    @property
+    def last_modified(self) -> Optional[str]:
+        return CaseInsensitiveDict(self.headers).get('Last-Modified')
+
+    def _freshness_lifetime(self) -> float:
+        """
+        计算新鲜期（秒），no-cache或无显式过期信息时为0（每次都需要重新验证）
+        """
+        headers = CaseInsensitiveDict(self.headers)
+        directives = parse_cache_control(headers.get('Cache-Control'))
+        if 'no-cache' in directives:
+            return 0.0
+        try:
+            age = max(float(headers.get('Age', 0) or 0), 0.0)
+        except ValueError:
+            # 格式错误的Age头按0处理
+            age = 0.0
+        for name in ('s-maxage', 'max-age'):
+            if name in directives:
+                try:
+                    return max(float(directives[name]) - age, 0.0)
+                except ValueError:
+                    return 0.0
+        expires = _http_date(headers.get('Expires'))
+        if expires is not None:
+            date = _http_date(headers.get('Date')) or self.stored_at
+            return max(expires - date, 0.0)
+        return 0.0
+
+    def is_fresh(self, now: Optional[float] = None) -> bool:
+        return (now or time.time()) - self.stored_at < self.freshness
+
+    def refresh(self, headers: Dict):
+        """
+        304响应后更新头部与新鲜期
+        """
+        for k, v in headers.items():
+            if k.lower() not in _DROP_HEADERS:
+                self.headers[k] = v
+        self.stored_at = time.time()
+        self.freshness = self._freshness_lifetime()
+
+    def to_response(self, request: requests.PreparedRequest, cache_status: str) -> requests.Response:
+        """
+        构造响应对象
+        :param request: 当前请求
+        :param cache_status: hit 或 revalidated
+        """
+        response = requests.Response()
+        response.status_code = self.status_code
+        response.headers = CaseInsensitiveDict(self.headers)
+        response._content = self.content
+        response._content_consumed = True
+        response.url = self.url
+        response.request = request
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers) or 'utf-8'
+        response.from_cache = True
+        response.cache_status = cache_status
+        return response
+
+    def to_dict(self) -> Dict:
+        return {'url': self.url, 'status_code': self.status_code, 'headers': self.headers,
+                'stored_at': self.stored_at, 'vary': self.vary}
+
+
+class HTTPCache:
+    """
+    条件GET响应缓存
+    遵循Cache-Control/Expires判断新鲜度，过期后携带If-None-Match/If-Modified-Since重新验证；
+    内存中按字节数限制的LRU，可选写入磁盘（temp/http_cache）
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, disk: bool = False,
+                 disk_dir: Optional[str] = None, max_disk_bytes: int = DEFAULT_MAX_DISK_BYTES):
+        """
+        初始化缓存
+        :param max_bytes: 内存缓存最大字节数
+        :param disk: 是否同时写入磁盘
+        :param disk_dir: 磁盘缓存目录
+        :param max_disk_bytes: 磁盘缓存最大字节数
+        """
+        self.max_bytes = max_bytes
+        self.disk = disk
+        self.disk_dir = disk_dir or DEFAULT_DISK_DIR
+        self.max_disk_bytes = max_disk_bytes
+        self._entries: 'OrderedDict[str, CacheEntry]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'revalidated': 0, 'stores': 0, 'evictions': 0}
+        if disk:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(request: requests.PreparedRequest) -> str:
+        """
+        缓存键：规范化URL + 认证身份摘要
+        """
+        auth = request.headers.get('Authorization', '')
+        raw = f"{Cassette.normalize_url(request.url)}\n{auth}"
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _vary_values(vary_header: Optional[str], request_headers) -> Optional[Dict]:
+        names = [n.strip().lower() for n in (vary_header or '').split(',') if n.strip()]
+        if '*' in names:
+            return None
+        return {name: request_headers.get(name) for name in names}
+
+    def lookup(self, request: requests.PreparedRequest) -> Optional[CacheEntry]:
+        """
+        查找缓存条目（先内存后磁盘），Vary不匹配时视为未命中
+        """
+        key = self.make_key(request)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None and self.disk:
+            entry = self._load_from_disk(key)
+            if entry is not None:
+                self._store_memory(key, entry)
+        if entry is None:
+            return None
+        for name, value in entry.vary.items():
+            if request.headers.get(name) != value:
+                return None
+        return entry
+
+    def conditional_headers(self, entry: CacheEntry) -> Dict:
+        """
+        重新验证使用的条件请求头
+        """
+        headers = {}
+        if entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def store(self, response: requests.Response, request: Optional[requests.PreparedRequest] = None):
+        """
+        按Cache-Control判断是否可缓存并保存
+        :param response: 已读取响应体的GET响应
+        :param request: 原始请求（发生重定向时用于生成缓存键），默认取response.request
+        """
+        request = request or response.request
+        if response.status_code != 200:
+            return
+        directives = parse_cache_control(response.headers.get('Cache-Control'))
+        if 'no-store' in directives:
+            return
+        vary = self._vary_values(response.headers.get('Vary'), request.headers)
+        if vary is None:
+            return
+        entry = CacheEntry(response.url, response.status_code, dict(response.headers),
+                           response.content, time.time(), vary)
+        # 既无新鲜期也无验证器的响应无法复用
+        if entry.freshness <= 0 and not entry.etag and not entry.last_modified:
+            return
+        if entry.size > self.max_bytes:
+            return
+        key = self.make_key(request)
+        self._store_memory(key, entry)
+        with self._lock:
+            self.stats['stores'] += 1
+        if self.disk:
+            self._save_to_disk(key, entry)
+
+    def touch(self, entry: CacheEntry, response: requests.Response, request: requests.PreparedRequest):
+        """
+        304后刷新条目
+        """
+        entry.refresh(dict(response.headers))
+        if self.disk:
+            self._save_to_disk(self.make_key(request), entry)
+
+    def _store_memory(self, key: str, entry: CacheEntry):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.size
+            self._entries[key] = entry
+            self._bytes += entry.size
+            while self._bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                self.stats['evictions'] += 1
+
+    def _disk_paths(self, key: str):
+        return os.path.join(self.disk_dir, f"{key}.json"), os.path.join(self.disk_dir, f"{key}.body")
+
+    def _save_to_disk(self, key: str, entry: CacheEntry):
+        meta_path, body_path = self._disk_paths(key)
+        try:
+            with open(body_path, 'wb') as f:
+                f.write(entry.content)
+            with open(meta_path, 'w', encoding='utf-8') as f:
+                json.dump(entry.to_dict(), f, ensure_ascii=False)
+            self._prune_disk()
+        except OSError as e:
+            logger.warning(f"写入磁盘缓存失败: {e}")
+
+    def _load_from_disk(self, key: str) -> Optional[CacheEntry]:
+        meta_path, body_path = self._disk_paths(key)
+        if not os.path.exists(meta_path) or not os.path.exists(body_path):
+            return None
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(body_path, 'rb') as f:
+                content = f.read()
+        except (OSError, ValueError):
+            return None
+        return CacheEntry(meta['url'], meta['status_code'], meta['headers'], content,
+                          meta['stored_at'], meta.get('vary'))
+
+    def _prune_disk(self):
+        """
+        磁盘缓存超出上限时按修改时间删除最旧的条目
+        """
+        files = []
+        total = 0
+        for name in os.listdir(self.disk_dir):
+            path = os.path.join(self.disk_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, path, stat.st_size))
+            total += stat.st_size
+        if total <= self.max_disk_bytes:
+            return
+        for _, path, size in sorted(files):
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            if total <= self.max_disk_bytes:
+                break
+
+    def record(self, status: str):
+        """
+        更新命中统计
+        :param status: hits / misses / revalidated
+        """
+        with self._lock:
+            self.stats[status] += 1
+
+    def get_stats(self) -> Dict:
+        """
+        获取缓存统计：hits、misses、revalidated、stores、evictions、entries、bytes
+        """
+        with self._lock:
+            return dict(self.stats, entries=len(self._entries), bytes=self._bytes)
+
+    def clear(self):
+        """
+        清空内存缓存（磁盘缓存可通过 temp_utils.clean_temp_dir 清理）
+        """
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+_default_cache = None
+_default_cache_loaded = False
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache() -> Optional[HTTPCache]:
+    """
+    根据 conf/interface_info.yaml 的 global.http_cache 创建进程级默认缓存
+    :return: HTTPCache，未开启时返回None
+    """
+    global _default_cache, _default_cache_loaded
+    if not _default_cache_loaded:
+        with _default_cache_lock:
+            if not _default_cache_loaded:
+                cache_config = get_config('global', 'http_cache', default={}) or {}
+                if cache_config.get('enabled'):
+                    _default_cache = HTTPCache(
+                        max_bytes=int(cache_config.get('max_bytes', DEFAULT_MAX_BYTES)),
+                        disk=bool(cache_config.get('disk', False)),
+                        max_disk_bytes=int(cache_config.get('max_disk_bytes', DEFAULT_MAX_DISK_BYTES)),
+                    )
+                _default_cache_loaded = True
+    return _default_cache
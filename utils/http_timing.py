@@ -0,0 +1,235 @@
+# coding: utf-8
+# @Author: bgtech
+import ipaddress
+import socket
+import threading
+import time
+import logging
+from typing import Dict, Optional
+
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+class RequestTiming:
+    """
+    单次请求的分阶段耗时（毫秒，基于单调时钟）
+    dns: 域名解析；connect: TCP建连；tls: TLS握手；
+    ttfb: 连接就绪到收到响应头（发送请求+服务端处理）；download: 读取响应体；total: 总耗时
+    复用已有连接时 dns/connect/tls 为0，reused 为True
+    """
+
+    PHASES = ('dns', 'connect', 'tls', 'ttfb', 'download')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.end = None
+        self.dns = 0.0
+        self.connect = 0.0
+        self.tls = 0.0
+        self.ttfb = 0.0
+        self.download = 0.0
+        self.new_connections = 0
+        self._hop_start = None
+        self._hop_connect_cost = 0.0
+
+    @property
+    def total(self) -> float:
+        end = self.end if self.end is not None else time.perf_counter()
+        return (end - self.start) * 1000
+
+    @property
+    def reused(self) -> bool:
+        return self.new_connections == 0
+
+    def send_started(self):
+        """
+        适配器开始发送（每次重定向各记一次）
+        """
+        self._hop_start = time.perf_counter()
+        self._hop_connect_cost = self.dns + self.connect + self.tls
+
+    def headers_received(self):
+        """
+        收到响应头，累计本次发送中除建连外的等待时间
+        """
+        if self._hop_start is None:
+            return
+        hop = (time.perf_counter() - self._hop_start) * 1000
+        connect_cost = self.dns + self.connect + self.tls - self._hop_connect_cost
+        self.ttfb += max(hop - connect_cost, 0.0)
+        self._hop_start = None
+
+    def finish(self):
+        """
+        结束计时
+        """
+        if self.end is None:
+            self.end = time.perf_counter()
+
+    def to_dict(self) -> Dict:
+        """
+        转换为字典
+        :return: 各阶段耗时（毫秒）
+        """
+        result = {f"{phase}_ms": round(getattr(self, phase), 3) for phase in self.PHASES}
+        result['total_ms'] = round(self.total, 3)
+        result['reused_connection'] = self.reused
+        return result
+
+    def summary(self) -> str:
+        """
+        单行耗时摘要，用于日志
+        """
+        parts = ' '.join(f"{phase}={getattr(self, phase):.1f}ms" for phase in self.PHASES)
+        return f"total={self.total:.1f}ms {parts} reused={self.reused}"
+
+
+def start_timing() -> RequestTiming:
+    """
+    为当前线程开始一次请求计时
+    :return: 计时对象
+    """
+    timing = RequestTiming()
+    _local.current = timing
+    return timing
+
+
+def current_timing() -> Optional[RequestTiming]:
+    """
+    获取当前线程正在进行的请求计时
+    """
+    return getattr(_local, 'current', None)
+
+
+def finish_timing(timing: RequestTiming) -> Dict:
+    """
+    结束计时并记录为当前线程的最近一次请求耗时
+    :param timing: 计时对象
+    :return: 耗时字典
+    """
+    timing.finish()
+    if getattr(_local, 'current', None) is timing:
+        _local.current = None
+    _local.last = timing.to_dict()
+    return _local.last
+
+
+def get_last_timing() -> Optional[Dict]:
+    """
+    获取当前线程最近一次完成的请求耗时（便捷函数返回JSON数据时可通过此函数获取）
+    :return: 耗时字典，尚无请求时返回None
+    """
+    return getattr(_local, 'last', None)
+
+
+def _is_ip_address(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host.strip('[]'))
+        return True
+    except ValueError:
+        return False
+
+
+class _TimedConnectionMixin:
+    """
+    记录DNS解析和TCP建连耗时
+    """
+
+    def _new_conn(self):
+        timing = current_timing()
+        if timing is None:
+            return super()._new_conn()
+
+        timing.new_connections += 1
+        dns_host = self._dns_host
+        addresses = []
+        if not _is_ip_address(dns_host):
+            dns_start = time.perf_counter()
+            try:
+                for info in socket.getaddrinfo(dns_host, self.port, 0, socket.SOCK_STREAM):
+                    if info[4][0] not in addresses:
+                        addresses.append(info[4][0])
+            except OSError:
+                # 解析失败交由父类按原有方式报错
+                addresses = []
+            timing.dns += (time.perf_counter() - dns_start) * 1000
+
+        connect_start = time.perf_counter()
+        try:
+            if not addresses:
+                return super()._new_conn()
+            # 与urllib3相同，依次尝试解析到的每个地址，直到建连成功
+            for index, address in enumerate(addresses):
+                self._dns_host = address
+                try:
+                    return super()._new_conn()
+                except (NewConnectionError, ConnectTimeoutError):
+                    if index == len(addresses) - 1:
+                        raise
+                    logger.debug(f"连接 {dns_host}({address}) 失败，尝试下一个地址")
+        finally:
+            self._dns_host = dns_host
+            timing.connect += (time.perf_counter() - connect_start) * 1000
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    """
+    记录DNS解析和TCP建连耗时的HTTP连接
+    """
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    """
+    记录DNS解析、TCP建连和TLS握手耗时的HTTPS连接
+    """
+
+    def connect(self):
+        timing = current_timing()
+        if timing is None:
+            return super().connect()
+
+        before = timing.dns + timing.connect
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            timing.tls += max(elapsed - (timing.dns + timing.connect - before), 0.0)
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """
+    使用计时连接的适配器，请求经过时自动填充当前线程的RequestTiming
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': TimedHTTPConnectionPool,
+            'https': TimedHTTPSConnectionPool,
+        }
+
+    def send(self, request, *args, **kwargs):
+        timing = current_timing()
+        if timing is not None:
+            timing.send_started()
+        response = super().send(request, *args, **kwargs)
+        if timing is not None:
+            timing.headers_received()
+        return response
@@ -1,28 +1,77 @@
 import requests
-from typing import Dict, Any, Optional, Union
+from typing import Dict, Any, Optional, Union, List
 import json
 import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from common.log import api_info
+from common.temp_utils import TEMP_DIR
+from common.interface_config import find_interface
+from common.metrics import endpoint_name, get_metrics, notify_request
+from utils.compression import (DEFAULT_MIN_SIZE, compress_body, get_bandwidth_stats, get_compression_config,
+                               resolve_request_encoding, response_wire_bytes)
+from utils.cassette import Cassette, MODE_RECORD, MODE_REPLAY, get_default_cassette
+from utils.http_cache import HTTPCache, get_default_cache, parse_cache_control
+from utils.http_timing import start_timing, finish_timing
+from utils.rate_limiter import get_rate_limiter, parse_retry_after
+from utils.retry_utils import CircuitBreaker, get_retry_policy, get_circuit_breaker
+from utils.session_pool import build_session, get_session_pool, DEFAULT_POOL_MAXSIZE
+from utils.stream_utils import StreamResponse
+from utils.transfer_utils import (DEFAULT_CHECKSUM, DEFAULT_CHUNK_SIZE, MultipartBody, filename_from_response,
+                                  open_body, save_stream)
 
 # 配置日志
 logger = logging.getLogger(__name__)
 
+# 批量请求默认的并发线程数
+DEFAULT_BATCH_WORKERS = 16
+
 class HTTPUtils:
     """
     HTTP请求工具类
     支持所有HTTP请求方法：GET、POST、DELETE、PUT、PATCH、HEAD、OPTIONS
     """
     
-    def __init__(self, base_url: str = "", default_headers: Optional[Dict] = None, timeout: int = 30):
+    def __init__(self, base_url: str = "", default_headers: Optional[Dict] = None, timeout: int = 30,
+                 use_pool: bool = False, cassette: Optional[Cassette] = None,
+                 cache: Optional[HTTPCache] = None, compress: Optional[str] = None):
         """
         初始化HTTP工具类
         :param base_url: 基础URL
         :param default_headers: 默认请求头
         :param timeout: 默认超时时间（秒）
+        :param use_pool: 是否使用进程级共享会话（按主机复用连接）
+        :param cassette: 请求录制/回放实例，默认使用配置中的全局设置
+        :param cache: 条件GET响应缓存，默认使用配置中的全局设置（未开启时不缓存）
+        :param compress: 请求体压缩编码（gzip/deflate/br/zstd），默认读取 global.compression.request_encoding，为空时不压缩
         """
         self.base_url = base_url.rstrip('/')
         self.default_headers = default_headers or {}
         self.default_timeout = timeout
-        self.session = requests.Session()
+        self.use_pool = use_pool
+        self.session = None if use_pool else build_session()
+        self.last_timing = None
+        self.cassette = cassette if cassette is not None else get_default_cassette()
+        self.cache = cache if cache is not None else get_default_cache()
+        compression_config = get_compression_config()
+        self.compress = resolve_request_encoding(
+            compress if compress is not None else compression_config.get('request_encoding'))
+        self.compress_min_size = int(compression_config.get('min_size', DEFAULT_MIN_SIZE))
+    
+    def _get_session(self, url: str, headers: Dict) -> requests.Session:
+        """
+        获取发送请求所用的会话
+        :param url: 完整请求URL
+        :param headers: 最终请求头
+        :return: 会话对象
+        """
+        if self.use_pool:
+            return get_session_pool().get_session(url, headers.get('Authorization'))
+        return self.session
     
     def _prepare_headers(self, headers: Optional[Dict] = None, token: Optional[str] = None) -> Dict:
         """
@@ -67,24 +116,231 @@ class HTTPUtils:
         elif 'data' in kwargs:
             logger.debug(f"请求体(DATA): {kwargs['data']}")
         
+        # 调用方显式要求流式读取时不在此读取响应体，download耗时为0
+        stream = kwargs.pop('stream', False)
+        # 接口名称（'模块.接口'）用于读取接口级重试等配置，未指定时按URL匹配
+        interface = kwargs.pop('interface', None)
+        if interface is None:
+            matched = find_interface(url, method)
+            interface = matched[0] if matched else None
+        request_bytes = self._compress_body(kwargs, headers, kwargs.pop('compress', self.compress))
+        use_cache = self.cache is not None and method.upper() == 'GET' and not stream
+        timing = start_timing()
         try:
-            response = self.session.request(
-                method=method,
-                url=url,
-                headers=headers,
-                timeout=timeout,
-                **kwargs
-            )
+            session = self._get_session(url, headers)
+            cache_entry = None
+            directives = {}
+            if use_cache:
+                cache_request = session.prepare_request(requests.Request(
+                    method=method, url=url, headers=headers, params=kwargs.get('params')
+                ))
+                # 请求头中的 no-store 不读写缓存，no-cache 使用缓存前必须向服务端重新验证
+                directives = parse_cache_control(cache_request.headers.get('Cache-Control'))
+                if 'no-store' in directives:
+                    use_cache = False
+                else:
+                    cache_entry = self.cache.lookup(cache_request)
+            if cache_entry is not None and cache_entry.is_fresh() and 'no-cache' not in directives:
+                # 缓存仍在新鲜期内，直接返回
+                self.cache.record('hits')
+                response = cache_entry.to_response(cache_request, 'hit')
+            else:
+                if cache_entry is not None:
+                    headers = {**headers, **self.cache.conditional_headers(cache_entry)}
+                response = self._send_with_retry(session, method, url, headers, timeout, kwargs,
+                                                 stream, timing, interface)
+                if use_cache:
+                    if response.status_code == 304 and cache_entry is not None:
+                        self.cache.touch(cache_entry, response, cache_request)
+                        self.cache.record('revalidated')
+                        response = cache_entry.to_response(cache_request, 'revalidated')
+                    else:
+                        self.cache.record('misses')
+                        self.cache.store(response, cache_request)
             
             # 记录响应信息
             logger.info(f"响应状态码: {response.status_code}")
             logger.debug(f"响应头: {dict(response.headers)}")
             
-            return response
-            
         except requests.exceptions.RequestException as e:
+            self.last_timing = finish_timing(timing)
+            endpoint = endpoint_name(method, url, interface)
+            get_metrics().record(endpoint, self.last_timing['total_ms'], error=True)
+            notify_request(endpoint, method, url, None, self.last_timing)
             logger.error(f"请求失败: {e}")
+            api_info(f"请求耗时: {method.upper()} {url} 失败 | {timing.summary()}")
             raise
+        
+        if getattr(response, 'cache_status', None) == 'hit' or getattr(response, 'replayed', False):
+            # 缓存命中和回放的响应没有访问服务端，不计入耗时与接口指标，response.timing 为None
+            # （回放响应录制时的耗时见 response.recorded_timing）
+            response.timing = None
+            source = '回放' if getattr(response, 'replayed', False) else '缓存命中'
+            api_info(f"{source}: {method.upper()} {url} {response.status_code}")
+            return response
+        
+        # 记录分阶段耗时，可通过 response.timing / self.last_timing / get_last_timing() 获取
+        response.timing = self.last_timing = finish_timing(timing)
+        api_info(f"请求耗时: {method.upper()} {url} {response.status_code} | {timing.summary()}")
+        # 按接口收集延迟样本，用于分位数/错误率/吞吐量断言
+        endpoint = endpoint_name(method, url, interface)
+        get_metrics().record(endpoint, response.timing['total_ms'], error=response.status_code >= 400)
+        notify_request(endpoint, method, url, response.status_code, response.timing)
+        if not stream:
+            self._record_bandwidth(method, url, interface, response, request_bytes)
+        # 录制模式：流式请求的响应体尚未读取，缓存命中未访问后端，均不录制
+        if (self.cassette is not None and self.cassette.mode == MODE_RECORD and not stream
+                and not getattr(response, 'from_cache', False)):
+            self.cassette.record(response, response.timing)
+        return response
+    
+    def _send_with_retry(self, session: requests.Session, method: str, url: str, headers: Dict,
+                         timeout, kwargs: Dict, stream: bool, timing, interface: Optional[str]) -> requests.Response:
+        """
+        按重试策略发送请求，并经过主机熔断器
+        :return: 最后一次请求的响应（非流式时已读取响应体）
+        """
+        if self.cassette is not None and self.cassette.mode == MODE_REPLAY:
+            return self._read_body(self._send(session, method, url, headers, timeout, kwargs), stream, timing)
+        
+        policy = get_retry_policy(interface)
+        breaker = get_circuit_breaker(url)
+        limiter = get_rate_limiter(url, interface)
+        attempt = 0
+        while True:
+            attempt += 1
+            if breaker is not None:
+                breaker.before_request()
+            if limiter is not None:
+                limiter.acquire()
+            try:
+                response = self._read_body(self._send(session, method, url, headers, timeout, kwargs),
+                                           stream, timing)
+            except requests.exceptions.RequestException as e:
+                if breaker is not None:
+                    breaker.record_failure()
+                # 熔断器已打开时不再等待重试
+                if not policy.should_retry_exception(method, attempt, e) or (
+                        breaker is not None and breaker.state == CircuitBreaker.OPEN) or not self._rewind_body(kwargs):
+                    raise
+                delay = policy.get_backoff(attempt)
+                logger.warning(f"请求异常，{delay:.2f}秒后第{attempt + 1}次尝试: {e}")
+                time.sleep(delay)
+                continue
+            
+            if breaker is not None:
+                if response.status_code >= 500:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+            # 被限流时遵循Retry-After，同一限流器上排队的请求一并暂停
+            retry_after = None
+            if response.status_code in (429, 503):
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                if retry_after is not None and limiter is not None:
+                    limiter.pause(retry_after)
+            if not policy.should_retry_status(method, attempt, response.status_code) or (
+                    breaker is not None and breaker.state == CircuitBreaker.OPEN) or not self._rewind_body(kwargs):
+                return response
+            delay = max(policy.get_backoff(attempt), retry_after or 0.0)
+            logger.warning(f"响应状态码 {response.status_code}，{delay:.2f}秒后第{attempt + 1}次尝试")
+            response.close()
+            time.sleep(delay)
+    
+    @staticmethod
+    def _rewind_body(kwargs: Dict) -> bool:
+        """
+        重试前将流式请求体复位到开头
+        :return: 请求体能否重新发送（生成器等一次性请求体返回False，不再重试）
+        """
+        data = kwargs.get('data')
+        if data is None or isinstance(data, (bytes, str, dict, list, tuple)):
+            return True
+        if not hasattr(data, 'seek'):
+            return False
+        try:
+            data.seek(0)
+        except (OSError, ValueError):
+            return False
+        return True
+    
+    def _compress_body(self, kwargs: Dict, headers: Dict, encoding: Optional[str]) -> Optional[int]:
+        """
+        按配置压缩请求体并设置Content-Encoding（表单字典、文件、生成器等请求体不压缩）
+        :param kwargs: 请求参数，压缩后以 data 替换 json/data
+        :param headers: 请求头
+        :param encoding: 压缩编码，None表示不压缩
+        :return: 压缩前的请求体字节数，未压缩时返回None
+        """
+        header_names = {k.lower() for k in headers}
+        if not encoding or 'content-encoding' in header_names:
+            return None
+        if kwargs.get('json') is not None and kwargs.get('data') is None:
+            body = json.dumps(kwargs['json'], allow_nan=False).encode('utf-8')
+        elif isinstance(kwargs.get('data'), (bytes, str)):
+            body = kwargs['data']
+            body = body.encode('utf-8') if isinstance(body, str) else body
+        else:
+            return None
+        if len(body) < self.compress_min_size:
+            return None
+        if kwargs.pop('json', None) is not None and 'content-type' not in header_names:
+            headers['Content-Type'] = 'application/json'
+        kwargs['data'] = compress_body(body, encoding)
+        headers['Content-Encoding'] = encoding
+        return len(body)
+    
+    @staticmethod
+    def _record_bandwidth(method: str, url: str, interface: Optional[str], response: requests.Response,
+                          request_bytes: Optional[int]):
+        """
+        记录请求/响应的线路字节数与解码后字节数（缓存命中和回放的响应未经网络，不计入）
+        """
+        wire_bytes = response_wire_bytes(response)
+        if wire_bytes is None or getattr(response, 'from_cache', False):
+            return
+        body = response.request.body if response.request is not None else None
+        request_wire_bytes = len(body) if isinstance(body, (bytes, str)) else 0
+        decoded_bytes = len(response.content or b'')
+        response.bandwidth = {
+            'request_bytes': request_bytes if request_bytes is not None else request_wire_bytes,
+            'request_wire_bytes': request_wire_bytes,
+            'wire_bytes': wire_bytes,
+            'decoded_bytes': decoded_bytes,
+        }
+        get_bandwidth_stats().record(endpoint_name(method, url, interface), **response.bandwidth)
+    
+    @staticmethod
+    def _read_body(response: requests.Response, stream: bool, timing) -> requests.Response:
+        """
+        非流式请求读取响应体并记录download耗时
+        """
+        if not stream:
+            download_start = time.perf_counter()
+            response.content
+            timing.download = (time.perf_counter() - download_start) * 1000
+        return response
+    
+    def _send(self, session: requests.Session, method: str, url: str, headers: Dict,
+              timeout, kwargs: Dict) -> requests.Response:
+        """
+        实际发送请求（回放模式下从录制文件返回）
+        :return: 以stream=True发送、尚未读取响应体的响应
+        """
+        if self.cassette is not None and self.cassette.mode == MODE_REPLAY:
+            prepared = session.prepare_request(requests.Request(
+                method=method, url=url, headers=headers,
+                **{k: kwargs[k] for k in ('params', 'data', 'json', 'files') if k in kwargs}
+            ))
+            return self.cassette.replay(prepared)
+        return session.request(
+            method=method,
+            url=url,
+            headers=headers,
+            timeout=timeout,
+            stream=True,
+            **kwargs
+        )
     
     def get(self, url: str, params: Optional[Dict] = None, headers: Optional[Dict] = None, 
             token: Optional[str] = None, **kwargs) -> Union[Dict, Any]:
@@ -227,6 +483,184 @@ class HTTPUtils:
         else:
             return response.json() if response.content else None
     
+    def batch(self, request_specs: List[Dict], max_workers: int = DEFAULT_BATCH_WORKERS,
+              per_host_limit: Optional[int] = None) -> List[Dict]:
+        """
+        在线程池中并发执行一批请求，结果顺序与输入一致
+        单个请求失败不影响其他请求，错误记录在对应结果的 error 字段中
+        :param request_specs: 请求描述列表，如 [{'method': 'GET', 'url': '/users', 'params': {...}}]，
+                              其余字段（json_data/json、data、headers、token、timeout、interface等）透传给请求
+        :param max_workers: 最大并发线程数
+        :param per_host_limit: 同一主机的最大并发请求数，默认等于连接池大小，避免超出连接池后反复新建连接
+        :return: 结果列表，每项包含 index、method、url、status_code、data、error、timing、elapsed_ms
+        """
+        if not request_specs:
+            return []
+        if per_host_limit is None:
+            per_host_limit = get_session_pool().pool_maxsize if self.use_pool else DEFAULT_POOL_MAXSIZE
+        host_semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        semaphores_lock = threading.Lock()
+        
+        def host_semaphore(url: str) -> threading.BoundedSemaphore:
+            if not url.startswith(('http://', 'https://')):
+                url = self.base_url
+            host = urlsplit(url).netloc.lower()
+            with semaphores_lock:
+                if host not in host_semaphores:
+                    host_semaphores[host] = threading.BoundedSemaphore(max(int(per_host_limit), 1))
+                return host_semaphores[host]
+        
+        def run_one(index: int, spec: Dict) -> Dict:
+            spec = dict(spec)
+            method = spec.pop('method', 'GET').upper()
+            url = spec.pop('url')
+            if 'json_data' in spec:
+                spec['json'] = spec.pop('json_data')
+            result = {'index': index, 'method': method, 'url': url,
+                      'status_code': None, 'data': None, 'error': None, 'timing': None}
+            start = time.perf_counter()
+            try:
+                with host_semaphore(url):
+                    response = self._make_request(method, url, **spec)
+                result['status_code'] = response.status_code
+                result['timing'] = response.timing
+                if method not in ('HEAD', 'OPTIONS') and response.content:
+                    try:
+                        result['data'] = response.json()
+                    except ValueError:
+                        result['data'] = response.text
+                if response.status_code >= 400:
+                    result['error'] = f"HTTP {response.status_code}"
+            except Exception as e:
+                result['error'] = f"{type(e).__name__}: {e}"
+            result['elapsed_ms'] = (time.perf_counter() - start) * 1000
+            return result
+        
+        workers = max(1, min(int(max_workers), len(request_specs)))
+        logger.info(f"批量请求: {len(request_specs)} 个，并发 {workers}，单主机并发上限 {per_host_limit}")
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='http-batch') as executor:
+            return list(executor.map(run_one, range(len(request_specs)), request_specs))
+    
+    def stream(self, method: str, url: str, data: Optional[Union[Dict, str]] = None,
+               json_data: Optional[Dict] = None, sse: Optional[bool] = None, on_event=None,
+               text_paths: Optional[list] = None, keep_reply: bool = False, **kwargs) -> StreamResponse:
+        """
+        流式请求（SSE / chunked），响应体边到达边处理，不整体缓存
+        :param method: HTTP方法
+        :param url: 请求URL
+        :param data: 表单数据
+        :param json_data: JSON数据
+        :param sse: 是否按SSE解析，None时根据响应Content-Type判断
+        :param on_event: 每个事件到达时的回调 on_event(event, stream_response)，可用于增量断言
+        :param text_paths: 从事件JSON中提取回复片段的字段路径
+        :param keep_reply: 是否拼接完整回复文本
+        :param kwargs: 其他参数（headers、token、params等）
+        :return: 可迭代的StreamResponse，metrics 中包含首块耗时、分块间隔、tokens/sec等指标
+        """
+        if data is not None:
+            kwargs['data'] = data
+        if json_data is not None:
+            kwargs['json'] = json_data
+        if sse is not False:
+            kwargs['headers'] = {'Accept': 'text/event-stream', **(kwargs.get('headers') or {})}
+        start = time.perf_counter()
+        response = self._make_request(method.upper(), url, stream=True, **kwargs)
+        try:
+            response.raise_for_status()
+        except requests.exceptions.HTTPError:
+            response.close()
+            raise
+        return StreamResponse(response, start, sse=sse, on_event=on_event,
+                              text_paths=text_paths, keep_reply=keep_reply)
+    
+    def upload(self, url: str, body=None, fields: Optional[Dict] = None, files: Optional[Dict] = None,
+               method: str = 'POST', content_type: Optional[str] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+               headers: Optional[Dict] = None, token: Optional[str] = None, **kwargs) -> Union[Dict, Any]:
+        """
+        流式上传，请求体在发送时按块读取，内存占用与文件大小无关
+        :param url: 请求URL
+        :param body: 原始请求体：文件路径、文件对象、bytes 或 生成bytes的可迭代对象（按chunked发送）
+        :param fields: multipart表单字段（指定fields或files时按multipart/form-data上传）
+        :param files: multipart文件 {字段名: 来源 | (文件名, 来源) | (文件名, 来源, Content-Type)}
+        :param method: HTTP方法，默认POST
+        :param content_type: 原始请求体的Content-Type，默认application/octet-stream
+        :param chunk_size: 读取块大小
+        :param headers: 请求头
+        :param token: 认证token
+        :param kwargs: 其他参数
+        :return: 响应数据
+        """
+        headers = dict(headers or {})
+        opened = None
+        if fields or files:
+            payload = MultipartBody(fields, files, chunk_size=chunk_size)
+            headers.setdefault('Content-Type', payload.content_type)
+        else:
+            payload, opened = open_body(body)
+            headers.setdefault('Content-Type', content_type or 'application/octet-stream')
+        try:
+            response = self._make_request(method.upper(), url, data=payload, headers=headers, token=token,
+                                          **kwargs)
+        finally:
+            if opened is not None:
+                opened.close()
+        response.raise_for_status()
+        return response.json() if response.content else None
+    
+    def download(self, url: str, filename: Optional[str] = None, directory: Optional[str] = None,
+                 method: str = 'GET', chunk_size: int = DEFAULT_CHUNK_SIZE, algorithm: str = DEFAULT_CHECKSUM,
+                 expected_checksum: Optional[str] = None, expected_size: Optional[int] = None,
+                 **kwargs) -> Dict:
+        """
+        流式下载到文件，响应体按块写入磁盘并同时计算摘要，内存占用与文件大小无关
+        :param url: 请求URL
+        :param filename: 保存的文件名，默认取Content-Disposition或URL路径的最后一段
+        :param directory: 保存目录，默认 temp 目录（common.temp_utils.TEMP_DIR）
+        :param method: HTTP方法，默认GET
+        :param chunk_size: 写入块大小
+        :param algorithm: 摘要算法，默认sha256
+        :param expected_checksum: 期望的摘要，不一致时删除文件并抛出ValueError
+        :param expected_size: 期望的文件大小（字节），不一致时删除文件并抛出ValueError
+        :param kwargs: 其他参数（params、headers、token等）
+        :return: {'path', 'size', 'checksum', 'algorithm', 'elapsed_ms', 'content_type'}
+        """
+        start = time.perf_counter()
+        response = self._make_request(method.upper(), url, stream=True, **kwargs)
+        try:
+            response.raise_for_status()
+            path = os.path.join(directory or TEMP_DIR, filename or filename_from_response(response, url))
+            result = save_stream(response, path, chunk_size=chunk_size, algorithm=algorithm)
+        finally:
+            response.close()
+        result['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 3)
+        result['content_type'] = response.headers.get('Content-Type')
+        self._record_download(method, url, kwargs.get('interface'), response, result['size'])
+        
+        error_message = None
+        if expected_size is not None and result['size'] != expected_size:
+            error_message = f"文件大小不一致: 期望 {expected_size}，实际 {result['size']}"
+        elif expected_checksum is not None and result['checksum'].lower() != expected_checksum.lower():
+            error_message = f"文件{algorithm}摘要不一致: 期望 {expected_checksum}，实际 {result['checksum']}"
+        if error_message:
+            os.remove(path)
+            raise ValueError(f"{error_message}（{url}）")
+        api_info(f"下载完成: {url} -> {path} | {result['size']} 字节, {result['elapsed_ms']:.1f}ms")
+        return result
+    
+    @staticmethod
+    def _record_download(method: str, url: str, interface: Optional[str], response: requests.Response,
+                         size: int):
+        """
+        记录流式下载的线路字节数与解码后字节数
+        """
+        if interface is None:
+            matched = find_interface(url, method)
+            interface = matched[0] if matched else None
+        wire_bytes = response_wire_bytes(response)
+        if wire_bytes is not None:
+            get_bandwidth_stats().record(endpoint_name(method, url, interface), wire_bytes=wire_bytes,
+                                         decoded_bytes=size)
+    
     def set_default_headers(self, headers: Dict):
         """
         设置默认请求头
@@ -243,10 +677,18 @@ class HTTPUtils:
     
     def clear_session(self):
         """
-        清除会话
+        清除会话（共享会话由会话注册表统一管理，不在此关闭）
         """
+        if self.use_pool:
+            return
         self.session.close()
-        self.session = requests.Session()
+        self.session = build_session()
+
+def _pooled_http_utils() -> HTTPUtils:
+    """
+    便捷函数使用的HTTP工具实例，请求经由进程级共享会话发送
+    """
+    return HTTPUtils(use_pool=True)
 
 # 便捷函数（保持向后兼容）
 def http_get(url: str, params: Optional[Dict] = None, headers: Optional[Dict] = None, 
@@ -254,77 +696,69 @@ def http_get(url: str, params: Optional[Dict] = None, headers: Optional[Dict] =
     """
     GET请求便捷函数
     """
-    http_utils = HTTPUtils()
-    try:
-        return http_utils.get(url, params=params, headers=headers, token=token, **kwargs)
-    finally:
-        http_utils.clear_session()
+    return _pooled_http_utils().get(url, params=params, headers=headers, token=token, **kwargs)
 
 def http_post(url: str, data: Optional[Union[Dict, str]] = None, json_data: Optional[Dict] = None,
               headers: Optional[Dict] = None, token: Optional[str] = None, **kwargs) -> Union[Dict, Any]:
     """
     POST请求便捷函数
     """
-    http_utils = HTTPUtils()
-    try:
-        return http_utils.post(url, data=data, json_data=json_data, headers=headers, token=token, **kwargs)
-    finally:
-        http_utils.clear_session()
+    return _pooled_http_utils().post(url, data=data, json_data=json_data, headers=headers, token=token, **kwargs)
 
 def http_put(url: str, data: Optional[Union[Dict, str]] = None, json_data: Optional[Dict] = None,
              headers: Optional[Dict] = None, token: Optional[str] = None, **kwargs) -> Union[Dict, Any]:
     """
     PUT请求便捷函数
     """
-    http_utils = HTTPUtils()
-    try:
-        return http_utils.put(url, data=data, json_data=json_data, headers=headers, token=token, **kwargs)
-    finally:
-        http_utils.clear_session()
+    return _pooled_http_utils().put(url, data=data, json_data=json_data, headers=headers, token=token, **kwargs)
 
 def http_delete(url: str, headers: Optional[Dict] = None, token: Optional[str] = None, 
                 **kwargs) -> Union[Dict, Any]:
     """
     DELETE请求便捷函数
     """
-    http_utils = HTTPUtils()
-    try:
-        return http_utils.delete(url, headers=headers, token=token, **kwargs)
-    finally:
-        http_utils.clear_session()
+    return _pooled_http_utils().delete(url, headers=headers, token=token, **kwargs)
 
 def http_patch(url: str, data: Optional[Union[Dict, str]] = None, json_data: Optional[Dict] = None,
                headers: Optional[Dict] = None, token: Optional[str] = None, **kwargs) -> Union[Dict, Any]:
     """
     PATCH请求便捷函数
     """
-    http_utils = HTTPUtils()
-    try:
-        return http_utils.patch(url, data=data, json_data=json_data, headers=headers, token=token, **kwargs)
-    finally:
-        http_utils.clear_session()
+    return _pooled_http_utils().patch(url, data=data, json_data=json_data, headers=headers, token=token, **kwargs)
 
 def http_head(url: str, headers: Optional[Dict] = None, token: Optional[str] = None, 
               **kwargs) -> requests.Response:
     """
     HEAD请求便捷函数
     """
-    http_utils = HTTPUtils()
-    try:
-        return http_utils.head(url, headers=headers, token=token, **kwargs)
-    finally:
-        http_utils.clear_session()
+    return _pooled_http_utils().head(url, headers=headers, token=token, **kwargs)
 
 def http_options(url: str, headers: Optional[Dict] = None, token: Optional[str] = None, 
                 **kwargs) -> requests.Response:
     """
     OPTIONS请求便捷函数
     """
-    http_utils = HTTPUtils()
-    try:
-        return http_utils.options(url, headers=headers, token=token, **kwargs)
-    finally:
-        http_utils.clear_session()
+    return _pooled_http_utils().options(url, headers=headers, token=token, **kwargs)
+
+def http_batch(request_specs: List[Dict], max_workers: int = DEFAULT_BATCH_WORKERS,
+               per_host_limit: Optional[int] = None) -> List[Dict]:
+    """
+    批量并发请求便捷函数
+    """
+    return _pooled_http_utils().batch(request_specs, max_workers=max_workers, per_host_limit=per_host_limit)
+
+def http_upload(url: str, body=None, fields: Optional[Dict] = None, files: Optional[Dict] = None,
+                **kwargs) -> Union[Dict, Any]:
+    """
+    流式上传便捷函数
+    """
+    return _pooled_http_utils().upload(url, body=body, fields=fields, files=files, **kwargs)
+
+def http_download(url: str, filename: Optional[str] = None, **kwargs) -> Dict:
+    """
+    流式下载便捷函数
+    """
+    return _pooled_http_utils().download(url, filename=filename, **kwargs)
 
 # 使用示例
 if __name__ == "__main__":
@@ -0,0 +1,168 @@
+# coding: utf-8
+# @Author: bgtech
+import threading
+from typing import Dict, Iterable, Optional
+
+# 默认每个2的幂区间划分 2^(10-1)=512 个线性子桶，相对误差约0.2%
+DEFAULT_SUB_BUCKET_BITS = 10
+DEFAULT_PERCENTILES = (50, 90, 99, 99.9)
+
+
+class LatencyHistogram:
+    """
+    HDR风格的对数分桶延迟直方图
+    以微秒为单位记录：小于 2^sub_bits 的值精确记录，更大的值按2的幂分段、段内线性分桶，
+    内存只与出现过的桶数有关；多个直方图可以直接合并（各线程/进程分别记录，汇总时合并）
+    """
+
+    def __init__(self, sub_bucket_bits: int = DEFAULT_SUB_BUCKET_BITS):
+        """
+        初始化直方图
+        :param sub_bucket_bits: 子桶位数，越大精度越高
+        """
+        if sub_bucket_bits < 2:
+            raise ValueError("sub_bucket_bits必须不小于2")
+        self.sub_bucket_bits = sub_bucket_bits
+        self._sub_bucket_count = 1 << sub_bucket_bits
+        self._half_count = self._sub_bucket_count >> 1
+        self.counts: Dict[int, int] = {}
+        self.total_count = 0
+        self.min_us = None
+        self.max_us = 0
+        self._sum_us = 0
+        self._lock = threading.Lock()
+
+    def _index(self, value_us: int) -> int:
+        if value_us < self._sub_bucket_count:
+            return value_us
+        shift = value_us.bit_length() - self.sub_bucket_bits
+        mantissa = value_us >> shift
+        return self._sub_bucket_count + (shift - 1) * self._half_count + (mantissa - self._half_count)
+
+    def _bucket_range(self, index: int):
+        """
+        桶对应的取值范围 [low, high]（微秒）
+        """
+        if index < self._sub_bucket_count:
+            return index, index
+        offset = index - self._sub_bucket_count
+        shift = offset // self._half_count + 1
+        mantissa = offset % self._half_count + self._half_count
+        return mantissa << shift, ((mantissa + 1) << shift) - 1
+
+    def record(self, value_ms: float, count: int = 1):
+        """
+        记录延迟
+        :param value_ms: 延迟（毫秒）
+        :param count: 次数
+        """
+        value_us = max(int(round(value_ms * 1000)), 0)
+        index = self._index(value_us)
+        with self._lock:
+            self.counts[index] = self.counts.get(index, 0) + count
+            self.total_count += count
+            self._sum_us += value_us * count
+            self.max_us = max(self.max_us, value_us)
+            self.min_us = value_us if self.min_us is None else min(self.min_us, value_us)
+
+    def merge(self, other: 'LatencyHistogram') -> 'LatencyHistogram':
+        """
+        合并另一个直方图（子桶位数必须相同）
+        :return: self
+        """
+        if other.sub_bucket_bits != self.sub_bucket_bits:
+            raise ValueError("子桶位数不同的直方图不能合并")
+        with other._lock:
+            counts = dict(other.counts)
+            total, sum_us, min_us, max_us = other.total_count, other._sum_us, other.min_us, other.max_us
+        with self._lock:
+            for index, count in counts.items():
+                self.counts[index] = self.counts.get(index, 0) + count
+            self.total_count += total
+            self._sum_us += sum_us
+            self.max_us = max(self.max_us, max_us)
+            if min_us is not None:
+                self.min_us = min_us if self.min_us is None else min(self.min_us, min_us)
+        return self
+
+    @classmethod
+    def merged(cls, histograms: Iterable['LatencyHistogram'],
+               sub_bucket_bits: int = DEFAULT_SUB_BUCKET_BITS) -> 'LatencyHistogram':
+        """
+        合并多个直方图为一个新的直方图
+        """
+        result = cls(sub_bucket_bits)
+        for histogram in histograms:
+            result.merge(histogram)
+        return result
+
+    def percentile(self, p: float) -> Optional[float]:
+        """
+        计算分位数
+        :param p: 百分位（0~100），如 99.9
+        :return: 延迟（毫秒），无数据时返回None
+        """
+        with self._lock:
+            if not self.total_count:
+                return None
+            target = max(int(self.total_count * p / 100.0 + 0.5), 1)
+            cumulative = 0
+            for index in sorted(self.counts):
+                cumulative += self.counts[index]
+                if cumulative >= target:
+                    low, high = self._bucket_range(index)
+                    # 取桶中值，且不超过记录到的最大值
+                    return min((low + high) / 2.0, self.max_us) / 1000.0
+            return self.max_us / 1000.0
+
+    @property
+    def mean_ms(self) -> Optional[float]:
+        return self._sum_us / self.total_count / 1000.0 if self.total_count else None
+
+    @property
+    def max_ms(self) -> float:
+        return self.max_us / 1000.0
+
+    @property
+    def min_ms(self) -> Optional[float]:
+        return self.min_us / 1000.0 if self.min_us is not None else None
+
+    def summary(self, percentiles: Iterable[float] = DEFAULT_PERCENTILES) -> Dict:
+        """
+        导出分位数摘要
+        :return: 如 {'count': 100, 'p50_ms': ..., 'p99.9_ms': ..., 'max_ms': ..., 'mean_ms': ...}
+        """
+        result = {'count': self.total_count}
+        for p in percentiles:
+            value = self.percentile(p)
+            result[f"p{p:g}_ms"] = round(value, 3) if value is not None else None
+        result['max_ms'] = round(self.max_ms, 3) if self.total_count else None
+        result['mean_ms'] = round(self.mean_ms, 3) if self.total_count else None
+        return result
+
+    def to_dict(self) -> Dict:
+        """
+        序列化（用于跨进程传递后合并）
+        """
+        with self._lock:
+            return {
+                'sub_bucket_bits': self.sub_bucket_bits,
+                'counts': {str(k): v for k, v in self.counts.items()},
+                'total_count': self.total_count,
+                'sum_us': self._sum_us,
+                'min_us': self.min_us,
+                'max_us': self.max_us,
+            }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'LatencyHistogram':
+        """
+        从 to_dict() 的结果恢复
+        """
+        histogram = cls(data.get('sub_bucket_bits', DEFAULT_SUB_BUCKET_BITS))
+        histogram.counts = {int(k): v for k, v in data.get('counts', {}).items()}
+        histogram.total_count = data.get('total_count', sum(histogram.counts.values()))
+        histogram._sum_us = data.get('sum_us', 0)
+        histogram.min_us = data.get('min_us')
+        histogram.max_us = data.get('max_us', 0)
+        return histogram
@@ -0,0 +1,556 @@
+# coding: utf-8
+# @Author: bgtech
+import argparse
+import asyncio
+import gzip
+import json
+import random
+import threading
+import zlib
+import logging
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit, parse_qsl
+
+from utils.cassette import Cassette, DEFAULT_CASSETTE_PATH
+from utils.stream_utils import extract_text
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# uvloop为可选依赖，安装后事件循环吞吐量更高
+try:
+    import uvloop
+    UVLOOP_AVAILABLE = True
+except ImportError:
+    uvloop = None
+    UVLOOP_AVAILABLE = False
+
+_REASONS = {200: 'OK', 201: 'Created', 204: 'No Content', 400: 'Bad Request', 404: 'Not Found',
+            411: 'Length Required', 429: 'Too Many Requests', 500: 'Internal Server Error',
+            502: 'Bad Gateway', 503: 'Service Unavailable'}
+# 响应中由服务端重新生成的头
+_DROP_HEADERS = ('content-length', 'transfer-encoding', 'content-encoding', 'connection', 'date')
+_MAX_HEADER_BYTES = 64 * 1024
+
+
+class LatencyModel:
+    """
+    响应延迟分布（毫秒）
+    fixed: value；uniform: low~high；normal: mean/stddev；lognormal: median/sigma；exponential: mean
+    """
+
+    DISTRIBUTIONS = ('fixed', 'uniform', 'normal', 'lognormal', 'exponential')
+
+    def __init__(self, distribution: str = 'fixed', **params):
+        if distribution not in self.DISTRIBUTIONS:
+            raise ValueError(f"不支持的延迟分布: {distribution}")
+        self.distribution = distribution
+        self.params = {k: float(v) for k, v in params.items()}
+        self._rng = random.Random(self.params.pop('seed', None))
+
+    @classmethod
+    def parse(cls, spec) -> Optional['LatencyModel']:
+        """
+        解析延迟配置
+        :param spec: None、毫秒数（含 '20' 这样的字符串）、字典 {'distribution': 'lognormal', 'median': 20, 'sigma': 0.5}
+                     或字符串 'lognormal:median=20,sigma=0.5'
+        """
+        if spec is None or spec == '' or isinstance(spec, LatencyModel):
+            return spec or None
+        if isinstance(spec, (int, float)):
+            return cls('fixed', value=spec) if spec > 0 else None
+        if isinstance(spec, dict):
+            spec = dict(spec)
+            return cls(spec.pop('distribution', 'fixed'), **spec)
+        try:
+            # 命令行传入的 '--latency 20' 是字符串形式的毫秒数
+            return cls.parse(float(spec))
+        except ValueError:
+            pass
+        name, _, args = str(spec).partition(':')
+        params = dict(item.split('=', 1) for item in args.split(',') if '=' in item)
+        return cls(name.strip(), **params)
+
+    def sample(self) -> float:
+        p = self.params
+        if self.distribution == 'fixed':
+            value = p.get('value', 0.0)
+        elif self.distribution == 'uniform':
+            value = self._rng.uniform(p.get('low', 0.0), p.get('high', 0.0))
+        elif self.distribution == 'normal':
+            value = self._rng.gauss(p.get('mean', 0.0), p.get('stddev', 0.0))
+        elif self.distribution == 'lognormal':
+            value = p.get('median', 1.0) * self._rng.lognormvariate(0.0, p.get('sigma', 0.5))
+        else:
+            value = self._rng.expovariate(1.0 / p['mean']) if p.get('mean') else 0.0
+        return max(value, 0.0)
+
+
+def _normalize_params(params) -> str:
+    """
+    请求参数的规范化表示（值统一转为字符串，查询参数与JSON参数可以互相匹配）
+    """
+    if isinstance(params, dict):
+        return json.dumps({str(k): _normalize_value(v) for k, v in params.items()}, sort_keys=True,
+                          ensure_ascii=False)
+    return json.dumps(_normalize_value(params), sort_keys=True, ensure_ascii=False)
+
+
+def _normalize_value(value):
+    if isinstance(value, dict):
+        return {str(k): _normalize_value(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_normalize_value(v) for v in value]
+    return '' if value is None else str(value)
+
+
+def _decompress(body: Optional[bytes], encoding: str) -> Optional[bytes]:
+    """
+    按 Content-Encoding 解压请求体，无法解压时原样返回
+    """
+    encoding = encoding.lower()
+    if body and encoding in ('gzip', 'deflate'):
+        try:
+            return gzip.decompress(body) if encoding == 'gzip' else zlib.decompress(body)
+        except (OSError, zlib.error):
+            pass
+    return body
+
+
+class MockResponse:
+    """
+    预先编码好的模拟响应
+    """
+
+    def __init__(self, status: int = 200, body=b'', headers: Optional[Dict] = None,
+                 latency=None, stream: Optional[str] = None, stream_interval_ms: float = 0.0,
+                 stream_chunk_chars: int = 4):
+        """
+        :param status: 状态码
+        :param body: 响应体（dict/list按JSON编码，str按UTF-8编码）
+        :param headers: 响应头
+        :param latency: 延迟配置，见 LatencyModel.parse
+        :param stream: 流式回复文本，客户端 Accept 包含 text/event-stream 时按SSE分片返回
+        :param stream_interval_ms: 流式分片间隔（毫秒）
+        :param stream_chunk_chars: 每个分片的字符数
+        """
+        headers = {k: v for k, v in (headers or {}).items() if k.lower() not in _DROP_HEADERS}
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            headers.setdefault('Content-Type', 'application/json; charset=utf-8')
+        elif isinstance(body, str):
+            body = body.encode('utf-8')
+            headers.setdefault('Content-Type', 'text/plain; charset=utf-8')
+        self.status = status
+        self.body = body
+        self.headers = headers
+        self.latency = LatencyModel.parse(latency)
+        self.stream = stream
+        self.stream_interval_ms = stream_interval_ms
+        self.stream_chunk_chars = max(int(stream_chunk_chars), 1)
+        self._head = self._build_head(status, headers, {'Content-Length': str(len(body))})
+        self.encoded = self._head + body
+
+    @staticmethod
+    def _build_head(status: int, headers: Dict, extra: Dict) -> bytes:
+        lines = [f"HTTP/1.1 {status} {_REASONS.get(status, 'Unknown')}", 'Server: aitest-mock']
+        lines.extend(f"{k}: {v}" for k, v in {**headers, **extra}.items())
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1', errors='replace')
+
+    def stream_head(self) -> bytes:
+        return self._build_head(200, {'Content-Type': 'text/event-stream; charset=utf-8',
+                                      'Cache-Control': 'no-cache'}, {'Transfer-Encoding': 'chunked'})
+
+    def stream_events(self) -> List[bytes]:
+        """
+        将回复文本切分为SSE事件（OpenAI风格的 choices.0.delta.content），以 [DONE] 结束
+        """
+        text = self.stream or ''
+        size = self.stream_chunk_chars
+        events = []
+        for i in range(0, len(text), size):
+            payload = {'choices': [{'delta': {'content': text[i:i + size]}}]}
+            events.append(f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode('utf-8'))
+        events.append(b"data: [DONE]\n\n")
+        return events
+
+
+class _Variant:
+    """
+    同一路径下按请求参数/请求体区分的响应
+    """
+
+    def __init__(self, response: MockResponse, params=None, body_hash: Optional[str] = None):
+        self.response = response
+        self.params_key = _normalize_params(params) if params is not None else None
+        self.body_hash = body_hash
+
+
+class MockServer:
+    """
+    基于asyncio的本地模拟服务
+    路由按 方法 + 路径 匹配（忽略主机），同一路径下再按请求参数（JSON请求体或查询参数）或请求体摘要区分；
+    静态响应预先编码为字节，支持keep-alive与流水线请求，单核可支撑数万RPS
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency=None):
+        """
+        初始化模拟服务
+        :param host: 监听地址
+        :param port: 监听端口，0表示随机端口
+        :param latency: 全局默认延迟配置，见 LatencyModel.parse
+        """
+        self.host = host
+        self.port = port
+        self.latency = LatencyModel.parse(latency)
+        self.routes: Dict[Tuple[str, str], List[_Variant]] = {}
+        self.request_count = 0
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._started = threading.Event()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def add_route(self, method: str, path: str, body=b'', status: int = 200, headers: Optional[Dict] = None,
+                  params=None, body_hash: Optional[str] = None, latency=None, stream: Optional[str] = None,
+                  **stream_options) -> MockResponse:
+        """
+        添加路由
+        :param method: 请求方法
+        :param path: 路径（也可以传完整URL，只取路径）
+        :param body: 响应体
+        :param status: 状态码
+        :param headers: 响应头
+        :param params: 只匹配这些请求参数（None表示匹配任意参数）
+        :param body_hash: 只匹配请求体摘要（Cassette.body_hash）
+        :param latency: 延迟配置，默认使用全局延迟
+        :param stream: 流式回复文本
+        :return: MockResponse
+        """
+        response = MockResponse(status, body, headers, latency, stream, **stream_options)
+        key = (method.upper(), urlsplit(path).path or '/')
+        self.routes.setdefault(key, []).append(_Variant(response, params, body_hash))
+        return response
+
+    def load_caseparams(self, files: Optional[List[str]] = None, latency=None,
+                        stream_interval_ms: float = 0.0) -> int:
+        """
+        以caseparams用例的期望结果作为响应（期望结果只包含断言字段，足以通过用例断言）
+        响应中包含 data.reply 等回复字段时，客户端请求SSE可得到流式回复
+        :param files: 只加载这些文件（不含扩展名），None表示全部
+        :return: 加载的路由数
+        """
+        from common.get_caseparams import get_all_test_data
+        merged: Dict[Tuple[str, str, str], Dict] = {}
+        for file_name, data in get_all_test_data().items():
+            if files and file_name not in files:
+                continue
+            for case in data:
+                if not case.get('url'):
+                    continue
+                params = case.get('params')
+                expected = case.get('expected_result')
+                if isinstance(params, str):
+                    params = json.loads(params) if params.strip() else {}
+                if isinstance(expected, str):
+                    expected = json.loads(expected) if expected.strip() else {}
+                key = (str(case.get('method', 'GET')).upper(), case['url'], _normalize_params(params or {}))
+                # 同一请求的多个用例分别断言不同字段时，合并期望结果
+                entry = merged.setdefault(key, {'params': params or {}, 'body': {}})
+                entry['body'].update(expected or {})
+        count = 0
+        for (method, url, _), entry in merged.items():
+            self.add_route(method, url, body=entry['body'], params=entry['params'], latency=latency,
+                           stream=extract_text(entry['body']), stream_interval_ms=stream_interval_ms)
+            count += 1
+        logger.info(f"模拟服务已加载caseparams路由 {count} 条")
+        return count
+
+    def load_cassette(self, path: Optional[str] = None, latency=None, use_recorded_latency: bool = False) -> int:
+        """
+        以录制文件中的响应作为路由
+        :param path: JSONL录制文件
+        :param latency: 延迟配置
+        :param use_recorded_latency: 按录制时的总耗时延迟响应
+        :return: 加载的路由数
+        """
+        path = path or DEFAULT_CASSETTE_PATH
+        count = 0
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                request, response = entry.get('request') or {}, entry.get('response') or {}
+                if not request or not response:
+                    continue
+                body = Cassette.decode_body(response.get('body'), response.get('body_encoding')) or b''
+                request_body = _decompress(Cassette.decode_body(request.get('body'), request.get('body_encoding')),
+                                           (request.get('headers') or {}).get('content-encoding', ''))
+                entry_latency = latency
+                if use_recorded_latency and (entry.get('timing') or {}).get('total_ms'):
+                    entry_latency = entry['timing']['total_ms']
+                query = dict(parse_qsl(urlsplit(request['url']).query))
+                self.add_route(request['method'], request['url'], body=body, status=response['status_code'],
+                               headers=response.get('headers'), params=query if query else None,
+                               body_hash=Cassette.body_hash(request_body) if request_body else None,
+                               latency=entry_latency)
+                count += 1
+        logger.info(f"模拟服务已加载录制路由 {count} 条: {path}")
+        return count
+
+    def match(self, method: str, target: str, body: bytes) -> Optional[MockResponse]:
+        """
+        查找请求对应的响应
+        """
+        parts = urlsplit(target)
+        variants = self.routes.get((method, parts.path or '/'))
+        if not variants:
+            return None
+        if len(variants) == 1 and variants[0].params_key is None and variants[0].body_hash is None:
+            return variants[0].response
+        params = dict(parse_qsl(parts.query))
+        if body:
+            try:
+                json_body = json.loads(body)
+                if isinstance(json_body, dict):
+                    params.update(json_body)
+            except ValueError:
+                pass
+        params_key = _normalize_params(params)
+        body_hash = Cassette.body_hash(body) if body else None
+        fallback = None
+        for variant in variants:
+            if variant.body_hash is not None:
+                if variant.body_hash == body_hash:
+                    return variant.response
+            elif variant.params_key is not None:
+                if variant.params_key == params_key:
+                    return variant.response
+            elif fallback is None:
+                fallback = variant.response
+        return fallback
+
+    def _not_found(self, method: str, target: str) -> bytes:
+        return MockResponse(404, {'code': 404, 'msg': f"模拟服务未匹配: {method} {target}"}).encoded
+
+    def start(self) -> str:
+        """
+        在后台线程中启动服务
+        :return: 服务地址，如 http://127.0.0.1:18688
+        """
+        if self._thread is not None:
+            return self.base_url
+        self._thread = threading.Thread(target=self._run_in_thread, name='mock-server', daemon=True)
+        self._thread.start()
+        self._started.wait()
+        logger.info(f"模拟服务已启动: {self.base_url}")
+        return self.base_url
+
+    def _run_in_thread(self):
+        self._loop = uvloop.new_event_loop() if UVLOOP_AVAILABLE else asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_until_complete(self._start_server())
+        self._started.set()
+        self._loop.run_forever()
+        self._loop.close()
+
+    async def _start_server(self):
+        self._server = await asyncio.get_running_loop().create_server(
+            lambda: _MockProtocol(self), self.host, self.port, reuse_address=True, backlog=1024)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    def stop(self):
+        """
+        停止服务
+        """
+        if self._loop is None:
+            return
+
+        async def shutdown():
+            self._server.close()
+            await self._server.wait_closed()
+            self._loop.stop()
+
+        asyncio.run_coroutine_threadsafe(shutdown(), self._loop)
+        self._thread.join(timeout=5)
+        self._thread = self._loop = self._server = None
+        self._started.clear()
+
+    def serve_forever(self):
+        """
+        在当前线程中运行服务（命令行使用）
+        """
+        if UVLOOP_AVAILABLE:
+            uvloop.install()
+
+        async def main():
+            await self._start_server()
+            print(f"模拟服务已启动: {self.base_url}（路由 {sum(len(v) for v in self.routes.values())} 条）")
+            await self._server.serve_forever()
+
+        try:
+            asyncio.run(main())
+        except KeyboardInterrupt:
+            pass
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+class _MockProtocol(asyncio.Protocol):
+    """
+    最小化的HTTP/1.1协议实现：解析请求行、请求头与Content-Length请求体，支持keep-alive和流水线
+    """
+
+    def __init__(self, server: MockServer):
+        self.server = server
+        self.transport = None
+        self.buffer = bytearray()
+        # 有延迟或流式响应时后续请求排队，保证流水线响应顺序
+        self.pending: Optional[asyncio.Task] = None
+        self.queue = []
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def connection_lost(self, exc):
+        self.transport = None
+        if self.pending is not None:
+            self.pending.cancel()
+
+    def data_received(self, data: bytes):
+        self.buffer += data
+        while True:
+            request = self._parse()
+            if request is None:
+                return
+            if self.pending is not None:
+                self.queue.append(request)
+            else:
+                self._handle(*request)
+            if self.transport is None or self.transport.is_closing():
+                return
+
+    def _parse(self):
+        end = self.buffer.find(b'\r\n\r\n')
+        if end == -1:
+            if len(self.buffer) > _MAX_HEADER_BYTES:
+                self.transport.write(MockResponse(400, 'header too large').encoded)
+                self.transport.close()
+            return None
+        head = bytes(self.buffer[:end]).decode('latin-1')
+        lines = head.split('\r\n')
+        try:
+            method, target, version = lines[0].split(' ', 2)
+        except ValueError:
+            self.transport.write(MockResponse(400, 'bad request line').encoded)
+            self.transport.close()
+            return None
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        if 'chunked' in headers.get('transfer-encoding', '').lower():
+            self.transport.write(MockResponse(411, 'chunked request body is not supported').encoded)
+            self.transport.close()
+            return None
+        try:
+            length = int(headers.get('content-length') or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.transport.write(MockResponse(400, 'invalid content-length').encoded)
+            self.transport.close()
+            return None
+        if len(self.buffer) < end + 4 + length:
+            return None
+        body = bytes(self.buffer[end + 4:end + 4 + length])
+        del self.buffer[:end + 4 + length]
+        body = _decompress(body, headers.get('content-encoding', ''))
+        keep_alive = headers.get('connection', '').lower() != 'close' and version != 'HTTP/1.0'
+        return method.upper(), target, headers, body, keep_alive
+
+    def _handle(self, method: str, target: str, headers: Dict, body: bytes, keep_alive: bool):
+        self.server.request_count += 1
+        response = self.server.match(method, target, body)
+        if response is None:
+            self._write(self.server._not_found(method, target), keep_alive)
+            return
+        streaming = response.stream is not None and 'text/event-stream' in headers.get('accept', '')
+        latency = response.latency or self.server.latency
+        if not streaming and latency is None:
+            # 快速路径：直接写出预编码的响应
+            self._write(response.encoded, keep_alive)
+            return
+        delay = latency.sample() / 1000.0 if latency is not None else 0.0
+        self.pending = asyncio.ensure_future(self._respond_later(response, delay, streaming, keep_alive))
+
+    async def _respond_later(self, response: MockResponse, delay: float, streaming: bool, keep_alive: bool):
+        try:
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if self.transport is None:
+                return
+            if not streaming:
+                self._write(response.encoded, keep_alive)
+            else:
+                self.transport.write(response.stream_head())
+                interval = response.stream_interval_ms / 1000.0
+                for event in response.stream_events():
+                    if self.transport is None:
+                        return
+                    self.transport.write(b'%x\r\n%s\r\n' % (len(event), event))
+                    if interval > 0:
+                        await asyncio.sleep(interval)
+                self._write(b'0\r\n\r\n', keep_alive)
+        finally:
+            self.pending = None
+        while self.queue and self.pending is None and self.transport is not None:
+            self._handle(*self.queue.pop(0))
+
+    def _write(self, data: bytes, keep_alive: bool):
+        if self.transport is None:
+            return
+        self.transport.write(data)
+        if not keep_alive:
+            self.transport.close()
+
+
+def main():
+    """
+    命令行启动模拟服务
+    示例: python -m utils.mock_server --port 8688 --caseparams --latency lognormal:median=20,sigma=0.5
+    """
+    parser = argparse.ArgumentParser(description="本地模拟服务")
+    parser.add_argument('--host', default='127.0.0.1', help="监听地址")
+    parser.add_argument('--port', type=int, default=8688, help="监听端口")
+    parser.add_argument('--caseparams', action='store_true', help="加载caseparams用例的期望结果")
+    parser.add_argument('--files', nargs='*', default=None, help="只加载这些caseparams文件（不含扩展名）")
+    parser.add_argument('--cassette', default=None, help="加载录制文件（JSONL）")
+    parser.add_argument('--latency', default=None,
+                        help="延迟分布，如 20 或 lognormal:median=20,sigma=0.5 或 uniform:low=5,high=50")
+    parser.add_argument('--stream-interval', type=float, default=0.0, help="流式回复分片间隔（毫秒）")
+    args = parser.parse_args()
+
+    server = MockServer(args.host, args.port, latency=args.latency)
+    if args.caseparams or not args.cassette:
+        server.load_caseparams(args.files, stream_interval_ms=args.stream_interval)
+    if args.cassette:
+        server.load_cassette(args.cassette)
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+# coding: utf-8
+# @Author: bgtech
+import asyncio
+import threading
+import time
+import logging
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+from common.config import get_config
+from common.interface_config import get_interface_by_name
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    令牌桶限流器
+    请求按到达顺序预占令牌，令牌不足时排队等待而不是失败；
+    线程中使用 acquire()，asyncio 中使用 await acquire_async()
+    """
+
+    def __init__(self, rate: float, burst: Optional[int] = None, name: str = ''):
+        """
+        初始化令牌桶
+        :param rate: 每秒生成的令牌数（RPS）
+        :param burst: 桶容量（允许的突发请求数），默认等于 max(1, rate)
+        :param name: 名称，用于日志
+        """
+        if rate <= 0:
+            raise ValueError("rate必须大于0")
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1.0, rate))
+        self.name = name
+        self.tokens = self.burst
+        self._last = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: float = 1) -> float:
+        """
+        预占令牌
+        :return: 需要等待的秒数
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self._last) * self.rate)
+            self._last = now
+            self.tokens -= tokens
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            return max(wait, self._paused_until - now)
+
+    def acquire(self, tokens: float = 1) -> float:
+        """
+        获取令牌（阻塞当前线程直到可以发送）
+        :return: 实际等待的秒数
+        """
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens: float = 1) -> float:
+        """
+        获取令牌（挂起当前协程直到可以发送）
+        :return: 实际等待的秒数
+        """
+        wait = self._reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def pause(self, seconds: float):
+        """
+        暂停发放令牌（用于遵循服务端的Retry-After）
+        :param seconds: 暂停秒数
+        """
+        if seconds <= 0:
+            return
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        logger.warning(f"限流器 {self.name} 按Retry-After暂停 {seconds:.2f} 秒")
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    解析Retry-After头（秒数或HTTP日期）
+    :return: 需要等待的秒数，无法解析时返回None
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+_limiters: Dict[str, Optional[TokenBucket]] = {}
+_limiters_lock = threading.Lock()
+
+
+def _limiter_settings(interface: Optional[str], host: str):
+    """
+    查找限流配置：接口 rate_limit > global.rate_limit.hosts[主机] > global.rate_limit
+    :return: (限流器键, 配置)，未配置时配置为None
+    """
+    if interface:
+        interface_info = get_interface_by_name(interface) or {}
+        if interface_info.get('rate_limit'):
+            return f"interface:{interface}", interface_info['rate_limit']
+    global_config = get_config('global', 'rate_limit', default={}) or {}
+    hosts = global_config.get('hosts') or {}
+    if host in hosts:
+        return f"host:{host}", hosts[host]
+    if global_config.get('rps'):
+        return f"host:{host}", global_config
+    return f"host:{host}", None
+
+
+def get_rate_limiter(url: str, interface: Optional[str] = None) -> Optional[TokenBucket]:
+    """
+    获取请求对应的限流器（按接口或主机共享），未配置限流时返回None
+    :param url: 请求URL
+    :param interface: '模块.接口' 名称
+    """
+    host = (urlsplit(url).hostname or '').lower()
+    cache_key = f"{interface or ''}|{host}"
+    if cache_key in _limiters:
+        return _limiters[cache_key]
+    with _limiters_lock:
+        if cache_key not in _limiters:
+            key, settings = _limiter_settings(interface, host)
+            limiter = None
+            if settings and settings.get('rps'):
+                # 同一接口/主机的多个查询键共享同一个令牌桶
+                limiter = next((l for l in _limiters.values() if l is not None and l.name == key), None)
+                if limiter is None:
+                    limiter = TokenBucket(settings['rps'], settings.get('burst'), name=key)
+            _limiters[cache_key] = limiter
+    return _limiters[cache_key]
+
+
+def reset_rate_limiters():
+    """
+    清空所有限流器
+    """
+    with _limiters_lock:
+        _limiters.clear()
@@ -0,0 +1,239 @@
+# coding: utf-8
+# @Author: bgtech
+import random
+import threading
+import time
+import logging
+from typing import Dict, Optional, Iterable, Tuple
+from urllib.parse import urlsplit
+
+import requests
+
+from common.config import get_config
+from common.interface_config import get_interface_by_name
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+DEFAULT_RETRY_STATUS = (502, 503, 504)
+DEFAULT_RETRY_EXCEPTIONS = ('ConnectionError', 'Timeout')
+DEFAULT_RETRY_METHODS = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE')
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """
+    熔断器处于打开状态，请求被快速失败
+    """
+
+
+def _resolve_exceptions(names: Iterable) -> Tuple:
+    """
+    将异常类名（如 'ConnectionError'、'requests.exceptions.Timeout'）解析为异常类
+    """
+    classes = []
+    for name in names:
+        if isinstance(name, type):
+            classes.append(name)
+            continue
+        short_name = str(name).rsplit('.', 1)[-1]
+        cls = getattr(requests.exceptions, short_name, None)
+        if isinstance(cls, type) and issubclass(cls, BaseException):
+            classes.append(cls)
+        else:
+            logger.warning(f"未知的重试异常类型: {name}")
+    return tuple(classes)
+
+
+class RetryPolicy:
+    """
+    重试策略：最大尝试次数、按状态码/异常类型重试、指数退避加随机抖动
+    """
+
+    def __init__(self, max_attempts: int = 1, backoff: float = 1.0, backoff_max: float = 30.0,
+                 jitter: float = 0.5, retry_on_status: Optional[Iterable[int]] = None,
+                 retry_on_exceptions: Optional[Iterable] = None, methods: Optional[Iterable[str]] = None):
+        """
+        初始化重试策略
+        :param max_attempts: 最大尝试次数（含首次请求），1表示不重试
+        :param backoff: 首次重试前的等待时间（秒），之后按2的幂次增长
+        :param backoff_max: 单次等待上限（秒）
+        :param jitter: 抖动比例（0~1），实际等待时间在 [delay*(1-jitter), delay] 间随机
+        :param retry_on_status: 需要重试的响应状态码
+        :param retry_on_exceptions: 需要重试的异常类或 requests.exceptions 中的类名
+        :param methods: 允许重试的请求方法（默认只重试幂等方法）
+        """
+        self.max_attempts = max(int(max_attempts), 1)
+        self.backoff = float(backoff)
+        self.backoff_max = float(backoff_max)
+        self.jitter = min(max(float(jitter), 0.0), 1.0)
+        self.retry_on_status = set(retry_on_status if retry_on_status is not None else DEFAULT_RETRY_STATUS)
+        self.retry_on_exceptions = _resolve_exceptions(
+            retry_on_exceptions if retry_on_exceptions is not None else DEFAULT_RETRY_EXCEPTIONS)
+        self.methods = {m.upper() for m in (methods if methods is not None else DEFAULT_RETRY_METHODS)}
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict]) -> 'RetryPolicy':
+        """
+        从配置字典创建重试策略
+        :param config: 字段同构造参数
+        """
+        config = config or {}
+        return cls(
+            max_attempts=config.get('max_attempts', 1),
+            backoff=config.get('backoff', 1.0),
+            backoff_max=config.get('backoff_max', 30.0),
+            jitter=config.get('jitter', 0.5),
+            retry_on_status=config.get('retry_on_status'),
+            retry_on_exceptions=config.get('retry_on_exceptions'),
+            methods=config.get('methods'),
+        )
+
+    def can_retry(self, method: str, attempt: int) -> bool:
+        return attempt < self.max_attempts and method.upper() in self.methods
+
+    def should_retry_exception(self, method: str, attempt: int, exc: Exception) -> bool:
+        """
+        请求异常时是否重试（熔断打开时不重试）
+        """
+        if isinstance(exc, CircuitOpenError):
+            return False
+        return self.can_retry(method, attempt) and isinstance(exc, self.retry_on_exceptions)
+
+    def should_retry_status(self, method: str, attempt: int, status_code: int) -> bool:
+        """
+        响应状态码是否需要重试
+        """
+        return self.can_retry(method, attempt) and status_code in self.retry_on_status
+
+    def get_backoff(self, attempt: int) -> float:
+        """
+        计算第attempt次请求失败后的等待时间（秒）
+        """
+        delay = min(self.backoff * (2 ** (attempt - 1)), self.backoff_max)
+        return delay * (1 - self.jitter * random.random())
+
+
+class CircuitBreaker:
+    """
+    单主机熔断器
+    连续失败达到阈值后打开，打开期间请求快速失败；
+    超过恢复时间后进入半开状态，只放行有限的探测请求，探测成功则关闭，失败则重新打开
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30.0,
+                 half_open_max_calls: int = 1):
+        """
+        初始化熔断器
+        :param name: 名称（一般为 scheme://host:port）
+        :param failure_threshold: 连续失败多少次后打开
+        :param recovery_timeout: 打开后多久（秒）进入半开状态
+        :param half_open_max_calls: 半开状态下同时放行的探测请求数
+        """
+        self.name = name
+        self.failure_threshold = max(int(failure_threshold), 1)
+        self.recovery_timeout = float(recovery_timeout)
+        self.half_open_max_calls = max(int(half_open_max_calls), 1)
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self._lock = threading.Lock()
+
+    def before_request(self):
+        """
+        请求前检查，熔断打开时抛出CircuitOpenError
+        """
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.recovery_timeout:
+                    raise CircuitOpenError(f"熔断器已打开，快速失败: {self.name}")
+                self.state = self.HALF_OPEN
+                self._half_open_calls = 0
+                logger.info(f"熔断器进入半开状态: {self.name}")
+            if self.state == self.HALF_OPEN:
+                if self._half_open_calls >= self.half_open_max_calls:
+                    raise CircuitOpenError(f"熔断器半开探测中，快速失败: {self.name}")
+                self._half_open_calls += 1
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info(f"熔断器关闭: {self.name}")
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"熔断器打开: {self.name}，连续失败 {self.failures} 次")
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+_policies: Dict[str, RetryPolicy] = {}
+_breakers: Dict[str, CircuitBreaker] = {}
+_registry_lock = threading.Lock()
+
+
+def get_retry_policy(interface: Optional[str] = None) -> RetryPolicy:
+    """
+    获取重试策略
+    默认值来自 conf/interface_info.yaml 的 global.retry_times / retry_interval / retry，
+    接口配置中的 retry 段覆盖全局配置
+    :param interface: '模块.接口' 名称，None表示使用全局配置
+    """
+    key = interface or ''
+    policy = _policies.get(key)
+    if policy is not None:
+        return policy
+    config = {
+        'max_attempts': int(get_config('global', 'retry_times', default=0) or 0) + 1,
+        'backoff': get_config('global', 'retry_interval', default=1.0),
+    }
+    config.update(get_config('global', 'retry', default={}) or {})
+    if interface:
+        interface_info = get_interface_by_name(interface) or {}
+        config.update(interface_info.get('retry') or {})
+    policy = RetryPolicy.from_config(config)
+    with _registry_lock:
+        _policies[key] = policy
+    return policy
+
+
+def get_circuit_breaker(url: str) -> Optional[CircuitBreaker]:
+    """
+    获取URL所在主机的熔断器，默认不开启，配置 global.circuit_breaker.enabled 为true时才启用，否则返回None
+    :param url: 请求URL
+    """
+    breaker_config = get_config('global', 'circuit_breaker', default={}) or {}
+    if not breaker_config.get('enabled', False):
+        return None
+    parts = urlsplit(url)
+    name = f"{parts.scheme}://{parts.netloc}"
+    breaker = _breakers.get(name)
+    if breaker is None:
+        with _registry_lock:
+            breaker = _breakers.get(name)
+            if breaker is None:
+                breaker = CircuitBreaker(
+                    name,
+                    failure_threshold=breaker_config.get('failure_threshold', 5),
+                    recovery_timeout=breaker_config.get('recovery_timeout', 30),
+                    half_open_max_calls=breaker_config.get('half_open_max_calls', 1),
+                )
+                _breakers[name] = breaker
+    return breaker
+
+
+def reset_circuit_breakers():
+    """
+    清空所有熔断器状态
+    """
+    with _registry_lock:
+        _breakers.clear()
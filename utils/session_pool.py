@@ -0,0 +1,169 @@
+# coding: utf-8
+# @Author: bgtech
+import atexit
+import hashlib
+import threading
+import time
+import logging
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+
+from common.config import get_config
+from utils.compression import accept_encoding
+from utils.http_timing import TimedHTTPAdapter
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 默认连接池配置，可在 conf/interface_info.yaml 的 global.session_pool 中覆盖
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 20
+DEFAULT_IDLE_TIMEOUT = 300
+DEFAULT_SWEEP_INTERVAL = 30
+
+
+def build_session(pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+                  pool_maxsize: int = DEFAULT_POOL_MAXSIZE) -> requests.Session:
+    """
+    创建挂载了指定连接池大小（并记录分阶段耗时）的requests会话
+    :param pool_connections: 每个会话缓存的连接池数量
+    :param pool_maxsize: 单个连接池的最大连接数
+    :return: requests.Session
+    """
+    session = requests.Session()
+    # 按压缩率从高到低协商响应编码（brotli/zstd 仅在安装了对应库时声明）
+    session.headers['Accept-Encoding'] = accept_encoding()
+    adapter = TimedHTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+class SessionPool:
+    """
+    进程级会话注册表
+    按 scheme/host/port（以及可选的认证身份）复用 requests.Session，
+    使同一主机的请求共享TCP/TLS连接，避免每次请求重新握手
+    """
+
+    def __init__(self, pool_connections: Optional[int] = None, pool_maxsize: Optional[int] = None,
+                 idle_timeout: Optional[float] = None):
+        """
+        初始化会话注册表
+        :param pool_connections: 每个会话缓存的连接池数量，默认读取配置
+        :param pool_maxsize: 单个连接池的最大连接数，默认读取配置
+        :param idle_timeout: 会话空闲多久（秒）后被回收，默认读取配置
+        """
+        pool_config = get_config('global', 'session_pool', default={}) or {}
+        self.pool_connections = int(pool_connections or pool_config.get('pool_connections', DEFAULT_POOL_CONNECTIONS))
+        self.pool_maxsize = int(pool_maxsize or pool_config.get('pool_maxsize', DEFAULT_POOL_MAXSIZE))
+        self.idle_timeout = float(idle_timeout if idle_timeout is not None
+                                  else pool_config.get('idle_timeout', DEFAULT_IDLE_TIMEOUT))
+        self.sweep_interval = float(pool_config.get('sweep_interval', DEFAULT_SWEEP_INTERVAL))
+        self._sessions: Dict[Tuple, Dict] = {}
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+
+    @staticmethod
+    def make_key(url: str, auth_identity: Optional[str] = None) -> Tuple:
+        """
+        根据URL和认证身份生成会话键
+        :param url: 请求URL
+        :param auth_identity: 认证身份（如Authorization头），只保存其摘要
+        :return: (scheme, host, port, 身份摘要)
+        """
+        parts = urlsplit(url)
+        scheme = (parts.scheme or 'http').lower()
+        host = (parts.hostname or '').lower()
+        port = parts.port or (443 if scheme == 'https' else 80)
+        identity = hashlib.sha1(auth_identity.encode('utf-8')).hexdigest() if auth_identity else None
+        return scheme, host, port, identity
+
+    def get_session(self, url: str, auth_identity: Optional[str] = None) -> requests.Session:
+        """
+        获取（或创建）URL对应的共享会话
+        :param url: 请求URL
+        :param auth_identity: 认证身份，不同身份使用不同会话，避免Cookie串用
+        :return: requests.Session
+        """
+        key = self.make_key(url, auth_identity)
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_sweep >= self.sweep_interval:
+                self._evict_idle(now)
+            entry = self._sessions.get(key)
+            if entry is None:
+                entry = {'session': build_session(self.pool_connections, self.pool_maxsize)}
+                self._sessions[key] = entry
+                logger.debug(f"创建共享会话: {key[0]}://{key[1]}:{key[2]}")
+            entry['last_used'] = now
+            return entry['session']
+
+    def _evict_idle(self, now: float):
+        """
+        回收空闲超时的会话（调用方需持有锁）
+        :param now: 当前单调时钟时间
+        """
+        self._last_sweep = now
+        if self.idle_timeout <= 0:
+            return
+        expired = [key for key, entry in self._sessions.items()
+                   if now - entry['last_used'] > self.idle_timeout]
+        for key in expired:
+            self._sessions.pop(key)['session'].close()
+            logger.debug(f"回收空闲会话: {key[0]}://{key[1]}:{key[2]}")
+
+    def evict_idle(self):
+        """
+        立即回收空闲超时的会话
+        """
+        with self._lock:
+            self._evict_idle(time.monotonic())
+
+    def size(self) -> int:
+        """
+        当前缓存的会话数量
+        """
+        with self._lock:
+            return len(self._sessions)
+
+    def close_all(self):
+        """
+        关闭并清空所有共享会话
+        """
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for entry in sessions:
+            entry['session'].close()
+        if sessions:
+            logger.info(f"已关闭 {len(sessions)} 个共享会话")
+
+
+_session_pool: Optional[SessionPool] = None
+_session_pool_lock = threading.Lock()
+
+
+def get_session_pool() -> SessionPool:
+    """
+    获取进程级共享会话注册表（单例）
+    """
+    global _session_pool
+    if _session_pool is None:
+        with _session_pool_lock:
+            if _session_pool is None:
+                _session_pool = SessionPool()
+    return _session_pool
+
+
+def close_session_pool():
+    """
+    关闭进程级共享会话注册表中的所有会话，供pytest会话结束或进程退出时调用
+    """
+    if _session_pool is not None:
+        _session_pool.close_all()
+
+
+atexit.register(close_session_pool)
@@ -0,0 +1,98 @@
+# coding: utf-8
+# @Author: bgtech
+import math
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+
+ALTERNATIVES = ('greater', 'less', 'two-sided')
+
+
+def rank_with_ties(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    计算秩（从1开始），相同的值取平均秩
+    :return: (秩数组, 各组相同值的个数)
+    """
+    order = np.argsort(values, kind='mergesort')
+    sorted_values = values[order]
+    # 每组相同值的起止位置
+    boundaries = np.flatnonzero(np.diff(sorted_values)) + 1
+    starts = np.concatenate(([0], boundaries))
+    ends = np.concatenate((boundaries, [len(values)]))
+    tie_counts = ends - starts
+    average_ranks = (starts + ends + 1) / 2.0
+    ranks = np.empty(len(values), dtype=np.float64)
+    ranks[order] = np.repeat(average_ranks, tie_counts)
+    return ranks, tie_counts
+
+
+def mann_whitney_u(sample: Iterable[float], reference: Iterable[float],
+                   alternative: str = 'greater') -> Tuple[float, float]:
+    """
+    Mann-Whitney U 检验（正态近似，含相同值修正与连续性修正）
+    不假设延迟服从正态分布，对长尾与少量离群值不敏感，适合比较两组延迟样本
+    :param sample: 待检验样本（如本次运行的延迟）
+    :param reference: 参照样本（如历史基线的延迟）
+    :param alternative: greater（sample整体偏大）、less 或 two-sided
+    :return: (sample的U统计量, p值)
+    """
+    if alternative not in ALTERNATIVES:
+        raise ValueError(f"不支持的备择假设: {alternative}")
+    x = np.asarray(list(sample), dtype=np.float64)
+    y = np.asarray(list(reference), dtype=np.float64)
+    n1, n2 = len(x), len(y)
+    if not n1 or not n2:
+        raise ValueError("两组样本都不能为空")
+    ranks, tie_counts = rank_with_ties(np.concatenate((x, y)))
+    u = float(ranks[:n1].sum() - n1 * (n1 + 1) / 2.0)
+    mean = n1 * n2 / 2.0
+    n = n1 + n2
+    tie_term = float((tie_counts ** 3 - tie_counts).sum())
+    variance = n1 * n2 / 12.0 * ((n + 1) - tie_term / (n * (n - 1))) if n > 1 else 0.0
+    if variance <= 0:
+        # 所有值都相同
+        return u, 1.0
+    sd = math.sqrt(variance)
+    if alternative == 'greater':
+        z = (u - mean - 0.5) / sd
+        p = 0.5 * math.erfc(z / math.sqrt(2))
+    elif alternative == 'less':
+        z = (u - mean + 0.5) / sd
+        p = 0.5 * math.erfc(-z / math.sqrt(2))
+    else:
+        z = (abs(u - mean) - 0.5) / sd
+        p = min(1.0, math.erfc(max(z, 0.0) / math.sqrt(2)))
+    return u, p
+
+
+def bootstrap_ratio_ci(sample: Iterable[float], reference: Iterable[float], statistic=np.median,
+                       resamples: int = 2000, confidence: float = 0.95,
+                       seed: Optional[int] = None) -> Tuple[float, float]:
+    """
+    用bootstrap估计 statistic(sample) / statistic(reference) 的置信区间（百分位法）
+    两组样本各自有放回重抽样，分块计算以限制内存占用
+    :param sample: 待检验样本（如本次运行的延迟）
+    :param reference: 参照样本（如基线的延迟）
+    :param statistic: 统计量，需支持axis参数，默认中位数
+    :param resamples: 重抽样次数
+    :param confidence: 置信水平
+    :param seed: 随机种子，固定后同样的数据得到同样的区间
+    :return: (下限, 上限)
+    """
+    x = np.asarray(list(sample), dtype=np.float64)
+    y = np.asarray(list(reference), dtype=np.float64)
+    if not len(x) or not len(y):
+        raise ValueError("两组样本都不能为空")
+    rng = np.random.default_rng(seed)
+    ratios = np.empty(resamples, dtype=np.float64)
+    # 每块最多约一百万个元素
+    chunk = max(1, 1000000 // max(len(x), len(y)))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for start in range(0, resamples, chunk):
+            size = min(chunk, resamples - start)
+            resampled_x = statistic(x[rng.integers(0, len(x), (size, len(x)))], axis=1)
+            resampled_y = statistic(y[rng.integers(0, len(y), (size, len(y)))], axis=1)
+            ratios[start:start + size] = resampled_x / resampled_y
+    tail = (1 - confidence) / 2
+    low, high = np.quantile(ratios, [tail, 1 - tail])
+    return float(low), float(high)
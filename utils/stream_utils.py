@@ -0,0 +1,329 @@
+# coding: utf-8
+# @Author: bgtech
+import codecs
+import json
+import time
+import logging
+from collections import deque
+from typing import Dict, Any, Optional, Callable, Iterator, List, Union
+
+import requests
+
+from common.log import api_info
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 默认从SSE事件中提取回复片段的字段路径（按顺序尝试）
+DEFAULT_TEXT_PATHS = ['choices.0.delta.content', 'delta.content', 'data.reply', 'reply', 'content', 'text']
+
+
+def extract_text(payload: Any, paths: Optional[List[str]] = None) -> Optional[str]:
+    """
+    从事件数据中提取文本片段
+    :param payload: 事件数据（dict/list/str）
+    :param paths: 字段路径列表，如 'choices.0.delta.content'
+    :return: 文本片段，找不到时返回None
+    """
+    if isinstance(payload, str):
+        return payload
+    for path in paths or DEFAULT_TEXT_PATHS:
+        value = payload
+        for key in path.split('.'):
+            if isinstance(value, dict):
+                value = value.get(key)
+            elif isinstance(value, list) and key.isdigit() and int(key) < len(value):
+                value = value[int(key)]
+            else:
+                value = None
+            if value is None:
+                break
+        if isinstance(value, str):
+            return value
+    return None
+
+
+class SSEParser:
+    """
+    增量SSE（text/event-stream）解析器
+    按网络分块喂入字节，返回已完整的事件，未完成的行保留在缓冲区中
+    """
+
+    def __init__(self):
+        self._buffer = ''
+        # 多字节UTF-8字符可能跨分块，不完整的尾部字节留到下一块一起解码
+        self._decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self._data_lines = []
+        self._event = None
+        self._id = None
+        self._retry = None
+
+    def feed(self, chunk: Union[bytes, str]) -> List[Dict]:
+        """
+        喂入一段数据
+        :param chunk: 网络分块
+        :return: 本次解析出的完整事件列表
+        """
+        if isinstance(chunk, bytes):
+            chunk = self._decoder.decode(chunk)
+        self._buffer += chunk
+        events = []
+        while True:
+            index = -1
+            for sep in ('\r\n', '\n', '\r'):
+                pos = self._buffer.find(sep)
+                if pos != -1 and (index == -1 or pos < index):
+                    index, sep_len = pos, len(sep)
+            # 末尾单独的\r可能是\r\n的前半部分，等待后续数据
+            if index == -1 or (self._buffer[index] == '\r' and index == len(self._buffer) - 1):
+                break
+            line = self._buffer[:index]
+            self._buffer = self._buffer[index + sep_len:]
+            event = self._process_line(line)
+            if event is not None:
+                events.append(event)
+        return events
+
+    def flush(self) -> List[Dict]:
+        """
+        流结束时输出剩余事件
+        """
+        events = []
+        line = (self._buffer + self._decoder.decode(b'', final=True)).rstrip('\r\n')
+        self._buffer = ''
+        if line:
+            event = self._process_line(line)
+            if event is not None:
+                events.append(event)
+        event = self._process_line('')
+        if event is not None:
+            events.append(event)
+        return events
+
+    def _process_line(self, line: str) -> Optional[Dict]:
+        if line == '':
+            return self._dispatch()
+        if line.startswith(':'):
+            return None
+        field, _, value = line.partition(':')
+        if value.startswith(' '):
+            value = value[1:]
+        if field == 'data':
+            self._data_lines.append(value)
+        elif field == 'event':
+            self._event = value
+        elif field == 'id':
+            self._id = value
+        elif field == 'retry' and value.isdigit():
+            self._retry = int(value)
+        return None
+
+    def _dispatch(self) -> Optional[Dict]:
+        if not self._data_lines:
+            self._event = None
+            return None
+        data = '\n'.join(self._data_lines)
+        event = {'event': self._event or 'message', 'data': data, 'id': self._id, 'retry': self._retry}
+        try:
+            event['json'] = json.loads(data)
+        except ValueError:
+            event['json'] = None
+        self._data_lines = []
+        self._event = None
+        return event
+
+
+class StreamMetrics:
+    """
+    流式响应指标
+    只保存累计统计和最近若干个时间戳，内存占用不随回复长度增长
+    """
+
+    def __init__(self, start: float, keep_timestamps: int = 1000):
+        """
+        :param start: 请求开始时间（time.perf_counter）
+        :param keep_timestamps: 保留的最近分块时间戳数量
+        """
+        self.start = start
+        self.end = None
+        self.first_chunk_ms = None
+        self.first_token_ms = None
+        self.chunk_count = 0
+        self.event_count = 0
+        self.token_count = 0
+        self.bytes_received = 0
+        self.max_gap_ms = 0.0
+        self._gap_total_ms = 0.0
+        self._last_chunk = None
+        self.chunk_timestamps = deque(maxlen=keep_timestamps)
+
+    def record_chunk(self, size: int):
+        """
+        记录一个网络分块到达
+        :param size: 分块字节数
+        """
+        now = time.perf_counter()
+        offset_ms = (now - self.start) * 1000
+        if self.first_chunk_ms is None:
+            self.first_chunk_ms = offset_ms
+        if self._last_chunk is not None:
+            gap = (now - self._last_chunk) * 1000
+            self._gap_total_ms += gap
+            self.max_gap_ms = max(self.max_gap_ms, gap)
+        self._last_chunk = now
+        self.chunk_count += 1
+        self.bytes_received += size
+        self.chunk_timestamps.append(offset_ms)
+
+    def record_token(self):
+        """
+        记录一个回复片段（token）
+        """
+        if self.first_token_ms is None:
+            self.first_token_ms = (time.perf_counter() - self.start) * 1000
+        self.token_count += 1
+
+    def finish(self):
+        if self.end is None:
+            self.end = time.perf_counter()
+
+    @property
+    def total_ms(self) -> float:
+        end = self.end if self.end is not None else time.perf_counter()
+        return (end - self.start) * 1000
+
+    @property
+    def avg_gap_ms(self) -> float:
+        return self._gap_total_ms / (self.chunk_count - 1) if self.chunk_count > 1 else 0.0
+
+    @property
+    def tokens_per_sec(self) -> float:
+        """
+        首个token之后的生成速率
+        """
+        if self.first_token_ms is None or self.token_count < 2:
+            return 0.0
+        duration = (self.total_ms - self.first_token_ms) / 1000
+        return (self.token_count - 1) / duration if duration > 0 else 0.0
+
+    def to_dict(self) -> Dict:
+        """
+        转换为字典
+        """
+        return {
+            'first_chunk_ms': round(self.first_chunk_ms, 3) if self.first_chunk_ms is not None else None,
+            'first_token_ms': round(self.first_token_ms, 3) if self.first_token_ms is not None else None,
+            'avg_gap_ms': round(self.avg_gap_ms, 3),
+            'max_gap_ms': round(self.max_gap_ms, 3),
+            'chunk_count': self.chunk_count,
+            'event_count': self.event_count,
+            'token_count': self.token_count,
+            'bytes_received': self.bytes_received,
+            'tokens_per_sec': round(self.tokens_per_sec, 3),
+            'total_ms': round(self.total_ms, 3),
+        }
+
+
+class StreamResponse:
+    """
+    流式响应
+    迭代时按到达顺序产出SSE事件（dict）或原始分块（bytes），并实时更新指标
+    """
+
+    def __init__(self, response: requests.Response, start: float, sse: Optional[bool] = None,
+                 on_event: Optional[Callable] = None, text_paths: Optional[List[str]] = None,
+                 keep_reply: bool = False, chunk_size: Optional[int] = None):
+        """
+        :param response: 以stream=True发送的响应
+        :param start: 请求开始时间（time.perf_counter）
+        :param sse: 是否按SSE解析，None时根据Content-Type判断
+        :param on_event: 每个事件/分块到达时的回调 on_event(item, stream_response)，可在其中做增量断言
+        :param text_paths: 从事件JSON中提取回复片段的字段路径
+        :param keep_reply: 是否拼接完整回复文本（长回复会占用内存）
+        :param chunk_size: 读取分块大小，None表示数据到达即返回
+        """
+        self.response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.timing = getattr(response, 'timing', None)
+        if sse is None:
+            sse = 'text/event-stream' in response.headers.get('Content-Type', '')
+        self.sse = sse
+        self.on_event = on_event
+        self.text_paths = text_paths
+        self.keep_reply = keep_reply
+        self.chunk_size = chunk_size
+        self.metrics = StreamMetrics(start)
+        self.last_event = None
+        self.last_text = None
+        self._reply_parts = [] if keep_reply else None
+        self._consumed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __iter__(self) -> Iterator[Union[Dict, bytes]]:
+        if self._consumed:
+            raise RuntimeError("流式响应只能迭代一次")
+        self._consumed = True
+        parser = SSEParser() if self.sse else None
+        try:
+            for chunk in self.response.iter_content(chunk_size=self.chunk_size):
+                if not chunk:
+                    continue
+                self.metrics.record_chunk(len(chunk))
+                if parser is None:
+                    self.metrics.record_token()
+                    yield self._emit(chunk, None)
+                    continue
+                for event in parser.feed(chunk):
+                    yield self._emit_event(event)
+            if parser is not None:
+                for event in parser.flush():
+                    yield self._emit_event(event)
+        finally:
+            self.close()
+
+    def _emit_event(self, event: Dict) -> Dict:
+        self.metrics.event_count += 1
+        payload = event['json'] if event['json'] is not None else event['data']
+        text = extract_text(payload, self.text_paths)
+        if text:
+            self.metrics.record_token()
+        return self._emit(event, text)
+
+    def _emit(self, item, text: Optional[str]):
+        self.last_event = item
+        self.last_text = text
+        if self._reply_parts is not None and text:
+            self._reply_parts.append(text)
+        if self.on_event is not None:
+            self.on_event(item, self)
+        return item
+
+    @property
+    def reply(self) -> Optional[str]:
+        """
+        已收到的回复文本（需 keep_reply=True）
+        """
+        return ''.join(self._reply_parts) if self._reply_parts is not None else None
+
+    def consume(self) -> Dict:
+        """
+        读取完整个流（不保留事件），返回指标
+        """
+        for _ in self:
+            pass
+        return self.metrics.to_dict()
+
+    def close(self):
+        """
+        结束计时并释放连接
+        """
+        if self.metrics.end is None:
+            self.metrics.finish()
+            api_info(f"流式响应指标: {self.response.request.method} {self.response.url} | {self.metrics.to_dict()}")
+        self.response.close()
@@ -1,17 +1,396 @@
 # coding: utf-8
 # @Author: bgtech
-import requests
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+import logging
+from typing import Dict, Optional
+
+from common.config import get_config
+from common.interface_config import get_interface_by_name
+from common.shared_store import get_shared_store
+from common.temp_utils import BASE_DIR
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# cryptography为可选依赖，未安装时token只缓存在内存中，不以明文落盘
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+    CRYPTOGRAPHY_AVAILABLE = True
+except ImportError:
+    Fernet = InvalidToken = None
+    CRYPTOGRAPHY_AVAILABLE = False
+
+DEFAULT_TTL = 3600
+DEFAULT_REFRESH_MARGIN = 60
+DEFAULT_CACHE_FILE = 'temp/token_cache.bin'
+DEFAULT_KEY_FILE = os.path.join(os.path.expanduser('~'), '.aitest', 'token_cache.key')
+# 缓存加密密钥（Fernet密钥），未设置时使用 DEFAULT_KEY_FILE，不存在则自动生成
+KEY_ENV = 'TOKEN_CACHE_KEY'
+
+
+def get_auth_config() -> Dict:
+    """
+    读取 conf/interface_info.yaml 的 global.auth 配置
+    """
+    return get_config('global', 'auth', default={}) or {}
+
+
+def parse_jwt_exp(token: str) -> Optional[float]:
+    """
+    解析JWT的过期时间（不校验签名）
+    :param token: token字符串
+    :return: exp（时间戳），不是JWT或没有exp时返回None
+    """
+    parts = token.split('.') if isinstance(token, str) else []
+    if len(parts) != 3:
+        return None
+    payload = parts[1] + '=' * (-len(parts[1]) % 4)
+    try:
+        claims = json.loads(base64.urlsafe_b64decode(payload))
+    except (ValueError, TypeError):
+        return None
+    exp = claims.get('exp') if isinstance(claims, dict) else None
+    return float(exp) if isinstance(exp, (int, float)) else None
+
+
+def _extract(data, path: str):
+    value = data
+    for key in path.split('.'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+class TokenInfo:
+    """
+    缓存的token及其过期时间
+    """
+
+    def __init__(self, token: str, expires_at: Optional[float], obtained_at: Optional[float] = None):
+        self.token = token
+        self.expires_at = expires_at
+        self.obtained_at = obtained_at if obtained_at is not None else time.time()
+
+    def remaining(self) -> float:
+        """
+        剩余有效秒数，没有过期时间时为无穷大
+        """
+        return float('inf') if self.expires_at is None else self.expires_at - time.time()
+
+    def fresh(self, refresh_margin: float) -> bool:
+        """
+        是否无需刷新：剩余时间大于刷新提前量（提前量不超过有效期的一半，避免短有效期的token每次都刷新）
+        """
+        if self.expires_at is None:
+            return True
+        margin = min(refresh_margin, (self.expires_at - self.obtained_at) / 2)
+        return self.remaining() > margin
+
+    def to_dict(self) -> Dict:
+        return {'token': self.token, 'expires_at': self.expires_at, 'obtained_at': self.obtained_at}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'TokenInfo':
+        return cls(data['token'], data.get('expires_at'), data.get('obtained_at'))
+
+
+class EncryptedTokenCache:
+    """
+    加密落盘的token缓存（Fernet），跨次运行复用未过期的token
+    """
+
+    def __init__(self, path: str, key: Optional[bytes] = None):
+        """
+        初始化缓存
+        :param path: 缓存文件路径
+        :param key: Fernet密钥，默认读取环境变量 TOKEN_CACHE_KEY 或密钥文件
+        """
+        self.path = path
+        self._fernet = Fernet(key or self._load_key())
+
+    @staticmethod
+    def _load_key() -> bytes:
+        key = os.environ.get(KEY_ENV)
+        if key:
+            return key.encode('ascii')
+        if os.path.exists(DEFAULT_KEY_FILE):
+            with open(DEFAULT_KEY_FILE, 'rb') as f:
+                return f.read().strip()
+        key = Fernet.generate_key()
+        os.makedirs(os.path.dirname(DEFAULT_KEY_FILE), exist_ok=True)
+        fd = os.open(DEFAULT_KEY_FILE, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(key)
+        return key
+
+    def encrypt(self, data: Dict) -> str:
+        return self._fernet.encrypt(json.dumps(data).encode('utf-8')).decode('ascii')
+
+    def decrypt(self, token: str) -> Dict:
+        return json.loads(self._fernet.decrypt(token.encode('ascii')))
+
+    def load(self) -> Dict[str, TokenInfo]:
+        """
+        读取缓存，文件不存在、密钥不匹配或已损坏时返回空字典
+        """
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'rb') as f:
+                data = json.loads(self._fernet.decrypt(f.read()))
+        except (InvalidToken, ValueError, OSError) as e:
+            logger.warning(f"token缓存无法读取（密钥不匹配或文件损坏），忽略: {type(e).__name__} {e}")
+            return {}
+        return {key: TokenInfo.from_dict(value) for key, value in data.items()}
+
+    def save(self, tokens: Dict[str, TokenInfo]):
+        """
+        写入缓存（先写临时文件再替换，已过期的token不写入）
+        """
+        data = {key: info.to_dict() for key, info in tokens.items() if info.remaining() > 0}
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(self._fernet.encrypt(json.dumps(data).encode('utf-8')))
+        os.replace(tmp_path, self.path)
+
+
+class TokenManager:
+    """
+    token管理器
+    - 按JWT的exp（或响应中的expires_in、配置的ttl）判断过期，到期前 refresh_margin 秒主动刷新
+    - 同一账号的并发调用共享一次登录（single-flight）；刷新期间旧token仍有效时其他调用直接返回旧token
+    - 未过期的token加密保存到本地，下次运行直接复用
+    """
+
+    def __init__(self, login_url: Optional[str] = None, login_data: Optional[Dict] = None,
+                 headers: Optional[Dict] = None, token_path: Optional[str] = None, ttl: Optional[float] = None,
+                 refresh_margin: Optional[float] = None, cache_file: Optional[str] = None,
+                 persist: Optional[bool] = None):
+        """
+        初始化token管理器，未指定的参数读取 global.auth 配置
+        :param login_url: 默认登录地址（global.auth.login 可配置为 '模块.接口'）
+        :param login_data: 默认登录请求体
+        :param headers: 登录请求头
+        :param token_path: token在登录响应中的字段路径，如 'data.token'
+        :param ttl: 无法从token或响应得到过期时间时的有效期（秒）
+        :param refresh_margin: 到期前多少秒开始主动刷新
+        :param cache_file: 加密缓存文件（相对项目根目录）
+        :param persist: 是否加密落盘，需要安装cryptography
+        """
+        config = get_auth_config()
+        self.login_url = login_url or config.get('login_url') or self._interface_url(config.get('login'))
+        self.login_data = login_data if login_data is not None else config.get('login_data')
+        self.headers = headers
+        self.token_path = token_path or config.get('token_path') or 'token'
+        self.ttl = float(ttl if ttl is not None else config.get('ttl') or DEFAULT_TTL)
+        self.refresh_margin = float(refresh_margin if refresh_margin is not None
+                                    else config.get('refresh_margin', DEFAULT_REFRESH_MARGIN))
+        self._tokens: Dict[str, TokenInfo] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.login_count = 0
+
+        persist = persist if persist is not None else config.get('persist', True)
+        self.cache = None
+        if persist and CRYPTOGRAPHY_AVAILABLE:
+            path = cache_file or config.get('cache_file') or DEFAULT_CACHE_FILE
+            self.cache = EncryptedTokenCache(path if os.path.isabs(path) else os.path.join(BASE_DIR, path))
+            self._tokens.update(self.cache.load())
+        elif persist:
+            logger.warning("cryptography未安装，token只缓存在内存中，不落盘")
+
+    @staticmethod
+    def _interface_url(name: Optional[str]) -> Optional[str]:
+        info = get_interface_by_name(name) if name else None
+        return info.get('url') if isinstance(info, dict) else None
+
+    @staticmethod
+    def _cache_key(cache_key: str, login_url: str, login_data) -> str:
+        """
+        缓存key包含登录地址和账号摘要，避免不同账号/环境共用token
+        """
+        raw = json.dumps([login_url, login_data], sort_keys=True, ensure_ascii=False, default=str)
+        return f"{cache_key}:{hashlib.sha256(raw.encode('utf-8')).hexdigest()[:16]}"
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def get_token(self, cache_key: str = 'default', login_url: Optional[str] = None,
+                  login_data: Optional[Dict] = None, headers: Optional[Dict] = None,
+                  force_refresh: bool = False) -> str:
+        """
+        获取token：未过期直接返回缓存，即将过期时主动刷新，已过期时登录
+        :param cache_key: 缓存名称
+        :param login_url: 登录地址，默认使用管理器配置
+        :param login_data: 登录请求体，默认使用管理器配置
+        :param headers: 登录请求头
+        :param force_refresh: 强制重新登录
+        :return: token
+        """
+        login_url = login_url or self.login_url
+        login_data = login_data if login_data is not None else self.login_data
+        if not login_url:
+            raise ValueError("未配置登录地址，请设置 global.auth.login 或传入 login_url")
+        key = self._cache_key(cache_key, login_url, login_data)
+
+        info = self._tokens.get(key)
+        if info is not None and not force_refresh:
+            if info.fresh(self.refresh_margin):
+                return info.token
+            if info.remaining() > 0:
+                # 即将过期但仍有效：只有一个调用去刷新，其他调用继续使用旧token
+                lock = self._key_lock(key)
+                if not lock.acquire(blocking=False):
+                    return info.token
+                try:
+                    return self._refresh(key, login_url, login_data, headers, info).token
+                finally:
+                    lock.release()
+
+        with self._key_lock(key):
+            current = self._tokens.get(key)
+            # 等待期间其他调用已完成登录
+            if current is not None and current is not info and current.fresh(self.refresh_margin):
+                return current.token
+            return self._refresh(key, login_url, login_data, headers, info if force_refresh else None).token
+
+    def _refresh(self, key: str, login_url: str, login_data, headers: Optional[Dict],
+                 previous: Optional[TokenInfo]) -> TokenInfo:
+        current = self._tokens.get(key)
+        if current is not None and current is not previous and current.fresh(self.refresh_margin):
+            return current
+        # 共享存储是跨运行保留的SQLite文件，只能写入加密后的token；不能加密（未安装cryptography或persist为false）时不共享
+        store = get_shared_store() if self.cache is not None else None
+        if store is not None:
+            # 同一台机器上的多个worker进程共享一次登录
+            data = store.get_or_compute(
+                'token', key, lambda: self._encode(self._login(login_url, login_data, headers)),
+                per_run=False, validate=lambda value: self._usable(value, previous),
+                ttl=lambda value: max(self._decode(value).remaining(), 0))
+            info = self._decode(data)
+        else:
+            info = self._login(login_url, login_data, headers)
+        with self._lock:
+            self._tokens[key] = info
+        self._save()
+        return info
+
+    def _encode(self, info: TokenInfo) -> Dict:
+        """
+        写入共享存储的token，只保存加密后的内容
+        :raises ValueError: 不能加密时
+        """
+        if self.cache is None:
+            raise ValueError("token不能加密，不写入共享存储")
+        return {'encrypted': self.cache.encrypt(info.to_dict())}
+
+    def _decode(self, value: Dict) -> TokenInfo:
+        """
+        读取共享存储中的token
+        :raises ValueError: 不是加密的token，或当前进程不能解密时
+        """
+        if not isinstance(value, dict) or 'encrypted' not in value:
+            raise ValueError("共享存储中的token未加密")
+        if self.cache is None:
+            raise ValueError("当前进程不能解密共享存储中的token")
+        try:
+            return TokenInfo.from_dict(self.cache.decrypt(value['encrypted']))
+        except InvalidToken:
+            raise ValueError("共享存储中的token无法解密（密钥不匹配）")
+
+    def _usable(self, value: Dict, previous: Optional[TokenInfo]) -> bool:
+        """
+        共享存储中的token是否可以直接使用（未到刷新时间，且不是调用方要替换掉的旧token）
+        """
+        try:
+            info = self._decode(value)
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            logger.warning(f"共享存储中的token无法读取，重新登录: {type(e).__name__}")
+            return False
+        return info.fresh(self.refresh_margin) and (previous is None or info.token != previous.token)
+
+    def _save(self):
+        if self.cache is None:
+            return
+        with self._lock:
+            tokens = dict(self._tokens)
+        try:
+            self.cache.save(tokens)
+        except OSError as e:
+            logger.warning(f"token缓存写入失败: {e}")
+
+    def _login(self, login_url: str, login_data, headers: Optional[Dict]) -> TokenInfo:
+        """
+        执行登录并解析过期时间
+        """
+        from utils.http_utils import HTTPUtils
+
+        self.login_count += 1
+        data = HTTPUtils(use_pool=True).post(login_url, json_data=login_data, headers=headers or self.headers)
+        token = _extract(data, self.token_path)
+        if not token:
+            raise ValueError(f"登录响应中没有token（{self.token_path}）: {data}")
+        expires_at = parse_jwt_exp(token)
+        if expires_at is None:
+            expires_in = _extract(data, 'expires_in') or _extract(data, 'data.expires_in')
+            ttl = float(expires_in) if isinstance(expires_in, (int, float)) else self.ttl
+            expires_at = time.time() + ttl
+        logger.info(f"登录成功: {login_url}，token有效期至 {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(expires_at))}")
+        return TokenInfo(token, expires_at)
+
+    def invalidate(self, cache_key: Optional[str] = None):
+        """
+        使token失效（如接口返回401后），不指定cache_key时清空全部
+        """
+        with self._lock:
+            keys = [k for k in self._tokens if cache_key is None or k.split(':', 1)[0] == cache_key]
+            for key in keys:
+                del self._tokens[key]
+        self._save()
+        # 其他worker进程也不再从共享存储中取到失效的token
+        store = get_shared_store()
+        if store is not None:
+            for key in keys:
+                store.delete('token', key, per_run=False)
+
+
+def token_property(manager: TokenManager, cache_key: str = 'default') -> property:
+    """
+    构造读取token的类属性（供fixture注入测试类）：首次访问时才登录，值为str，
+    可直接用于 headers={'Authorization': self.token} 等写法；不需要认证的用例不会触发登录
+    :param manager: token管理器
+    :param cache_key: 缓存名称
+    """
+    return property(lambda self: manager.get_token(cache_key))
+
+
+_default_manager = None
+_default_manager_lock = threading.Lock()
+
+
+def get_token_manager() -> TokenManager:
+    """
+    获取进程级默认token管理器
+    """
+    global _default_manager
+    if _default_manager is None:
+        with _default_manager_lock:
+            if _default_manager is None:
+                _default_manager = TokenManager()
+    return _default_manager
 
-_token_cache = {}
 
 def get_token(login_url, login_data, headers=None, cache_key='default'):
     """
     登录获取token，支持缓存，避免重复登录。
     """
-    if cache_key in _token_cache:
-        return _token_cache[cache_key]
-    resp = requests.post(login_url, json=login_data, headers=headers)
-    resp.raise_for_status()
-    token = resp.json().get('token')  # 根据实际返回结构调整
-    _token_cache[cache_key] = token
-    return token
\ No newline at end of file
+    return get_token_manager().get_token(cache_key, login_url=login_url, login_data=login_data, headers=headers)
@@ -0,0 +1,271 @@
+# coding: utf-8
+# @Author: bgtech
+import hashlib
+import io
+import mimetypes
+import os
+import re
+import uuid
+import logging
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+from urllib.parse import unquote, urlsplit
+
+import requests
+
+# 配置日志
+logger = logging.getLogger(__name__)
+
+# 上传读取/下载写入的块大小（1MB），内存占用只与块大小有关
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+DEFAULT_CHECKSUM = 'sha256'
+_FILENAME_STAR = re.compile(r"filename\*\s*=\s*([^']*)'[^']*'([^;]+)", re.IGNORECASE)
+_FILENAME = re.compile(r'filename\s*=\s*"?([^";]+)"?', re.IGNORECASE)
+
+
+def _is_path(source) -> bool:
+    return isinstance(source, (str, os.PathLike))
+
+
+def file_chunks(path: Union[str, os.PathLike], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    按块读取文件
+    :param path: 文件路径
+    :param chunk_size: 块大小
+    :return: 字节块生成器
+    """
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+class _Part:
+    """
+    multipart中的一个部分
+    """
+
+    def __init__(self, name: str, source, filename: Optional[str] = None, content_type: Optional[str] = None):
+        self.source = source
+        self.size = None
+        self.start = None
+        disposition = f'form-data; name="{name}"'
+        if filename is not None:
+            disposition += f'; filename="{filename}"'
+        header = f'Content-Disposition: {disposition}\r\n'
+        if content_type:
+            header += f'Content-Type: {content_type}\r\n'
+        self.header = header.encode('utf-8') + b'\r\n'
+        if isinstance(source, bytes):
+            self.size = len(source)
+        elif _is_path(source):
+            self.size = os.path.getsize(source)
+        elif hasattr(source, 'read') and hasattr(source, 'seek'):
+            # 文件对象从当前位置读到末尾，记录起始位置用于重发时复位
+            self.start = source.tell()
+            self.size = source.seek(0, io.SEEK_END) - self.start
+            source.seek(self.start)
+
+    @property
+    def rewindable(self) -> bool:
+        return isinstance(self.source, bytes) or _is_path(self.source) or self.start is not None
+
+    def chunks(self, chunk_size: int) -> Iterator[bytes]:
+        source = self.source
+        if isinstance(source, bytes):
+            yield source
+        elif _is_path(source):
+            yield from file_chunks(source, chunk_size)
+        elif hasattr(source, 'read'):
+            if self.start is not None:
+                source.seek(self.start)
+            while True:
+                chunk = source.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk.encode('utf-8') if isinstance(chunk, str) else chunk
+        else:
+            for chunk in source:
+                yield chunk.encode('utf-8') if isinstance(chunk, str) else chunk
+
+
+class MultipartBody:
+    """
+    流式 multipart/form-data 请求体
+    文件部分在发送时才按块读取，内存占用与文件大小无关；各部分长度均已知时按Content-Length发送，
+    含生成器等未知长度的部分时按chunked发送
+    """
+
+    def __init__(self, fields: Optional[Dict] = None, files: Optional[Dict] = None,
+                 boundary: Optional[str] = None, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """
+        初始化multipart请求体
+        :param fields: 普通表单字段 {字段名: 值}
+        :param files: 文件字段 {字段名: 来源 | (文件名, 来源) | (文件名, 来源, Content-Type)}，
+                      来源可以是文件路径、文件对象、bytes 或 生成bytes的可迭代对象
+        :param boundary: 分隔符，默认随机生成
+        :param chunk_size: 文件读取块大小
+        """
+        self.boundary = boundary or uuid.uuid4().hex
+        self.chunk_size = chunk_size
+        self.parts: List[_Part] = []
+        for name, value in (fields or {}).items():
+            if not isinstance(value, bytes):
+                value = str(value).encode('utf-8')
+            self.parts.append(_Part(name, value))
+        for name, spec in (files or {}).items():
+            filename, source, content_type = self._normalize_file(spec)
+            self.parts.append(_Part(name, source, filename, content_type))
+        self._delimiter = f'--{self.boundary}\r\n'.encode('ascii')
+        self._closing = f'--{self.boundary}--\r\n'.encode('ascii')
+        self.len = self._total_length()
+        self._reset()
+
+    @staticmethod
+    def _normalize_file(spec) -> Tuple[str, object, str]:
+        if isinstance(spec, tuple):
+            filename, source = spec[0], spec[1]
+            content_type = spec[2] if len(spec) > 2 else None
+        else:
+            source, content_type = spec, None
+            filename = os.path.basename(source) if _is_path(source) else os.path.basename(
+                getattr(source, 'name', '') or 'file')
+        if not content_type:
+            content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        return filename, source, content_type
+
+    def _total_length(self) -> Optional[int]:
+        """
+        请求体总长度，含未知长度的部分时返回None
+        """
+        if any(part.size is None for part in self.parts):
+            return None
+        return sum(len(self._delimiter) + len(part.header) + part.size + 2 for part in self.parts) + len(
+            self._closing)
+
+    @property
+    def content_type(self) -> str:
+        return f'multipart/form-data; boundary={self.boundary}'
+
+    def _generate(self) -> Iterator[bytes]:
+        for part in self.parts:
+            yield self._delimiter + part.header
+            yield from part.chunks(self.chunk_size)
+            yield b'\r\n'
+        yield self._closing
+
+    def _reset(self):
+        self._chunks = self._generate()
+        self._buffer = b''
+        self._offset = 0
+
+    def read(self, size: int = -1) -> bytes:
+        """
+        读取请求体（requests/urllib3按块调用）
+        :param size: 最多读取的字节数，-1表示读取全部
+        """
+        if size < 0:
+            data = self._buffer[self._offset:] + b''.join(self._chunks)
+            self._buffer, self._offset = b'', 0
+            return data
+        # 缓冲区只在不足一次读取时才与下一块拼接，避免每次读取都复制整块
+        while len(self._buffer) - self._offset < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer = self._buffer[self._offset:] + chunk
+            self._offset = 0
+        data = self._buffer[self._offset:self._offset + size]
+        self._offset += len(data)
+        return data
+
+    def __iter__(self) -> Iterator[bytes]:
+        while True:
+            chunk = self.read(self.chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        """
+        复位到开头以便重发（仅支持seek(0)，含生成器部分时不能复位）
+        """
+        if offset != 0 or whence != io.SEEK_SET:
+            raise io.UnsupportedOperation("MultipartBody只支持seek(0)")
+        if not all(part.rewindable for part in self.parts):
+            raise io.UnsupportedOperation("请求体包含一次性数据源，不能重发")
+        self._reset()
+        return 0
+
+
+def open_body(source):
+    """
+    将上传来源转换为requests可流式发送的请求体
+    :param source: 文件路径、文件对象、bytes 或 生成bytes的可迭代对象
+    :return: (请求体, 需要在请求结束后关闭的文件对象或None)
+    """
+    if _is_path(source):
+        f = open(source, 'rb')
+        return f, f
+    if isinstance(source, bytes) or hasattr(source, 'read'):
+        return source, None
+    # 可迭代对象：requests按chunked逐块发送
+    return (chunk.encode('utf-8') if isinstance(chunk, str) else chunk for chunk in source), None
+
+
+def filename_from_response(response: requests.Response, url: str, default: str = 'download') -> str:
+    """
+    下载文件名：优先取Content-Disposition，其次取URL路径的最后一段
+    """
+    disposition = response.headers.get('Content-Disposition', '')
+    match = _FILENAME_STAR.search(disposition)
+    if match:
+        name = unquote(match.group(2).strip(), encoding=match.group(1) or 'utf-8')
+    else:
+        match = _FILENAME.search(disposition)
+        name = match.group(1).strip() if match else unquote(os.path.basename(urlsplit(url).path))
+    # 只保留文件名部分，防止路径穿越
+    name = os.path.basename(name.replace('\\', '/'))
+    return name or default
+
+
+def save_stream(response: requests.Response, path: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                algorithm: str = DEFAULT_CHECKSUM) -> Dict:
+    """
+    将流式响应按块写入文件，边写边计算摘要
+    先写入 <path>.part，完成后再改名，失败时删除未完成的文件
+    :param response: 以stream=True发送的响应
+    :param path: 保存路径
+    :param chunk_size: 块大小
+    :param algorithm: 摘要算法（hashlib支持的名称）
+    :return: {'path', 'size', 'checksum', 'algorithm'}
+    """
+    digest = hashlib.new(algorithm)
+    size = 0
+    part_path = f"{path}.part"
+    try:
+        with open(part_path, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                if chunk:
+                    f.write(chunk)
+                    digest.update(chunk)
+                    size += len(chunk)
+        os.replace(part_path, path)
+    except BaseException:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+    return {'path': path, 'size': size, 'checksum': digest.hexdigest(), 'algorithm': algorithm}
+
+
+def file_checksum(path: Union[str, os.PathLike], algorithm: str = DEFAULT_CHECKSUM,
+                  chunk_size: int = DEFAULT_CHUNK_SIZE) -> str:
+    """
+    按块计算文件摘要
+    """
+    digest = hashlib.new(algorithm)
+    for chunk in file_chunks(path, chunk_size):
+        digest.update(chunk)
+    return digest.hexdigest()
+